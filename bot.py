@@ -6,12 +6,24 @@ from os.path import join
 from dotenv import load_dotenv
 from pathlib import Path
 import glob
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Coroutine
 # |----------Module du projet-----------|
 import discord
 from discord.ext import commands
-import aiosqlite
 
 from logs.logger_config import setup_logger
+from utils.database import Database
+from utils.render import Renderer
+from utils.asset_fetcher import AssetFetcher
+from utils.guild_stats import GuildStats
+from utils.channel_renamer import ChannelRenamer
+from utils.invite_tracker import InviteTracker
+from utils.member_resolver import MemberResolver
+from utils.voice_events import VoiceEventDispatcher
 
 
 logger = setup_logger()
@@ -27,6 +39,10 @@ load_dotenv(dotenv_path=join(PARENT_FOLDER,".env"))
 PREFIX = '+'
 IGNORED_EXTENSIONS = ['ping', 'dashboard']
 DEV_IDS = [306081415643004928]
+# Extensions à charger après d'autres, ex: {'invite': ['bienvenue']}
+# Toutes les autres sont chargées en parallèle
+EXTENSION_DEPENDENCIES: dict[str, list[str]] = {}
+TREE_HASH_FILE = PARENT_FOLDER / '.command_tree_hash'
 
  
         
@@ -37,77 +53,152 @@ class ChillBot(commands.Bot):
         super().__init__(command_prefix=PREFIX, intents=discord.Intents.all())
         self.IGNORED_EXTENSIONS = IGNORED_EXTENSIONS
         self.DEV_IDS = DEV_IDS
+        self.database = Database(PARENT_FOLDER / 'databases')
+        self.renderer = Renderer()
+        self.assets = AssetFetcher()
+        self.renamer = ChannelRenamer()
+        self.invites = InviteTracker(self.database)
+        self.members = MemberResolver(self.database)
+        self.voice_events = VoiceEventDispatcher()
+        self.stats = GuildStats(PARENT_FOLDER / 'plugins' / 'bienvenue' / 'datafile' / 'logs.json')
     
     
     async def setup_hook(self) -> None:
-        self.connections = await self.connect_to_db()
-        for connection in self.connections.values():
-            await self.create_table(connection)
-        
-        await self.load_all_extensions()
+        start = time.perf_counter()
+        # Les bases et les extensions sont indépendantes : une base pas encore
+        # ouverte l'est à la demande lors de son premier accès
+        await asyncio.gather(
+            self.timed("Bases de données", self.connect_to_db()),
+            self.timed("Extensions", self.load_all_extensions()),
+        )
+        for extension in self.extensions:
+            self.add_persistent_views(extension)
+        await self.timed("Synchronisation des commandes", self.sync_tree())
+        logger.info(f"Démarrage en {time.perf_counter() - start:.2f}s")
+
+    async def timed(self, phase: str, coroutine: Coroutine) -> Any:
+        """Exécute une étape du démarrage et log sa durée
+
+        Args:
+            phase (str): Nom de l'étape
+            coroutine (Coroutine): Étape à exécuter
+
+        Returns:
+            Any: Résultat de l'étape
+        """
+        start = time.perf_counter()
+        result = await coroutine
+        logger.info(f"{phase} : {time.perf_counter() - start:.2f}s")
+        return result
+
+    def add_persistent_views(self, extension: str) -> None:
+        """Enregistre les vues persistantes d'une extension (liste PERSISTENT_VIEWS du module).
+        Une seule instance par vue répond à tous les messages, grâce aux custom_id :
+        les réenregistrer après un rechargement remplace les anciennes sans en ajouter
+
+        Args:
+            extension (str): Nom de l'extension, ex: 'plugins.niveau.main'
+        """
+        for view in getattr(self.extensions.get(extension), 'PERSISTENT_VIEWS', []):
+            self.add_view(view())
+
+    async def load_extension(self, name: str, *, package: str | None=None) -> None:
+        await super().load_extension(name, package=package)
+        # Au démarrage, setup_hook enregistre les vues une fois toutes les extensions chargées
+        if self.is_ready():
+            self.add_persistent_views(self._resolve_name(name, package))
+
+    async def reload_extension(self, name: str, *, package: str | None=None) -> None:
+        await super().reload_extension(name, package=package)
+        self.add_persistent_views(self._resolve_name(name, package))
+
+    async def sync_tree(self) -> None:
+        """Synchronise les commandes slash seulement si elles ont changé depuis le dernier lancement"""
+        commands_data = [command.to_dict() for command in self.tree.get_commands()]
+        tree_hash = hashlib.sha256(json.dumps(commands_data, sort_keys=True).encode()).hexdigest()
+
+        if TREE_HASH_FILE.exists() and TREE_HASH_FILE.read_text() == tree_hash:
+            logger.info("Commandes inchangées, pas de synchronisation")
+            return
+
         synced = await self.tree.sync()
+        TREE_HASH_FILE.write_text(tree_hash)
         logger.info(f"{len(synced)} commandes synchroisées")
 
+    async def close(self) -> None:
+        """Décharge les extensions avant de fermer le bot pour que
+        les cogs écrivent leurs données en attente
+        """
+        for extension in list(self.extensions):
+            try:
+                await self.unload_extension(extension)
+            except Exception as error:
+                logger.error(f"{extension}: {error.__class__.__name__} {error}")
+        
+        await self.database.close()
+        self.renderer.close()
+        await self.assets.close()
+        await self.stats.close()
+        self.renamer.close()
+        
+        await super().close()
+
     async def on_ready(self) -> None:
         activity = discord.CustomActivity("En train de chill")
         await self.change_presence(status=discord.Status.online, activity=activity)
         
         logger.info(f'Connecté en tant que {self.user.name}')
     
+    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
+        """Seul listener vocal du bot : les extensions s'abonnent à self.voice_events"""
+        await self.voice_events.dispatch(member, before, after)
+
     async def on_guild_join(self, guild: discord.Guild) -> None:
         """Fonction appelée lorsque le bot rejoint un serveur.
 
         Args:
             guild (discord.Guild): Le serveur sur lequel le bot a été ajouté.
         """
-        # Check if the guild is already in the database
-        list_db = glob.glob(join(self.WORKSPACE,'databases','**'))
-        if guild.name in list_db:
-            logger.info(f"Le serveur {guild.name} est déjà dans la base de données.")
-        else:
-            # Create a new database for the guild
-            logger.info(f"Ajout du serveur {guild.name} à la base de données.")
-            self.create_db(guild.name)
+        # Créer la base du serveur si elle n'existe pas et applique les migrations
+        logger.info(f"Ajout du serveur {guild.name} à la base de données.")
+        await self.database.open(guild)
     
     
     async def load_all_extensions(self):
-        for plugin in glob.glob(join(PARENT_FOLDER,"plugins","**")): 
-            extention = plugin.split(sep)[-1]
-            if extention not in self.IGNORED_EXTENSIONS:
-                try:
-                    await self.load_extension(f"plugins.{extention}.main")
-                    logger.info(f"Extension {extention} chargée")
-                except Exception as error:
-                    logger.error(error)
-    
-    async def connect_to_db(self) -> dict[str, aiosqlite.Connection]:
-        """Connecte le bot aux bases de données
-
-        Returns:
-            list[aiosqlite.Connection]: liste des connexions aux bases de données
+        """Charge les extensions par vagues : chaque vague contient les extensions
+        dont les dépendances sont déjà chargées, et est chargée en parallèle
         """
-        connections = {}
-        for server_db in glob.glob(join(PARENT_FOLDER,'databases','**')):
-            server_name = server_db.split(sep)[-1][:-7]
-            logger.info(f"Connection à la BDD {server_name}")
-            connection = await aiosqlite.connect(server_db)
-            connections[server_name] = connection
-        
-        return connections
+        remaining = {
+            plugin.split(sep)[-1]
+            for plugin in glob.glob(join(PARENT_FOLDER,"plugins","**"))
+            if plugin.split(sep)[-1] not in self.IGNORED_EXTENSIONS
+        }
+        while remaining:
+            wave = {
+                extention for extention in remaining
+                if not set(EXTENSION_DEPENDENCIES.get(extention, [])) & remaining
+            }
+            if not wave:
+                logger.error(f"Dépendances circulaires entre les extensions {remaining}")
+                wave = remaining
+            
+            await asyncio.gather(*(self.load_plugin(extention) for extention in wave))
+            remaining -= wave
 
-    async def create_db(self, server: discord.Guild) -> None:
-        connection = await aiosqlite.connect(join(PARENT_FOLDER,'databases',f'{server.name}.sqlite'))
-        await self.create_table(connection)
-        self.connections[server.name] = connection
+    async def load_plugin(self, extention: str) -> None:
+        start = time.perf_counter()
+        try:
+            await self.load_extension(f"plugins.{extention}.main")
+            logger.info(f"Extension {extention} chargée ({time.perf_counter() - start:.2f}s)")
+        except Exception as error:
+            logger.error(error)
     
-    async def create_table(self, connection: aiosqlite.Connection) -> None:
-        req = "CREATE TABLE IF NOT EXISTS Rank (id INTEGER PRIMARY KEY, name str, msg int, xp int, lvl int, rang int, add_xp_counter int, remove_xp_counter int, added_xp int, removed_xp int)"
-        await connection.execute(req)
-        await connection.commit()   
-        
-        req = "CREATE TABLE IF NOT EXISTS Vocal (id INTEGER PRIMARY KEY, name str, time int, afk int, lvl int, rang int, add_xp_counter int, remove_xp_counter int, added_xp int, removed_xp int)"
-        await connection.execute(req)
-        await connection.commit()   
+    async def connect_to_db(self) -> None:
+        """Connecte le bot aux bases de données des serveurs où il se trouve, en parallèle.
+        Le cache des serveurs n'est pas encore rempli, on les récupère par l'API.
+        """
+        guilds = [guild async for guild in self.fetch_guilds()]
+        await asyncio.gather(*(self.database.open(guild) for guild in guilds))
         
     @commands.hybrid_command(name='reload_db')
     async def reload_db(self, ctx: commands.Context) -> None:
@@ -118,13 +209,9 @@ class ChillBot(commands.Bot):
         """
         server = ctx.guild.name
         if ctx.author.guild_permissions.administrator or ctx.author.id in self.DEV_IDS:
-            # On ferme la connexion à la base de données
-            self.connections[server].close()
-
-            # On recharge la base de données
+            # On ferme puis on rouvre la base de données
             logger.info(f"Reloading database for {server}")
-            self.connections[server] = await aiosqlite.connect(join(PARENT_FOLDER,'databases',f'{server}.sqlite'))
-            await self.create_table(self.connections[server])
+            await self.database.reload(ctx.guild)
             await ctx.reply(f"Base de données {server} rechargée")
         else:
             ctx.send("Tu n'as pas la permission pour ça", ephemeral=True)
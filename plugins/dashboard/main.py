@@ -4,11 +4,16 @@ from discord.ext import commands
 from pathlib import Path
 parent_folder = Path(__file__).resolve().parent
 import math
-import aiosqlite
 import pandas as pd
 import subprocess
 
 from icecream import ic
+from utils.database import Database
+from utils.ranking import rank_engine, vocal_engine
+from utils.level_curve import levels_from_xp
+
+
+ENGINES = {'Rank': rank_engine, 'Vocal': vocal_engine}
 
 
 # |----------Anexes----------|
@@ -74,9 +79,9 @@ def ordinal(n: int):
 
 
 class Dashboard(commands.Cog):
-    def __init__(self, bot: commands.Bot, connection: aiosqlite.Connection) -> None:
+    def __init__(self, bot: commands.Bot, database: Database) -> None:
         self.bot = bot
-        self.connection = connection
+        self.database = database
 
     @commands.hybrid_command(name="dashboard", description="Affiche le leaderboard complet")
     async def dashboard(self, ctx: commands.Context) -> discord.Message:
@@ -88,8 +93,8 @@ class Dashboard(commands.Cog):
         Returns:
             discord.Message: Message
         """
-        await self.write_data('Rank')
-        await self.write_data('Vocal')
+        await self.write_data(ctx.guild, 'Rank')
+        await self.write_data(ctx.guild, 'Vocal')
         subprocess.run(['streamlit', 'run', f'{parent_folder}/leaderboard.py'])
         membre = ctx.author
 
@@ -101,28 +106,35 @@ class Dashboard(commands.Cog):
         embed.set_author(name=membre.display_name, icon_url=membre.avatar)
         await ctx.reply(embed=embed)
    
-    async def get_column_names(self, table: str) -> None:
-        cursor = await self.connection.execute(f"PRAGMA table_info({table})")
-        columns_info = await cursor.fetchall()
+    async def get_column_names(self, serveur: discord.Guild, table: str) -> None:
+        async with self.database.read(serveur) as connection:
+            columns_info = await connection.execute_fetchall(f"PRAGMA table_info({table})")
 
         return [column_info[1] for column_info in columns_info]
 
-    async def sql_to_dataframe(self, table: str) -> None:
-        rows = await self.connection.execute_fetchall(f'SELECT * FROM {table} ORDER BY rang')
-        columns = await self.get_column_names(table)
+    async def sql_to_dataframe(self, serveur: discord.Guild, table: str) -> None:
+        # Le rang n'est plus tenu à jour à chaque message, on le fige pour l'export
+        async with self.database.write(serveur) as connection:
+            await ENGINES[table].materialize(connection)
+        async with self.database.read(serveur) as connection:
+            rows = await connection.execute_fetchall(f'SELECT * FROM {table} ORDER BY rang')
+        columns = await self.get_column_names(serveur, table)
 
         return pd.DataFrame(rows, columns=columns)
     
 
-    async def write_data(self, table: str) -> None:
-        data = await self.sql_to_dataframe(table)
-        data['avatar'] = ''
-        for index , row in data.iterrows():
-            member = self.bot.get_user(row['id'])
-            data.loc[index, 'avatar'] = str(member.avatar).split('?')[0]
+    async def write_data(self, serveur: discord.Guild, table: str) -> None:
+        data = await self.sql_to_dataframe(serveur, table)
+        # Recalcule les niveaux de toute la colonne d'un coup
+        data['lvl'] = levels_from_xp(data[ENGINES[table].score].to_numpy())
+        members = await self.bot.members.resolve(serveur, data['id'].tolist())
+        data['avatar'] = [
+            members[member_id].display_avatar.url.split('?')[0] if members[member_id] else ''
+            for member_id in data['id']
+        ]
         data.to_csv(f"{parent_folder}/data/{table}.csv")
 
 
 
 async def setup(bot: commands.Bot)->None:
-    await bot.add_cog(Dashboard(bot, bot.connection))
\ No newline at end of file
+    await bot.add_cog(Dashboard(bot, bot.database))
\ No newline at end of file
@@ -1,17 +1,15 @@
-import os
+import asyncio
 import pathlib
-import glob
 
 import discord
 from discord.ext import commands, tasks
 from bot import ChillBot
 
-import git
-from git import Repo
-
-
 from icecream import ic
 from logs.logger_config import setup_logger
+from utils.file_watcher import FileWatcher
+from utils.git_sync import GitSync
+from utils.module_graph import ModuleGraph
 
 
 logger = setup_logger()
@@ -19,131 +17,145 @@ logger = setup_logger()
 
 
 IGNORE_EXTENSIONS = ['ping','dashboard']
-plugins_folder = '/'.join(str(pathlib.Path(__file__).resolve().parent).split('/')[:-1])
 PARENT_FOLDER = pathlib.Path(__file__).resolve().parent
 GITHUB_REPOSITORY = PARENT_FOLDER.parent.parent
+SYNC_INTERVAL = 2       # minutes entre deux vérifications du remote
 
 
 
 
-def path_from_extension(extension: str) -> pathlib.Path:
-    """Convertit une extension de module en un chemin vers le fichier main
-    Par exemple, 'plugins.hotreload.main' devient 'plugins/hotreload/main.py'
-
-    Args:
-        extension (str): Le nom de l'extension à convertir
-
-    Returns:
-        pathlib.Path: Le chemin vers le fichier main de l'extension
-    """
-    return pathlib.Path(extension.replace('.', os.sep)+'.py')
-
-
-
 class HotReload(commands.Cog):
     """
-    Cog for reloading extensions as soon as the file is edited
+    Cog for reloading extensions as soon as a file is edited
     """
 
     def __init__(self, bot: ChillBot):
         self.bot = bot
-        self.hot_reload_loop.start()
-        self.load_new_cogs_loop.start()
+        self.graph = ModuleGraph(GITHUB_REPOSITORY)
+        self.watcher = FileWatcher(GITHUB_REPOSITORY, self.reload_changed)
+        self.git = GitSync(GITHUB_REPOSITORY)
+        # Une seule rafale de rechargements à la fois
+        self.lock = asyncio.Lock()
+        # fichier -> date de modification lors du dernier rechargement (None : supprimé)
+        # Un pull est vu par le watcher et par pull_from_github : traité une seule fois
+        self.reloaded: dict[pathlib.Path, int | None] = {}
         self.pull_from_github.start()
 
 
+    async def cog_load(self) -> None:
+        self.watcher.start()
+
     def cog_unload(self):
-        self.hot_reload_loop.stop()
-        self.load_new_cogs_loop.stop()
+        self.watcher.stop()
         self.pull_from_github.stop()
 
     
     
 
-    @tasks.loop(seconds=5)
-    async def pull_from_github(self, repository_path: str=GITHUB_REPOSITORY)->None:
-        """Pull automatiquement sur les nouveaux commit de la branche main
-
-        Args:
-            repository_path (str, optional): Chemin local du répertoire
+    @tasks.loop(minutes=SYNC_INTERVAL)
+    async def pull_from_github(self) -> None:
+        """Pull automatiquement les nouveaux commits de la branche main, dans l'executor,
+        puis recharge ce que touchent les fichiers modifiés par ces commits
         """
-        try:
-            repo = Repo(repository_path)
-            repo.remotes.origin.fetch()
-            last_local_commit = repo.head.commit
-            last_remote_commit = repo.remotes.origin.refs['main'].commit
-            
-            if last_remote_commit.committed_datetime > last_local_commit.committed_datetime:
-                repo.remotes.origin.pull()
-                    
-                logger.info(f"Pull: {last_remote_commit.message[:-1]}")
-        except git.GitCommandError as e:
-            logger.warning(f"Erreur lors du pull : {e}")
-
-
-                
-    @tasks.loop(seconds=3)
-    async def hot_reload_loop(self):
-        for extension in list(self.bot.extensions.keys()):
-            extension_name = extension.split('.')[1]
-            if extension_name in self.bot.IGNORED_EXTENSIONS:
-                continue
-            path = path_from_extension(extension)
-            time = os.path.getmtime(path)
+        if changed := await self.git.poll():
+            await self.reload_changed(set(changed))
 
-            try:
-                if self.last_modified_time[extension] == time:
-                    continue
-            except KeyError:
-                self.last_modified_time[extension] = time
 
+    async def reload_changed(self, paths: set[pathlib.Path]) -> None:
+        """Recharge ce qui dépend des fichiers modifiés : configs json en place,
+        extensions dont un module importé a changé, nouvelles extensions
+
+        Args:
+            paths (set[pathlib.Path]): Fichiers modifiés
+        """
+        async with self.lock:
+            paths = self.fresh(paths)
+            for path in sorted(path for path in paths if path.suffix == '.json'):
+                self.reload_config(path)
+
+            extensions = [
+                extension for extension in self.bot.extensions
+                if extension.split('.')[1] not in self.bot.IGNORED_EXTENSIONS
+            ]
+            affected, modules, core = self.graph.affected(paths, extensions)
+            if core:
+                logger.warning(f"Modifié, pris en compte au redémarrage : {', '.join(sorted(core))}")
+            # Réimportés par les extensions rechargées
+            ModuleGraph.forget(modules)
+
+            # Cette extension en dernier : son rechargement arrête ce watcher
+            for extension in sorted(affected, key=lambda extension: (extension == __name__, extension)):
+                await self.reload(extension)
+
+            for path in paths:
+                extension = self.graph.module_name(path)
+                if (
+                    path.name == 'main.py' and extension and extension.startswith('plugins.')
+                    and extension not in self.bot.extensions
+                    and extension.split('.')[1] not in self.bot.IGNORED_EXTENSIONS
+                    and path.exists()
+                ):
+                    await self.load(extension)
+
+
+    def fresh(self, paths: set[pathlib.Path]) -> set[pathlib.Path]:
+        """Garde les fichiers modifiés depuis leur dernier rechargement, et note leur date"""
+        fresh = set()
+        for path in paths:
             try:
-                await self.bot.reload_extension(extension)
-            except commands.ExtensionError:
-                logger.warning(f"Couldn't reload extension: {extension.split('.')[1]}")
-            except commands.ExtensionNotLoaded:
-                continue
-            else:
-                logger.info(f"Reloaded extension: {extension.split('.')[1]}")
-            finally:
-                self.last_modified_time[extension] = time
-
-            
-    @tasks.loop(seconds=3)
-    async def load_new_cogs_loop(self):
-        for plugin in glob.glob(f"{plugins_folder}/**"):
-            extension = '.'.join(plugin.split('/')[-2:]) + '.main'
-            path = path_from_extension(extension)
-            time = os.path.getmtime(path)
-            
-            extension_name = extension.split('.')[1]
-            if extension in self.bot.extensions or extension_name in self.bot.IGNORED_EXTENSIONS:
+                mtime = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if path not in self.reloaded or self.reloaded[path] != mtime:
+                self.reloaded[path] = mtime
+                fresh.add(path)
+        return fresh
+
+
+    def reload_config(self, path: pathlib.Path) -> None:
+        """Recharge un json modifié de plugins/<nom>/ dans l'attribut des cogs de l'extension
+        qui le déclarent dans CONFIG_FILES, sans recharger l'extension. Les json écrits par
+        le bot lui-même (logs...) n'y sont pas et sont ignorés
+        """
+        parts = path.relative_to(GITHUB_REPOSITORY).parts
+        if len(parts) < 3 or parts[0] != 'plugins':
+            return
+        extension = f"plugins.{parts[1]}.main"
+        for cog in list(self.bot.cogs.values()):
+            if cog.__module__ != extension or not (attribute := getattr(cog, 'CONFIG_FILES', {}).get(path.stem)):
                 continue
-            
             try:
-                await self.bot.load_extension(extension)
-            except commands.ExtensionError:
-                logger.warning(f"Couldn't load extension: {extension.split('.')[1]}")
-            except commands.ExtensionNotLoaded:
+                # channels.json est converti en salons, comme au chargement du cog
+                config = cog.load_channels() if path.stem == 'channels' else cog.load_json(path.stem)
+            except (OSError, ValueError) as error:
+                # json en cours d'écriture ou invalide : l'ancienne config est gardée
+                logger.warning(f"Couldn't reload config: {parts[1]}/{path.name} ({error})")
                 continue
+            setattr(cog, attribute, config)
+            logger.info(f"Reloaded config: {parts[1]}/{path.name}")
+
+
+    async def reload(self, extension: str) -> None:
+        try:
+            if self.graph.path(extension) is None:
+                await self.bot.unload_extension(extension)
             else:
-                logger.info(f"Loaded extension: {extension.split('.')[1]}")
-            finally:
-                self.last_modified_time[extension] = time
-
-
-    @load_new_cogs_loop.before_loop
-    @hot_reload_loop.before_loop
-    async def cache_last_modified_time(self):
-        await self.bot.wait_until_ready()
-        self.last_modified_time = {}
-        # Mapping = {extension: timestamp}
-        for extension in self.bot.extensions.keys():
-            if extension in self.bot.IGNORED_EXTENSIONS:
-                continue
-            path = path_from_extension(extension)
-            time = os.path.getmtime(path)
-            self.last_modified_time[extension] = time
+                await self.bot.reload_extension(extension)
+        except commands.ExtensionNotLoaded:
+            return
+        except commands.ExtensionError:
+            logger.warning(f"Couldn't reload extension: {extension.split('.')[1]}")
+        else:
+            logger.info(f"Reloaded extension: {extension.split('.')[1]}")
+
+
+    async def load(self, extension: str) -> None:
+        try:
+            await self.bot.load_extension(extension)
+        except commands.ExtensionError:
+            logger.warning(f"Couldn't load extension: {extension.split('.')[1]}")
+        else:
+            logger.info(f"Loaded extension: {extension.split('.')[1]}")
 
 
 
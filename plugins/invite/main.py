@@ -4,24 +4,116 @@ from discord.ext import commands
 from pathlib import Path
 parent_folder = Path(__file__).resolve().parent
 import json
-import aiosqlite
+import asyncio
 from sqlite3 import IntegrityError, OperationalError
 
-from icecream import ic
 from logs.logger_config import setup_logger
+from utils.database import Database
+from utils.invite_tracker import InviteTracker
+from utils.persistent_view import PersistentView, footer_page
+from utils import charts
 
 
 logger = setup_logger()
 
 
+INVITERS_PER_PAGE = 10
+CHART_SIZE = 10     # inviteurs affichés sur le graphique
+
+
+
+
+class InviterLeaderboardView(PersistentView):
+    """Boutons du classement des inviteurs, communs à tous les messages /graph
+
+    La page affichée est relue dans le pied de l'embed du message cliqué.
+    """
+
+    @discord.ui.button(label="Précédent", emoji="⬅️", custom_id="leaderboard:Invite:previous")
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        page, total_page = footer_page(interaction.message)
+        await self.update_msg(interaction, total_page if page <= 1 else page - 1)
+
+
+    @discord.ui.button(label="Suivant", emoji="➡️", custom_id="leaderboard:Invite:next")
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        page, total_page = footer_page(interaction.message)
+        await self.update_msg(interaction, 1 if page >= total_page else page + 1)
+
+
+    @discord.ui.button(label="Graphique", emoji="📊", custom_id="leaderboard:Invite:chart")
+    async def chart(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        bot = interaction.client
+        await interaction.response.defer()
+        inviters = await self.get_inviters(bot, interaction.guild, 0, CHART_SIZE)
+        names = await self.inviter_names(bot, interaction.guild, inviters)
+        labels = [names[inviter_id] for inviter_id, _, _ in inviters]
+        image = await bot.renderer.run(charts.bar_chart, labels, [count for _, count, _ in inviters])
+
+        embed = discord.Embed(title="Top des inviteurs", color=discord.Color.blurple())
+        embed.set_image(url="attachment://inviters.png")
+        await interaction.followup.send(embed=embed, file=bot.renderer.file(image, "inviters"))
+
+
+    @staticmethod
+    async def get_inviters(bot: commands.Bot, serveur: discord.Guild, offset: int, limit: int) -> list[tuple[int, int, str | None]]:
+        """Renvoie une page d'inviteurs, servie par l'index sur le nombre d'invités
+
+        Args:
+            bot (commands.Bot): Bot
+            serveur (discord.Guild): Serveur
+            offset (int): Nombre d'inviteurs à sauter
+            limit (int): Nombre d'inviteurs à renvoyer
+
+        Returns:
+            list[tuple[int, int, str | None]]: (id de l'inviteur, nombre de membres invités, dernier nom connu)
+        """
+        req = ("SELECT inviter_id, invites, (SELECT inviter_name FROM Invites WHERE Invites.inviter_id == InviteStats.inviter_id LIMIT 1) "
+               "FROM InviteStats WHERE invites > 0 ORDER BY invites DESC, inviter_id LIMIT ? OFFSET ?")
+        async with bot.database.read(serveur) as connection:
+            return await connection.execute_fetchall(req, (limit, offset))
+
+    @staticmethod
+    async def inviter_names(bot: commands.Bot, serveur: discord.Guild, inviters: list[tuple[int, int, str | None]]) -> dict[int, str]:
+        return await bot.members.names(serveur, {inviter_id: name for inviter_id, _, name in inviters})
+
+    async def build_embed(self, bot: commands.Bot, serveur: discord.Guild, page: int, author: discord.abc.User) -> discord.Embed:
+        total_page = await Invite.pages_count(bot.database, serveur)
+        page = min(page, total_page)
+        offset = (page - 1) * INVITERS_PER_PAGE
+        inviters = await self.get_inviters(bot, serveur, offset, INVITERS_PER_PAGE)
+        names = await self.inviter_names(bot, serveur, inviters)
+
+        embed = discord.Embed(
+            title="Répartition des inviters",
+            color=discord.Color.random()
+        )
+        embed.set_author(icon_url=author.display_avatar.url, name=author.display_name)
+        for rang, (inviter_id, count, _) in enumerate(inviters, start=offset + 1):
+            embed.add_field(name=f"{Invite.rank_emoji(rang)} {names[inviter_id]}", value=f"{count} membres invités", inline=False)
+
+        embed.set_footer(text=f"{page}/{total_page}")
+        return embed
+
+    async def update_msg(self, interaction: discord.Interaction, page: int):
+        embed = await self.build_embed(interaction.client, interaction.guild, page, interaction.user)
+        return await interaction.response.edit_message(embed=embed)
+
+
 
 
 class Invite(commands.Cog):
-    def __init__(self, bot: commands.Bot, connections: dict[str, aiosqlite.Connection])->None:
+    def __init__(self, bot: commands.Bot, database: Database, invites: InviteTracker)->None:
         self.bot = bot
-        self.connections = connections
+        self.database = database
+        self.invites = invites
         
     
+    @commands.Cog.listener(name="on_ready")
+    async def on_ready(self) -> None:
+        """Prend la photo des invites de chaque serveur"""
+        await asyncio.gather(*(self.invites.load(guild) for guild in self.bot.guilds))
+
     @commands.Cog.listener(name="on_invite_create")
     async def on_invite_create(self, invite: discord.Invite) -> None:
         """Ajoute une nouvelle invite à la base de données si elle n'existe pas déjà
@@ -29,57 +121,57 @@ class Invite(commands.Cog):
         Args:
             invite (discord.Invite): Invite à ajouter
         """
-        connection = self.connections[invite.guild.name]
-        req = "INSERT INTO Invites (code, inviter_id, inviter_name, usage_count) VALUES (?,?,?,?)"
+        self.invites.created(invite)
+        req = "INSERT INTO Invites (code, inviter_id, inviter_name, uses) VALUES (?,?,?,?)"
 
         try:
-            await connection.execute(req, (invite.code, invite.inviter.id, invite.inviter.name, invite.uses))
-            await connection.commit()
+            async with self.database.write(invite.guild) as connection:
+                await connection.execute(req, (invite.code, invite.inviter.id, invite.inviter.name, invite.uses))
         except IntegrityError:
             pass
         except OperationalError:
-            logger(f"{invite.guild.name}: Erreur d'insertion dans la base de données")
+            logger.error(f"{invite.guild.name}: Erreur d'insertion dans la base de données")
+
+    @commands.Cog.listener(name="on_invite_delete")
+    async def on_invite_delete(self, invite: discord.Invite) -> None:
+        """Retire une invite supprimée de la photo des invites
+
+        Args:
+            invite (discord.Invite): Invite supprimée
+        """
+        self.invites.deleted(invite)
         
     
     @commands.hybrid_command(name="graph")
-    async def inviter_graph(self, ctx: commands.Context):
-        ic(ctx.guild.name)
-        connection = self.connections[ctx.guild.name]
-        embed = discord.Embed(
-            title="Répartition des inviters",
-            color=discord.Color.random()
-        )
-        embed.set_author(icon_url=ctx.author.avatar.url,name=ctx.author.display_name)
-
-        req = "SELECT id, invite_count FROM Members WHERE invite_count > 0 ORDER BY invite_count DESC"
-        res = await connection.execute_fetchall(req)
-        ic(res)
-        for rang, res in enumerate(await connection.execute_fetchall(req)):
-            member_id, count = res
-            member = self.bot.get_user(member_id)
-            embed.add_field(name=f"{self.rank_emoji(rang+1)} {member.display_name}", value=f"{count} membres invités", inline=False)
-            ic(member.name,count)
-
-        return await ctx.send(embed=embed)
+    async def inviter_graph(self, ctx: commands.Context) -> discord.Message:
+        """Affiche les inviteurs par nombre de membres invités, page par page
+
+        Args:
+            ctx (commands.Context): Contexte de la commande
+
+        Returns:
+            discord.Message: Message du classement
+        """
+        view = InviterLeaderboardView.components()
+        embed = await view.build_embed(self.bot, ctx.guild, 1, ctx.author)
+        return await ctx.send(embed=embed, view=view)
     
     
-    async def pages_count(self, serveur: discord.Guild) -> int:
-        """Renvoie le nombre de page totale du leaderboard
+    @staticmethod
+    async def pages_count(database: Database, serveur: discord.Guild) -> int:
+        """Renvoie le nombre de page totale du classement des inviteurs
 
         Returns:
             int: Nombre de page totale
         """
-        connection = self.connections[serveur.name]
-        req = f"SELECT count(*) FROM Rank"
-        res = await connection.execute(req)
-        tamp = (await res.fetchone())[0]
-
-        if tamp % 5:
-            return  tamp // 5 + 1
-        else:
-            return  tamp // 5
+        req = "SELECT count(*) FROM InviteStats WHERE invites > 0"
+        async with database.read(serveur) as connection:
+            tamp = (await connection.execute_fetchall(req))[0][0]
+
+        return max(-(-tamp // INVITERS_PER_PAGE), 1)
         
-    def rank_emoji(self, rang)->str:
+    @staticmethod
+    def rank_emoji(rang)->str:
         match rang:
             case 1:
                 return ':first_place:'
@@ -114,5 +206,9 @@ class Invite(commands.Cog):
 
 
 
+# Enregistrées une seule fois par le bot, voir ChillBot.add_persistent_views
+PERSISTENT_VIEWS = [InviterLeaderboardView]
+
+
 async def setup(bot: commands.Bot)->None:
-    await bot.add_cog(Invite(bot, bot.connections))
\ No newline at end of file
+    await bot.add_cog(Invite(bot, bot.database, bot.invites))
\ No newline at end of file
@@ -17,6 +17,9 @@ parent_folder = Path(__file__).resolve().parent
 
 
 class Moderation(commands.Cog):
+    # Fichiers json rechargés en place par HotReload : fichier -> attribut
+    CONFIG_FILES = {'channels': 'channels'}
+
     def __init__(self, bot: commands.Bot)->None:
         self.bot = bot
         self.channels = self.load_channels()
@@ -1,21 +1,33 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from pathlib import Path
 parent_folder = Path(__file__).resolve().parent
 import json
-import aiosqlite
 
 from dataclasses import dataclass
 from numpy import random as rd
-from datetime import datetime as dt
 
 
-from PIL import Image, ImageDraw
-from io import BytesIO
 import math
 
 from icecream import ic
+from utils.database import Database
+from utils.ranking import rank_engine
+from utils.leaderboard import Leaderboard
+from utils.write_buffer import WriteBuffer
+from utils.profile_cache import ProfileCache
+from utils.cooldown import CooldownStore
+from utils import level_curve
+from utils.render import Renderer
+from utils.persistent_view import PersistentView, footer_page
+
+
+# Écriture différée de l'xp gagnée en écrivant des messages
+XP_FLUSH_INTERVAL = 10      # secondes
+XP_FLUSH_SIZE = 100         # profils en attente
+PROFILE_CACHE_SIZE = 2000   # profils gardés en mémoire par serveur
+XP_COOLDOWN = 5             # secondes entre deux messages qui rapportent de l'xp
 
 
 def round_it(x:float, sig: int)->float:
@@ -38,54 +50,45 @@ def format_float(number):
     
 
 
-class ResetView(discord.ui.View):
-    def __init__(self, connection: aiosqlite.Connection, member_target: discord.Member)->None:
-        super().__init__()
-        self.connection = connection
-        self.member_target = member_target
+class ResetView(PersistentView):
+    """Confirmation de la remise à 0 de l'xp, le membre visé est mentionné dans le message"""
 
-
-    @discord.ui.button(label="Oui", style=discord.ButtonStyle.danger)
+    @discord.ui.button(label="Oui", style=discord.ButtonStyle.danger, custom_id="reset:Rank:confirm")
     async def confirmer(self, interaction: discord.Interaction, button: discord.ui.Button)->None:
         member = interaction.user
 
-        if member.guild_permissions.administrator:
-            res = "UPDATE Rank SET msg=0, xp=0, lvl=0, add_xp_counter=0, remove_xp_counter=0, added_xp=0, removed_xp=0 WHERE id==?"
-            await self.connection.execute(res, (self.member_target.id,))
-            await self.connection.commit()
-            
-            await self.update_classement()
-            await self.disable_all_buttons(interaction)
-            await interaction.response.defer()
-        else:
-            await interaction.response.send_message("Tu n'as pas la permission pour ça", ephemeral=True)
+        if not member.guild_permissions.administrator:
+            return await interaction.response.send_message("Tu n'as pas la permission pour ça", ephemeral=True)
+        if not (rank := interaction.client.get_cog('Rank')) or not interaction.message.raw_mentions:
+            return await interaction.response.send_message("Remise à 0 indisponible", ephemeral=True)
+
+        serveur = interaction.guild
+        target_id = interaction.message.raw_mentions[0]
+        res = "UPDATE Rank SET msg=0, xp=0, lvl=0, add_xp_counter=0, remove_xp_counter=0, added_xp=0, removed_xp=0 WHERE id==?"
+        # L'xp en attente d'écriture écraserait la remise à 0 : pas de flush en cours pendant l'écriture.
+        # Le profil n'est oublié qu'une fois l'écriture validée, sinon une lecture pendant
+        # l'écriture remettrait l'ancienne ligne en cache et le flush suivant la réécrirait
+        async with rank.xp_buffer.lock:
+            async with rank.database.write(serveur) as connection:
+                await connection.execute(res, (target_id,))
+            rank.forget_profile(serveur.id, target_id)
+        rank.leaderboard.record(serveur.id, target_id, 0)
+        
+        await self.disable_all_buttons(interaction)
 
 
-    @discord.ui.button(label="Non", style=discord.ButtonStyle.danger)
+    @discord.ui.button(label="Non", style=discord.ButtonStyle.danger, custom_id="reset:Rank:cancel")
     async def annuler(self, interaction: discord.Interaction, button: discord.ui.Button)->None:
         member = interaction.user
 
         if member.guild_permissions.administrator:
             await self.disable_all_buttons(interaction)
-            await interaction.response.defer()
         else:
             await interaction.response.send_message("Tu n'as pas la permission pour ça", ephemeral=True)
 
 
     async def disable_all_buttons(self, interaction: discord.Interaction)->None:
-        for child in self.children:
-            if type(child) == discord.ui.Button:
-                child.disabled = True
-        
-        await interaction.message.edit(view=self)
-        
-        
-    async def update_classement(self):
-        """Range par odre décroissant d'xp les membrs dans a bdd
-        """
-        req = "UPDATE Rank SET rang=DENSE_RANK() OVER (ORDER BY Rank.xp DESC) FROM Rank t2 WHERE t2.id = Rank.id"
-        await self.connection.execute(req)
-        await self.connection.commit()
+        await interaction.response.edit_message(view=self.components(disabled=True))
 
 
 
@@ -106,22 +109,19 @@ class XpProfile:
     current_xp: int=0
     
     def __post_init__(self):
-        next_lvl = self.lvl + 1
-        self.xp_needed = 5 * (next_lvl ** 2) + (50 * next_lvl) + 100
+        self.xp_needed = level_curve.xp_needed(self.lvl)
 
         self.current_xp = self.xp - self.xp_to_level(self.lvl)
 
 
     def check_lvl(self)->bool:
-        """Calcule le niveau à partir de l'xp totale
+        """Calcule le niveau à partir de l'xp totale, en sautant autant de niveaux que nécessaire
 
         Returns:
-            bool: _description_
+            bool: Si on a level up ou non
         """
         current_lvl = self.lvl
-        
-        if self.current_xp >= self.xp_needed:
-            self.lvl += 1
+        self.lvl = level_curve.level_from_xp(self.xp)
 
         self.__post_init__()
         return self.lvl > current_lvl
@@ -135,64 +135,24 @@ class XpProfile:
         Returns:
             int: Xp total requit pour le niveau
         """
-        return sum(5 * (i ** 2) + (50 * i) + 100 for i in range(lvl_target))
+        return level_curve.xp_for_level(lvl_target)
 
     def print_xp(self, xp: int)->str:
         rounded_xp = round_it(xp, 3)
         return rounded_xp if rounded_xp < 1e3 else f"{format_float(rounded_xp/1e3)}K"
     
-    def create_progress_bar(self, color: int | tuple=0x000000):
-        if isinstance(color, int):
-            color = self.color_hexa_to_rgb(color)
-            
-        width = 295
-        height = 20
-        corner_radius = 0
-        progress = self.current_xp/self.xp_needed
-        
-        # Créer une image avec un fond blanc
-        image = Image.new('RGB', (width, height), 'white')
-        draw = ImageDraw.Draw(image)
-
-        # Dessiner la barre de fond
-        draw.rounded_rectangle([0, 0, width, height], fill='white', radius=corner_radius)
-
-        # Calculer la largeur de la barre de progression
-        progress_width = int(width * progress)
-        # Dessiner la barre de progression
-        draw.rounded_rectangle([0, 0, progress_width, height], fill=color, radius=corner_radius)
-    
-        return self.discord_image(image, "progress_bar")
-    
-    def color_hexa_to_rgb(self, couleur: int)->tuple[int]:
-        """Transforme une couleur hexadécimal coder sur 3 octets
-        en tuple de int rgb correspondant à un octet chacun
-
-        Args:
-            couleur (int): Couleurs hexa (ex: 0xFF001E)
-
-        Returns:
-            tuple[int]: Couleurs en int (ex: (255 , 0 , 30))
-        """
-        r = couleur >> 16 & 0xFF
-        g = couleur >> 8 & 0xFF
-        b = couleur & 0xFF
-        return r , g , b
-
-    def discord_image(self, image: Image, name: str)->discord.File:
-        """Convertie une image PIL en fichier envoyable sur discord
+    async def create_progress_bar(self, renderer: Renderer, color: int | tuple=0x000000)->discord.File:
+        """Renvoie la barre de progression du profil, rendue hors de la boucle si absente du cache
 
         Args:
-            image (Image): Image à convertir
-            name (str): Nom à donner à l'image
+            renderer (Renderer): Pool de rendu du bot
+            color (int | tuple, optional): Couleur de la barre
 
         Returns:
-            discord.File: Image au format discord.File
+            discord.File: Image de la barre de progression
         """
-        image_byte = BytesIO()
-        image.save(image_byte, format='PNG')
-        image_byte.seek(0)
-        return discord.File(image_byte, filename=f'{name}.png') 
+        image = await renderer.progress_bar(self.current_xp/self.xp_needed, color)
+        return renderer.file(image, "progress_bar")
 
     def rank_emoji(self)->str:
         rang = self.rang
@@ -207,83 +167,97 @@ class XpProfile:
                 return f"{rang}:"
 
 
-class LeaderboardView(discord.ui.View):
-    def __init__(self, bot: commands.Bot, connection: aiosqlite.Connection, actual_page: int, total_page: int)->None:
-        super().__init__()
-        self.bot = bot
-        self.connection = connection
-        self.page = actual_page
-        self.total_page = total_page
-        self.cursor = 0
-    
+class LeaderboardView(PersistentView):
+    """Boutons du classement textuel, communs à tous les messages /leaderboard
+
+    La page affichée est relue dans le pied de l'embed du message cliqué.
+    """
            
-    @discord.ui.button(label="Précédent", emoji="⬅️")
+    @discord.ui.button(label="Précédent", emoji="⬅️", custom_id="leaderboard:Rank:previous")
     async def previous(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        if self.page == 1:
-            self.page = self.total_page
-            self.cursor = 5*(self.total_page - 1)
-        else:
-            self.page -= 1
-            self.cursor -= 5
-        
-        await self.update_msg(interaction)
+        page, total_page = footer_page(interaction.message)
+        await self.update_msg(interaction, total_page if page <= 1 else page - 1)
             
    
-    @discord.ui.button(label="Suivant", emoji="➡️")
+    @discord.ui.button(label="Suivant", emoji="➡️", custom_id="leaderboard:Rank:next")
     async def next(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        if self.page == self.total_page:
-            self.page = 1
-            self.cursor = 0
-        else:
-            self.page += 1
-            self.cursor += 5
-        
-        await self.update_msg(interaction)
+        page, total_page = footer_page(interaction.message)
+        await self.update_msg(interaction, 1 if page >= total_page else page + 1)
+
+
+    @discord.ui.button(label="Ma page", emoji="📍", custom_id="leaderboard:Rank:me")
+    async def my_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        if not (rank := interaction.client.get_cog('Rank')):
+            return await interaction.response.send_message("Classement indisponible", ephemeral=True)
+        # Les pages sont lues en bdd : la position doit y correspondre
+        await rank.flush_xp()
+        if (page := await rank.leaderboard.page_of(interaction.guild.id, interaction.user.id)) is None:
+            return await interaction.response.send_message("Tu n'es pas dans le classement", ephemeral=True)
+        await self.update_msg(interaction, page)
 
         
-    async def get_leaderboard(self) -> dict[XpProfile]:
-        """Renvoie un dictionnaire de tout les profils
+    @staticmethod
+    async def get_leaderboard(leaderboard: Leaderboard, serveur: discord.Guild, page: int) -> dict[int, XpProfile]:
+        """Renvoie les profils d'une page du classement
 
         Returns:
-            dict[XpProfile]: Profils de tout les membres
+            dict[int, XpProfile]: Profils de la page, par id
         """
-        req = f"SELECT * FROM Rank WHERE rang > {self.cursor} ORDER BY rang LIMIT 5"
-        stats = await self.connection.execute_fetchall(req)
-
+        stats = await leaderboard.page(serveur.id, page)
         return {stat[0]: XpProfile(*stat) for stat in stats}
 
-    async def update_msg(self, interaction: discord.Interaction):
-        res = await self.get_leaderboard()
+    async def build_embed(self, bot: commands.Bot, serveur: discord.Guild, page: int, author: discord.abc.User) -> discord.Embed:
+        leaderboard = bot.get_cog('Rank').leaderboard
+        total_page = await leaderboard.pages_count(serveur.id)
+        page = min(page, total_page)
+        res = await self.get_leaderboard(leaderboard, serveur, page)
 
         embed = discord.Embed(
                 title="Leaderboard textuel",
                 color=discord.Color.random()
             )
         
-        author = interaction.user
-        embed.set_author(icon_url=author.avatar.url,name=author.display_name)
+        embed.set_author(icon_url=author.display_avatar.url,name=author.display_name)
+        names = await bot.members.names(serveur, {id: stat.name for id, stat in res.items()}, 'Rank')
         for id , stat in res.items():
-            member = self.bot.get_user(id)
-            name = member.display_name if member else stat.name
-            embed.add_field(name=f"{stat.rank_emoji()} {name}", 
+            embed.add_field(name=f"{stat.rank_emoji()} {names[id]}", 
                                 value=f"Total XP: {stat.print_xp(stat.xp)}", 
                                 inline=False)
                 
-        embed.set_footer(text=f"{self.page}/{self.total_page}")
-        
+        embed.set_footer(text=f"{page}/{total_page}")
+        return embed
+
+    async def update_msg(self, interaction: discord.Interaction, page: int):
+        if not interaction.client.get_cog('Rank'):
+            return await interaction.response.send_message("Classement indisponible", ephemeral=True)
+        embed = await self.build_embed(interaction.client, interaction.guild, page, interaction.user)
         return await interaction.response.edit_message(embed=embed)
-        
-    
 
 
 class Rank(commands.Cog):
-    def __init__(self, bot: commands.Bot, connections: dict[str, aiosqlite.Connection])->None:
+    # Fichiers json rechargés en place par HotReload : fichier -> attribut
+    CONFIG_FILES = {'channels': 'channels', 'ignored_channels': 'ignored_channels', 'blocked': 'user_blocked'}
+
+    def __init__(self, bot: commands.Bot, database: Database)->None:
         self.bot = bot
-        self.connections = connections
-        self.last_message_time = {}
+        self.database = database
+        self.cooldowns = CooldownStore(XP_COOLDOWN)
         self.channels = self.load_channels()
         self.ignored_channels = self.load_json('ignored_channels')
         self.user_blocked = self.load_json('blocked')
+        self.xp_buffer = WriteBuffer(
+            "UPDATE Rank SET msg=?, xp=?, lvl=? WHERE id==?",
+            lambda stat: (stat.msg, stat.xp, stat.lvl, stat.id),
+            max_size=XP_FLUSH_SIZE
+        )
+        self.profiles = ProfileCache(PROFILE_CACHE_SIZE)
+        self.leaderboard = Leaderboard(database, rank_engine)
+        self.flush_loop.start()
+
+
+    async def cog_unload(self) -> None:
+        self.flush_loop.cancel()
+        await self.flush_xp()
         
 
     @commands.Cog.listener(name="on_ready")
@@ -292,6 +266,11 @@ class Rank(commands.Cog):
         self.channels = self.load_channels()
 
 
+    @tasks.loop(seconds=XP_FLUSH_INTERVAL)
+    async def flush_loop(self) -> None:
+        """Écrit périodiquement l'xp en attente dans la bdd"""
+        await self.flush_xp()
+
     
     @commands.hybrid_command(name='add_xp')
     async def add_xp(self, ctx: commands.Context, member_target: discord.Member, amout: int)->discord.Message:
@@ -308,7 +287,7 @@ class Rank(commands.Cog):
         member = ctx.author
 
         if member.guild_permissions.administrator:
-            await self.manage_xp('add', member_target.id, amout)
+            await self.manage_xp('add', member_target, amout)
             embed = discord.Embed(
                 title="Ajout d'XP",
                 description=f"{amout}XP ajouté à {member_target.display_name}",
@@ -334,7 +313,7 @@ class Rank(commands.Cog):
         member = ctx.author
 
         if member.guild_permissions.administrator:
-            await self.manage_xp('remove', member_target.id, amout)
+            await self.manage_xp('remove', member_target, amout)
             embed = discord.Embed(
                 title="Retrait d'XP",
                 description=f"{amout}XP retiré à {member_target.display_name}",
@@ -359,7 +338,8 @@ class Rank(commands.Cog):
         member = ctx.author
 
         if member.guild_permissions.administrator:
-            await ctx.send("Tu es sûr de vouloir faire ça ?", view=ResetView(self.connection,member_target))
+            await ctx.send(f"Tu es sûr de vouloir remettre à 0 l'xp de {member_target.mention} ?",
+                           view=ResetView.components(), allowed_mentions=discord.AllowedMentions.none())
         else:
             await ctx.send("Tu n'as pas la permission pour ça", ephemeral=True)
 
@@ -378,10 +358,11 @@ class Rank(commands.Cog):
         if not member:
             member = ctx.author
         
-        # Valeues attendue : id , name , msg , xp , lvl
-        if profile := await self.get_member_stats(member):
-            stat = XpProfile(*profile)
-            
+        # Le rang est calculé sur la bdd, on y écrit d'abord l'xp en attente
+        await self.flush_xp()
+        if stat := await self.get_member_stats(member):
+            async with self.database.read(ctx.guild) as connection:
+                stat.rang = await rank_engine.rank_of(connection, stat.xp)
             color = discord.Color.random()
             embed = discord.Embed(
                 title=f"Rank #{stat.rang}\t\t\t\tLevel {stat.lvl}",
@@ -393,7 +374,7 @@ class Rank(commands.Cog):
             embed.add_field(name="", value=f"{stat.print_xp(stat.current_xp)} / {stat.print_xp(stat.xp_needed)} XP", inline=True)
             embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar.url)
 
-            progress_bar = stat.create_progress_bar(int(color))
+            progress_bar = await stat.create_progress_bar(self.bot.renderer, int(color))
             embed.set_image(url="attachment://progress_bar.png")
             await ctx.send(embed=embed, file=progress_bar)
 
@@ -414,22 +395,10 @@ class Rank(commands.Cog):
         Returns:
             discord.Message: Message du leaderboard
         """
-        serveur = ctx.guild
-        embed = discord.Embed(
-            title="Leaderboard textuel",
-            color=discord.Color.random()
-        )
-        res = await self.get_leaderboard(serveur)
-        embed.set_author(icon_url=ctx.author.avatar.url,name=ctx.author.display_name)
-        for id , stat in res.items():
-            member = self.bot.get_user(id)
-            embed.add_field(name=f"{stat.rank_emoji()} {member.display_name}", value=f"Total XP: {stat.print_xp(stat.xp)}", inline=False)
-        
-        total_page = await self.pages_count(serveur)
-
-        embed.set_footer(text=f"{1}/{total_page}")
-        
-        return await ctx.send(embed=embed, view=LeaderboardView(self.bot, self.connections[serveur.name], 1, total_page))
+        await self.flush_xp()
+        view = LeaderboardView.components()
+        embed = await view.build_embed(self.bot, ctx.guild, 1, ctx.author)
+        return await ctx.send(embed=embed, view=view)
     
 
     @commands.Cog.listener(name='on_message')
@@ -441,8 +410,6 @@ class Rank(commands.Cog):
         """
         member = message.author
         serveur = message.guild
-        current_time = dt.now()
-
         # Ignore les channels choisit
         if message.channel.id in self.ignored_channels[message.guild.name].values():
             return
@@ -452,49 +419,51 @@ class Rank(commands.Cog):
             return
     
         # Cooldown
-        if (member.id in self.last_message_time 
-                and (current_time - self.last_message_time[member.id]).seconds < 5
-                ):
+        if not self.cooldowns.ready(serveur.id, member.id):
             return
         
         # Ajoute de l'xp au membre ou l'ajoute à la bdd si il est nouveau
         if profile := await self.get_member_stats(member):
             await self.on_message_xp(serveur, profile)
 
-            self.last_message_time[member.id] = current_time
+            self.cooldowns.start(serveur.id, member.id)
         else:
             await self.create_xp_profile(member)
             await self.message_sent(message)
             
     
     @commands.Cog.listener(name='on_raw_reaction_add')
-    async def message_reaction(self, reaction: discord.Reaction)->None:
-        member = reaction.member
-        
-        # Ignore les comptes bloqués et les bots
-        if member.id in self.user_blocked.values() or member.bot:
-            return
-        
-        # Ajoute de l'xp au membre ou l'ajoute à la bdd si il est nouveau
-        if profile := await self.get_member_stats(member.id):
-            await self.on_message_xp(profile, gain=1/5)
-
-        else:
-            await self.create_xp_profile(member)
-            await self.message_reaction(reaction)
+    async def reaction_add(self, payload: discord.RawReactionActionEvent)->None:
+        await self.message_reaction(payload, gain=1/5)
 
             
     @commands.Cog.listener(name='on_raw_reaction_remove')
-    async def message_reaction(self, reaction: discord.Reaction)->None:
-        member = self.bot.get_user(reaction.user_id)
+    async def reaction_remove(self, payload: discord.RawReactionActionEvent)->None:
+        await self.message_reaction(payload, gain=-1/5)
+
+
+    async def message_reaction(self, payload: discord.RawReactionActionEvent, gain: float)->None:
+        """Ajoute ou retire de l'xp à l'ajout ou au retrait d'une réaction
+
+        Args:
+            payload (discord.RawReactionActionEvent): Réaction
+            gain (float): Multiplicateur de l'xp gagnée
+        """
+        if (serveur := self.bot.get_guild(payload.guild_id)) is None:
+            return
+        member = payload.member or serveur.get_member(payload.user_id)
+        
+        # Ignore les comptes bloqués et les bots
+        if member is None or member.id in self.user_blocked.values() or member.bot:
+            return
         
         # Ajoute de l'xp au membre ou l'ajoute à la bdd si il est nouveau
         if profile := await self.get_member_stats(member):
-            await self.on_message_xp(profile, gain=-1/5)
+            await self.on_message_xp(serveur, profile, gain=gain)
 
         else:
             await self.create_xp_profile(member)
-            await self.message_reaction(reaction)
+            await self.message_reaction(payload, gain)
     
     
     async def manage_xp(self, action: str, member: discord.Member, amount: int):
@@ -505,33 +474,33 @@ class Rank(commands.Cog):
             member_id (int): Id du membre
             amount (int): Quantité d'xp
         """
-        serveur = member.guild
-        connection = self.connections[serveur.name]
-        stat = XpProfile(*await self.get_member_stats(member.id))
+        stat = await self.get_member_stats(member)
         
+        stat.name = member.name
         if action == 'add':
             stat.xp += amount
-            xp_counter = stat.add_xp_counter + 1
+            xp_counter = stat.add_xp_counter = (stat.add_xp_counter or 0) + 1
+            stat.added_xp = amount
             res = "UPDATE Rank SET name=?, xp=?, lvl=?, add_xp_counter=?, added_xp=? WHERE id==?"
         elif action == 'remove':
             stat.xp -= amount
-            xp_counter = stat.remove_xp_counter + 1
+            xp_counter = stat.remove_xp_counter = (stat.remove_xp_counter or 0) + 1
+            stat.removed_xp = amount
             res = "UPDATE Rank SET name=?, xp=?, lvl=?, remove_xp_counter=?, removed_xp=? WHERE id==?"
             
         stat.check_lvl()
 
-        await connection.execute(res, (member.name, stat.xp, stat.lvl, xp_counter, amount, stat.id))
-        await connection.commit()
-
-        await self.update_classement()
+        async with self.database.write(member.guild) as connection:
+            await connection.execute(res, (member.name, stat.xp, stat.lvl, xp_counter, amount, stat.id))
+        self.leaderboard.record(member.guild.id, stat.id, stat.xp)
     
     async def on_message_xp(self, serveur: discord.Guild, stat: tuple | XpProfile, gain: int=1):
-        """Ajoute de l'xp au membre et regard si il a level up
+        """Ajoute de l'xp au membre et regard si il a level up.
+        L'écriture en bdd est différée, le level up est annoncé tout de suite.
 
         Args:
             stat (tuple | XpProfile): Stats du membre
         """
-        connection = self.connections[serveur.name]
         if isinstance(stat, tuple):
             stat = XpProfile(*stat)
         
@@ -542,19 +511,23 @@ class Rank(commands.Cog):
                 channel = self.channels[serveur.name]['rank']
                 await channel.send(f"<@{stat.id}> Tu viens de passer niveau {stat.lvl} à l'écris !")
 
-        res = "UPDATE Rank SET msg=?, xp=?, lvl=? WHERE id==?"
-        await connection.execute(res, (stat.msg, stat.xp, stat.lvl, stat.id))
-        await connection.commit()
+        self.profiles.put(serveur.id, stat.id, stat)
+        self.leaderboard.update(serveur.id, stat.id, stat.xp)
+        if self.xp_buffer.put(serveur.id, stat.id, stat):
+            await self.flush_xp()
 
-        await self.update_classement(serveur)
+    async def flush_xp(self) -> int:
+        """Écrit l'xp en attente de tout les serveurs dans la bdd
 
-    async def update_classement(self, serveur: discord.Guild)->None:
-        """Range par odre décroissant d'xp les membrs dans a bdd
+        Returns:
+            int: Nombre de profils écrits
         """
-        connection = self.connections[serveur.name]
-        req = "UPDATE Rank SET rang=DENSE_RANK() OVER (ORDER BY Rank.xp DESC) FROM Rank t2 WHERE t2.id = Rank.id"
-        await connection.execute(req)
-        await connection.commit()
+        guilds = self.xp_buffer.guilds()
+        if written := await self.xp_buffer.flush(self.database):
+            # Les pages des autres serveurs restent valides (et le keyset utilisable)
+            for guild_id in guilds:
+                self.leaderboard.invalidate(guild_id)
+        return written
     
     async def create_xp_profile(self, member: discord.Member)->None:
         """Ajoutes une ligne à la base de donnée pour le membre
@@ -565,29 +538,46 @@ class Rank(commands.Cog):
         if member.id == self.bot.user.id:
             return
         serveur = member.guild
-        connection = self.connections[serveur.name]
 
         req = "INSERT INTO Rank (id, name, msg, xp, lvl) VALUES (?,?,?,?,?)"
-        await connection.execute(req, (member.id, member.name, 0, 0, 0))
+        async with self.database.write(serveur) as connection:
+            await connection.execute(req, (member.id, member.name, 0, 0, 0))
+        self.profiles.put(serveur.id, member.id, XpProfile(member.id, member.name, 0, 0, 0, None, None, None, None, None))
+        self.leaderboard.record(serveur.id, member.id, 0)
+
+    def forget_profile(self, guild_id: int, member_id: int) -> None:
+        """Oublie le profil en mémoire d'un membre (en attente d'écriture et en cache)
 
-        await connection.commit()
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+        """
+        self.xp_buffer.discard(guild_id, member_id)
+        self.profiles.discard(guild_id, member_id)
 
-    async def get_member_stats(self, member: discord.Member)->XpProfile:
-        """Renvoie les stats d'un membre
+    async def get_member_stats(self, member: discord.Member)->XpProfile | None:
+        """Renvoie les stats d'un membre depuis le cache, et depuis la bdd au premier accès
 
         Args:
             member_id (int): Membre
 
         Returns:
-            XpProfile: Stats du membre
+            XpProfile | None: Stats du membre
         """
         serveur = member.guild
-        connection = self.connections[serveur.name]
-        req = "SELECT * FROM Rank WHERE id==?"
-        curseur = await connection.execute(req, (member.id,))
+        if stat := self.profiles.get(serveur.id, member.id) or self.xp_buffer.get(serveur.id, member.id):
+            return stat
 
-        # Valeures attendue : id , name , msg , xp , lvl , rang , add_xp_counter ...
-        return await curseur.fetchone()
+        req = rank_engine.select(where="id==?")
+        async with self.database.read(serveur) as connection:
+            curseur = await connection.execute(req, (member.id,))
+            # Valeures attendue : id , name , msg , xp , lvl , rang , add_xp_counter ...
+            profile = await curseur.fetchone()
+
+        if profile:
+            stat = XpProfile(*profile)
+            self.profiles.put(serveur.id, member.id, stat)
+            return stat
     
     async def get_all_member_stats(self, serveur: discord.Guild) -> dict[XpProfile]:
         """Renvoie un dictionnaire de tout les profils
@@ -595,40 +585,12 @@ class Rank(commands.Cog):
         Returns:
             dict[XpProfile]: Profils de tout les membres
         """
-        connection = self.connections[serveur.name]
-        req = "SELECT * FROM Rank"
-        stats = await connection.execute_fetchall(req)
+        req = rank_engine.select()
+        async with self.database.read(serveur) as connection:
+            stats = await connection.execute_fetchall(req)
 
         return {stat[0]: XpProfile(*stat) for stat in stats}
    
-    async def get_leaderboard(self, serveur: discord.Guild, limit: int=5) -> dict[XpProfile]:
-        """Renvoie un dictionnaire de tout les profils
-
-        Returns:
-            dict[XpProfile]: Profils de tout les membres
-        """
-        connection = self.connections[serveur.name]
-        req = f"SELECT * FROM Rank ORDER BY rang LIMIT {limit}"
-        stats = await connection.execute_fetchall(req)
-
-        return {stat[0]: XpProfile(*stat) for stat in stats}
-   
-    async def pages_count(self, serveur: discord.Guild) -> int:
-        """Renvoie le nombre de page totale du leaderboard
-
-        Returns:
-            int: Nombre de page totale
-        """
-        connection = self.connections[serveur.name]
-        req = f"SELECT count(*) FROM Rank"
-        res = await connection.execute(req)
-        tamp = (await res.fetchone())[0]
-
-        if tamp % 5:
-            return  tamp // 5 + 1
-        else:
-            return  tamp // 5
-   
     def load_channels(self) -> dict[str, dict[str, discord.TextChannel|discord.VoiceChannel]]:
         """Renvoie un dictionnaire contenant les channels du serveur avec comme clé leur nom
 
@@ -659,5 +621,9 @@ class Rank(commands.Cog):
 
 
 
+# Enregistrées une seule fois par le bot, voir ChillBot.add_persistent_views
+PERSISTENT_VIEWS = [ResetView, LeaderboardView]
+
+
 async def setup(bot: commands.Bot)->None:
-    await bot.add_cog(Rank(bot, bot.connections))
\ No newline at end of file
+    await bot.add_cog(Rank(bot, bot.database))
\ No newline at end of file
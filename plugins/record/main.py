@@ -7,22 +7,29 @@ parent_folder = Path(__file__).resolve().parent
 import json
 
 from dataclasses import dataclass
-import aiosqlite
 
 
 from icecream import ic
+from utils.database import Database
+from utils.voice_events import VoiceEvent, VoiceEventType
 
 
 
 
 
 class Record(commands.Cog):
-    def __init__(self, bot: commands.Bot, connections: dict[str, aiosqlite.Connection])->None:
+    # Fichiers json rechargés en place par HotReload : fichier -> attribut
+    CONFIG_FILES = {'channels': 'channels'}
+
+    def __init__(self, bot: commands.Bot, database: Database)->None:
         self.bot = bot
-        self.connections = connections
+        self.database = database
         self.channels = self.load_channels()
-        self.voice_time_counter = {}
-        self.vc = None
+        bot.voice_events.subscribe('record.auto_leave', self.auto_leave_channel, VoiceEventType.LEAVE | VoiceEventType.MOVE, order=40, locked=False)
+
+
+    async def cog_unload(self) -> None:
+        self.bot.voice_events.unsubscribe('record.auto_leave')
         
     
     @commands.Cog.listener(name="on_ready")
@@ -58,17 +65,16 @@ class Record(commands.Cog):
             return await ctx.send("Je ne suis pas connecté en vocal")
     
     
-    @commands.Cog.listener(name="on_voice_state_update")
-    async def auto_leave_channel(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState)->None:
-        """Le bot se déconnecte automatique du salon vocal si plus personne n'y est
+    async def auto_leave_channel(self, event: VoiceEvent)->None:
+        """Le bot se déconnecte automatique du salon vocal si plus aucun humain n'y est
         
         Args:
-            ctx: (commands.Context): Contexte de la commande
+            event (VoiceEvent): Déconnexion ou changement de salon
         """
-        if voice_clients := self.bot.voice_clients:
-            if before.channel == voice_clients[0] and not self.voice_channel_enought_filled(before):
-                await self.stop_record()
-                await self.bot.voice_clients[0].disconnect()
+        voice_client = event.guild.voice_client
+        if voice_client and event.left == voice_client.channel and not any(not member.bot for member in event.left.members):
+            self.stop(voice_client)
+            await voice_client.disconnect()
     
     
     @commands.hybrid_command(name="record")
@@ -83,14 +89,30 @@ class Record(commands.Cog):
     
     
     @commands.hybrid_command(name="stop_record")
-    async def stop_record(self, ctx: commands.Context=None)->None:
-        """Le bot se déconnecte du salon vocal
+    async def stop_record(self, ctx: commands.Context)->None:
+        """Arrête l'enregistrement en cours
         
         Args:
             ctx: (commands.Context): Contexte de la commande
         """
-        if self.bot.voice_clients:
-            await self.bot.voice_clients
+        if not self.stop(ctx.guild.voice_client):
+            return await ctx.send("Je ne suis pas connecté en vocal")
+
+
+    def stop(self, voice_client: discord.VoiceClient | None) -> bool:
+        """Arrête ce que le bot joue ou enregistre dans le salon vocal
+
+        Args:
+            voice_client (discord.VoiceClient | None): Connexion vocale du serveur
+
+        Returns:
+            bool: Le bot était connecté en vocal
+        """
+        if voice_client is None:
+            return False
+        if voice_client.is_playing():
+            voice_client.stop()
+        return True
    
 
     
@@ -132,4 +154,4 @@ class Record(commands.Cog):
 
 
 async def setup(bot: commands.Bot)->None:
-    await bot.add_cog(Record(bot, bot.connections))
\ No newline at end of file
+    await bot.add_cog(Record(bot, bot.database))
\ No newline at end of file
@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import asyncio
 
 from pathlib import Path
@@ -7,22 +7,32 @@ parent_folder = Path(__file__).resolve().parent
 import json
 
 from dataclasses import dataclass
-import aiosqlite
-import time
 import math
-from PIL import Image, ImageDraw
-from io import BytesIO
+import time
 from datetime import datetime as dt, timedelta
 
 
-from icecream import ic
 
 from logs.logger_config import setup_logger
+from utils.database import Database
+from utils.ranking import vocal_engine
+from utils.leaderboard import Leaderboard
+from utils import level_curve
+from utils.render import Renderer
+from utils.persistent_view import PersistentView, footer_page
+from utils.voice_sessions import VoiceSession, VoiceSessions, VoiceState
+from utils.voice_events import VoiceEvent, VoiceEventType
+from utils.temp_channels import TempChannels
 
 
 logger = setup_logger()
 
 
+ACCRUAL_INTERVAL = 60       # secondes entre deux crédits (et sauvegardes) du temps des sessions vocales
+TEMP_CHANNELS_INTERVAL = 10 # minutes entre deux nettoyages des salons temporaires
+RESUME_GAP = 600            # interruption maximale (rechargement, redémarrage) comptée comme du temps passé
+
+
 def round_it(x:float, sig: int)->float:
     """Arrondi à nombre au neme chiffre signifactif
 
@@ -45,55 +55,40 @@ def format_float(number):
 
 
 
-class ResetView(discord.ui.View):
-    def __init__(self, connection: aiosqlite.Connection, member_target: discord.Member)->None:
-        super().__init__()
-        self.connection = connection
-        self.member_target = member_target
+class ResetView(PersistentView):
+    """Confirmation de la remise à 0 du temps vocal, le membre visé est mentionné dans le message"""
 
-
-    @discord.ui.button(label="Oui", style=discord.ButtonStyle.danger)
+    @discord.ui.button(label="Oui", style=discord.ButtonStyle.danger, custom_id="reset:Vocal:confirm")
     async def confirmer(self, interaction: discord.Interaction, button: discord.ui.Button)->None:
         member = interaction.user
 
-        if member.guild_permissions.administrator:
-            res = "UPDATE Vocal SET time=0, afk=0, lvl=0, add_xp_counter=0, remove_xp_counter=0, added_xp=0, removed_xp=0 WHERE id==?"
-            await self.connection.execute(res, (self.member_target.id,))
-            await self.connection.commit()
-            
-            await self.update_classement()
-            await self.disable_all_buttons(interaction)
-            await interaction.response.defer()
-        else:
-            await interaction.response.send_message("Tu n'as pas la permission pour ça", ephemeral=True)
+        if not member.guild_permissions.administrator:
+            return await interaction.response.send_message("Tu n'as pas la permission pour ça", ephemeral=True)
+        if not (vocal := interaction.client.get_cog('Vocal')) or not interaction.message.raw_mentions:
+            return await interaction.response.send_message("Remise à 0 indisponible", ephemeral=True)
+
+        serveur = interaction.guild
+        target_id = interaction.message.raw_mentions[0]
+        res = "UPDATE Vocal SET time=0, afk=0, lvl=0, add_xp_counter=0, remove_xp_counter=0, added_xp=0, removed_xp=0 WHERE id==?"
+        async with vocal.database.write(serveur) as connection:
+            await connection.execute(res, (target_id,))
+        vocal.leaderboard.record(serveur.id, target_id, 0)
+        
+        await self.disable_all_buttons(interaction)
 
 
-    @discord.ui.button(label="Non", style=discord.ButtonStyle.danger)
+    @discord.ui.button(label="Non", style=discord.ButtonStyle.danger, custom_id="reset:Vocal:cancel")
     async def annuler(self, interaction: discord.Interaction, button: discord.ui.Button)->None:
         member = interaction.user
 
         if member.guild_permissions.administrator:
             await self.disable_all_buttons(interaction)
-            await interaction.response.defer()
         else:
             await interaction.response.send_message("Tu n'as pas la permission pour ça", ephemeral=True)
 
 
     async def disable_all_buttons(self, interaction: discord.Interaction)->None:
-        for child in self.children:
-            if type(child) == discord.ui.Button:
-                child.disabled = True
-        
-        await interaction.message.edit(view=self)
-        
-        
-    async def update_classement(self):
-        """Range par odre décroissant d'xp les membrs dans a bdd
-        """
-        req = "UPDATE Vocal SET rang=DENSE_RANK() OVER (ORDER BY Vocal.time DESC) FROM Vocal t2 WHERE t2.id = Vocal.id"
-        await self.connection.execute(req)
-        await self.connection.commit()
-
+        await interaction.response.edit_message(view=self.components(disabled=True))
 
 
 
@@ -119,22 +114,19 @@ class VocalProfile:
         """Calcule l'xp requit et l'xp avant le prochain lvl
         après l'initialisation de l'instance
         """
-        next_lvl = self.lvl + 1
-        self.xp_needed = 5 * (next_lvl ** 2) + (50 * next_lvl) + 100
+        self.xp_needed = level_curve.xp_needed(self.lvl)
 
         self.current_xp = self.time_spend - self.time_to_level(self.lvl)
 
     
     def check_lvl(self)->bool:
-        """Calcule le niveau à partir de l'xp totale
+        """Calcule le niveau à partir de l'xp totale, en sautant autant de niveaux que nécessaire
 
         Returns:
             bool: Si on a rank up ou non
         """
         current_lvl = self.lvl
-        
-        if self.current_xp >= self.xp_needed:
-            self.lvl += 1
+        self.lvl = level_curve.level_from_xp(self.time_spend)
 
         self.__post_init__()
         return self.lvl > current_lvl
@@ -148,7 +140,7 @@ class VocalProfile:
         Returns:
             int: Xp total requit pour le niveau
         """
-        return sum(5 * (i ** 2) + (50 * i) + 100 for i in range(lvl_target))
+        return level_curve.xp_for_level(lvl_target)
 
     def print_tps(self, time_spend: int) -> str:
         if time_spend < 60:
@@ -161,59 +153,18 @@ class VocalProfile:
         )
         
     
-    def create_progress_bar(self, color: int | tuple=0x000000)->discord.File:
-        if isinstance(color, int):
-            color = self.color_hexa_to_rgb(color)
-            
-        width = 295
-        height = 20
-        corner_radius = 0
-        progress = self.current_xp/self.xp_needed
-        
-        # Créer une image avec un fond blanc
-        image = Image.new('RGB', (width, height), 'white')
-        draw = ImageDraw.Draw(image)
-
-        # Dessiner la barre de fond
-        draw.rounded_rectangle([0, 0, width, height], fill='white', radius=corner_radius)
-
-        # Calculer la largeur de la barre de progression
-        progress_width = int(width * progress)
-        # Dessiner la barre de progression
-        draw.rounded_rectangle([0, 0, progress_width, height], fill=color, radius=corner_radius)
-
-        return self.discord_image(image, "progress_bar")
-
-    def color_hexa_to_rgb(self, couleur: int)->tuple[int]:
-        """Transforme une couleur hexadécimal coder sur 3 octets
-        en tuple de int rgb correspondant à un octet chacun
-
-        Args:
-            couleur (int): Couleurs hexa (ex: 0xFF001E)
-
-        Returns:
-            tuple[int]: Couleurs en int (ex: (255 , 0 , 30))
-        """
-        r = couleur >> 16 & 0xFF
-        g = couleur >> 8 & 0xFF
-        b = couleur & 0xFF
-        return r , g , b
-
-    def discord_image(self, image: Image, name: str)->discord.File:
-        """Convertie une image PIL en fichier envoyable sur discord
+    async def create_progress_bar(self, renderer: Renderer, color: int | tuple=0x000000)->discord.File:
+        """Renvoie la barre de progression du profil, rendue hors de la boucle si absente du cache
 
         Args:
-            image (Image): Image à convertir
-            name (str): Nom à donner à l'image
+            renderer (Renderer): Pool de rendu du bot
+            color (int | tuple, optional): Couleur de la barre
 
         Returns:
-            discord.File: Image au format discord.File
+            discord.File: Image de la barre de progression
         """
-        image_byte = BytesIO()
-        image.save(image_byte, format='PNG')
-        image_byte.seek(0)
-        
-        return discord.File(image_byte, filename=f'{name}.png') 
+        image = await renderer.progress_bar(self.current_xp/self.xp_needed, color)
+        return renderer.file(image, "progress_bar")
 
     def rank_emoji(self)->str:
         rang = self.rang
@@ -229,92 +180,308 @@ class VocalProfile:
 
 
 
-class LeaderboardView(discord.ui.View):
-    def __init__(self, bot: commands.Bot, connection: aiosqlite.Connection, actual_page: int, total_page: int)->None:
-        super().__init__()
-        self.bot = bot
-        self.connection = connection
-        self.page = actual_page
-        self.total_page = total_page
-        self.cursor = 0
-    
+class LeaderboardView(PersistentView):
+    """Boutons du classement vocal, communs à tous les messages /vleaderboard
+
+    La page affichée est relue dans le pied de l'embed du message cliqué.
+    """
            
-    @discord.ui.button(label="Précédent", emoji="⬅️")
+    @discord.ui.button(label="Précédent", emoji="⬅️", custom_id="leaderboard:Vocal:previous")
     async def previous(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        if self.page == 1:
-            self.page = self.total_page
-            self.cursor = 5*(self.total_page - 1)
-        else:
-            self.page -= 1
-            self.cursor -= 5
-            
-        await self.update_msg(interaction)
+        page, total_page = footer_page(interaction.message)
+        await self.update_msg(interaction, total_page if page <= 1 else page - 1)
             
    
-    @discord.ui.button(label="Suivant", emoji="➡️")
+    @discord.ui.button(label="Suivant", emoji="➡️", custom_id="leaderboard:Vocal:next")
     async def next(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        if self.page == self.total_page:
-            self.page = 1
-            self.cursor = 0
-        else:
-            self.page += 1
-            self.cursor += 5
-            
-        await self.update_msg(interaction)
+        page, total_page = footer_page(interaction.message)
+        await self.update_msg(interaction, 1 if page >= total_page else page + 1)
+
+
+    @discord.ui.button(label="Ma page", emoji="📍", custom_id="leaderboard:Vocal:me")
+    async def my_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        if not (vocal := interaction.client.get_cog('Vocal')):
+            return await interaction.response.send_message("Classement indisponible", ephemeral=True)
+        if (page := await vocal.leaderboard.page_of(interaction.guild.id, interaction.user.id)) is None:
+            return await interaction.response.send_message("Tu n'es pas dans le classement", ephemeral=True)
+        await self.update_msg(interaction, page)
 
         
-    async def get_leaderboard(self) -> dict[VocalProfile]:
-        """Renvoie un dictionnaire de tout les profils
+    @staticmethod
+    async def get_leaderboard(leaderboard: Leaderboard, serveur: discord.Guild, page: int) -> dict[int, VocalProfile]:
+        """Renvoie les profils d'une page du classement
 
         Returns:
-            dict[XpProfile]: Profils de tout les membres
+            dict[int, VocalProfile]: Profils de la page, par id
         """
-        req = f"SELECT * FROM Vocal WHERE rang > {self.cursor} ORDER BY rang LIMIT 5"
-        stats = await self.connection.execute_fetchall(req)
-
+        stats = await leaderboard.page(serveur.id, page)
         return {stat[0]: VocalProfile(*stat) for stat in stats}
-    
-    async def update_msg(self, interaction: discord.Integration):
-        res = await self.get_leaderboard()
+
+    async def build_embed(self, bot: commands.Bot, serveur: discord.Guild, page: int, author: discord.abc.User) -> discord.Embed:
+        leaderboard = bot.get_cog('Vocal').leaderboard
+        total_page = await leaderboard.pages_count(serveur.id)
+        page = min(page, total_page)
+        res = await self.get_leaderboard(leaderboard, serveur, page)
 
         embed = discord.Embed(
                 title="Leaderboard vocal",
                 color=discord.Color.random()
             )
         
-        author = interaction.user
-        embed.set_author(icon_url=author.avatar.url,name=author.display_name)
+        embed.set_author(icon_url=author.display_avatar.url,name=author.display_name)
+        names = await bot.members.names(serveur, {id: stat.name for id, stat in res.items()}, 'Vocal')
         for id , stat in res.items():
-            member = self.bot.get_user(id)
-            name = member.display_name if member else stat.name
-            embed.add_field(name=f"{stat.rank_emoji()} {name}",
-                            value=f"Total Tps: {stat.print_tps(stat.time_spend)}",
-                            inline=False)
-            
-        embed.set_footer(text=f"{self.page}/{self.total_page}")
-        
+            embed.add_field(name=f"{stat.rank_emoji()} {names[id]}", 
+                                value=f"Total Tps: {stat.print_tps(stat.time_spend)}", 
+                                inline=False)
+                
+        embed.set_footer(text=f"{page}/{total_page}")
+        return embed
+
+    async def update_msg(self, interaction: discord.Interaction, page: int):
+        if not interaction.client.get_cog('Vocal'):
+            return await interaction.response.send_message("Classement indisponible", ephemeral=True)
+        embed = await self.build_embed(interaction.client, interaction.guild, page, interaction.user)
         return await interaction.response.edit_message(embed=embed)
-    
 
 
 
 
 class Vocal(commands.Cog):
-    def __init__(self, bot: commands.Bot, connections: dict[str, aiosqlite.Connection]) -> None:
+    # Fichiers json rechargés en place par HotReload : fichier -> attribut
+    CONFIG_FILES = {'channels': 'channels', 'category': 'category', 'blocked': 'user_blocked'}
+
+    def __init__(self, bot: commands.Bot, database: Database) -> None:
         self.bot = bot
-        self.connections = connections
+        self.database = database
         self.channels = self.load_channels()
         self.category = self.load_json('category')
         self.user_blocked = self.load_json('blocked')
-        self.own_channels: dict[int, discord.VoiceChannel] = {}
-        self.voice_time_counter: dict[tuple[str, str], any] = {}
-        self.vc = None
+        self.temp_channels = TempChannels(database)
+        self.sessions = VoiceSessions()
+        self.leaderboard = Leaderboard(database, vocal_engine)
+        # Ordre d'exécution pour un même event : la session sous le verrou, les appels à l'API ensuite
+        events = bot.voice_events
+        events.subscribe('vocal.sessions', self.track_voice_session, order=10)
+        events.subscribe('vocal.create_channel', self.create_your_channel, VoiceEventType.JOIN | VoiceEventType.MOVE, order=20, locked=False)
+        events.subscribe('vocal.end_channel', self.end_your_channel, VoiceEventType.LEAVE | VoiceEventType.MOVE, order=30, locked=False)
+        # Serveurs qui ont des sessions sauvegardées en bdd
+        self.checkpointed: set[int] = set()
+        # Serveurs dont les sessions sauvegardées ont été reprises
+        self.reconciled_guilds: set[int] = set()
+        self.reconciled = False
+        self.reconcile_lock = asyncio.Lock()
+        # Écriture du dernier relevé, protégée de l'annulation de accrual_loop
+        self.writing: asyncio.Future | None = None
+        self.accrual_loop.start()
+        self.temp_channels_loop.start()
+
+
+    async def cog_load(self) -> None:
+        # Après un rechargement, on_ready n'est plus appelé
+        if self.bot.is_ready():
+            await self.reconcile()
+
+    async def cog_unload(self) -> None:
+        for name in ('vocal.sessions', 'vocal.create_channel', 'vocal.end_channel'):
+            self.bot.voice_events.unsubscribe(name)
+        self.accrual_loop.cancel()
+        self.temp_channels_loop.cancel()
+        await self.accrue()
         
     
     @commands.Cog.listener(name="on_ready")
     async def init_vocal(self) -> None:
         """Comme un __post_init__ mais sur l'event on_ready"""
         self.channels = self.load_channels()
+        await self.reconcile()
+
+
+    @tasks.loop(seconds=ACCRUAL_INTERVAL)
+    async def accrual_loop(self) -> None:
+        """Crédite périodiquement le temps passé en vocal, quel que soit le nombre de connexions"""
+        await self.accrue()
+
+    async def accrue(self) -> None:
+        """Crédite le temps de toutes les sessions vocales et sauvegarde celles en cours,
+        en une transaction par serveur
+        """
+        if not self.reconciled and self.bot.is_ready():
+            # Nouvel essai pour les serveurs dont la lecture avait échoué
+            await self.reconcile()
+        if not self.reconciled:
+            # Les sessions sauvegardées n'ont pas encore été reprises, ne pas les écraser.
+            # Le temps reste dans les sessions jusqu'au prochain passage
+            return
+        if self.writing and not self.writing.done():
+            # Relevé précédent annulé en cours d'écriture (cog_unload) : il finit d'abord
+            await asyncio.wait([self.writing])
+
+        now = time.time()
+        # serveur -> membre -> [temps vocal, temps afk] en secondes
+        credits: dict[int, dict[int, list[int]]] = {}
+        checkpoints: dict[int, list[tuple]] = {}
+        # serveur -> (session, temps vocal, temps afk) retirés, rendus si l'écriture échoue
+        taken: dict[int, list[tuple[VoiceSession, int, int]]] = {}
+        for session in self.sessions.collect():
+            if not session.counted:
+                continue
+            time_spend, afk = session.take()
+            taken.setdefault(session.guild_id, []).append((session, time_spend, afk))
+            if time_spend or afk:
+                credit = credits.setdefault(session.guild_id, {}).setdefault(session.member_id, [0, 0])
+                credit[0] += time_spend
+                credit[1] += afk
+            if self.sessions.get(session.guild_id, session.member_id) is session:
+                checkpoints.setdefault(session.guild_id, []).append(session.row(now))
+
+        # Le temps est déjà retiré des sessions : annuler l'écriture le perdrait
+        self.writing = asyncio.ensure_future(self.write_accrual(credits, checkpoints, taken))
+        await asyncio.shield(self.writing)
+
+    async def write_accrual(self, credits: dict[int, dict[int, list[int]]], checkpoints: dict[int, list[tuple]],
+                            taken: dict[int, list[tuple[VoiceSession, int, int]]]) -> None:
+        """Écrit un relevé serveur par serveur, rend le temps retiré aux sessions des serveurs en échec"""
+        failed = set()
+        for guild_id in credits.keys() | checkpoints.keys() | self.checkpointed:
+            if not await self.write_sessions(guild_id, credits.get(guild_id, {}), checkpoints.get(guild_id, [])):
+                failed.add(guild_id)
+                self.restore(taken.get(guild_id, []))
+        # Les sessions sauvegardées d'un serveur en échec sont toujours en bdd
+        self.checkpointed = set(checkpoints) | failed
+
+    def restore(self, taken: list[tuple[VoiceSession, int, int]]) -> None:
+        """Rend aux sessions le temps retiré par un relevé qui n'a pas pu être écrit,
+        les sessions terminées attendent le prochain relevé
+
+        Args:
+            taken (list[tuple[VoiceSession, int, int]]): Sessions et temps vocal, temps afk retirés
+        """
+        for session, time_spend, afk in taken:
+            session.active += time_spend
+            session.afk += afk
+            if self.sessions.get(session.guild_id, session.member_id) is not session:
+                self.sessions.closed.append(session)
+
+    async def write_sessions(self, guild_id: int, credits: dict[int, list[int]], checkpoints: list[tuple]) -> bool:
+        """Crédite le temps vocal des membres d'un serveur et remplace ses sessions sauvegardées
+
+        Args:
+            guild_id (int): Id du serveur
+            credits (dict[int, list[int]]): Temps vocal et temps afk à ajouter (secondes), par membre
+            checkpoints (list[tuple]): Lignes VoiceSessions des sessions en cours
+
+        Returns:
+            bool: La transaction a été écrite
+        """
+        serveur = self.bot.get_guild(guild_id)
+        updates = []
+        level_ups = []
+        try:
+            async with self.database.write(guild_id) as connection:
+                if credits:
+                    ids = list(credits)
+                    # Créer les profils vocaux qui n'existent pas
+                    await connection.executemany(
+                        "INSERT OR IGNORE INTO Vocal (id, name, time, afk, lvl) VALUES (?,?,0,0,0)",
+                        [(member_id, member.name if serveur and (member := serveur.get_member(member_id)) else None) for member_id in ids]
+                    )
+                    profiles = await connection.execute_fetchall(
+                        f"SELECT id, time, afk, lvl FROM Vocal WHERE id IN ({','.join('?' * len(ids))})", ids
+                    )
+                    times = [(time_spend or 0) + credits[member_id][0] // 60 for member_id, time_spend, _, _ in profiles]
+                    levels = level_curve.levels_from_xp(times)
+                    for (member_id, _, afk, lvl), time_spend, new_lvl in zip(profiles, times, levels):
+                        updates.append((time_spend, (afk or 0) + credits[member_id][1], int(new_lvl), member_id))
+                        if new_lvl > (lvl or 0):
+                            level_ups.append((member_id, int(new_lvl)))
+                    await connection.executemany("UPDATE Vocal SET time=?, afk=?, lvl=? WHERE id==?", updates)
+
+                await connection.execute("DELETE FROM VoiceSessions")
+                await connection.executemany(
+                    "INSERT INTO VoiceSessions (id, channel_id, state, active, afk, checkpoint) VALUES (?,?,?,?,?,?)",
+                    checkpoints
+                )
+        except Exception as error:
+            logger.error(f"{guild_id}: crédit du temps vocal impossible ({error.__class__.__name__} {error})")
+            return False
+
+        for time_spend, _, _, member_id in updates:
+            self.leaderboard.update(guild_id, member_id, time_spend)
+        if updates:
+            # Une seule mise à jour du classement par passage
+            self.leaderboard.invalidate(guild_id)
+
+        if level_ups and serveur:
+            channel: discord.TextChannel = self.channels.get(serveur.name, {}).get('rank')
+            for member_id, lvl in level_ups:
+                if channel:
+                    await channel.send(f"<@{member_id}> Tu viens de passer niveau {lvl} en vocal !")
+        return True
+
+    @tasks.loop(minutes=TEMP_CHANNELS_INTERVAL)
+    async def temp_channels_loop(self) -> None:
+        """Au démarrage puis périodiquement, nettoie les salons temporaires restés vides"""
+        for serveur in self.bot.guilds:
+            try:
+                await self.temp_channels.reconcile(serveur)
+            except Exception as error:
+                logger.error(f"{serveur.name}: nettoyage des salons temporaires impossible ({error.__class__.__name__} {error})")
+
+    @temp_channels_loop.before_loop
+    async def before_temp_channels(self) -> None:
+        await self.bot.wait_until_ready()
+
+    async def reconcile(self) -> None:
+        """Reprend les sessions vocales à partir des membres connectés et des sessions sauvegardées.
+        Le temps sauvegardé est rendu aux membres toujours connectés (avec l'interruption
+        si elle est courte et qu'ils n'ont pas changé de salon), et crédité aux membres partis.
+        Un serveur dont la lecture échoue est repris au prochain appel, rien n'est écrit
+        (accrue) tant que tous ne l'ont pas été.
+        """
+        async with self.reconcile_lock:
+            if self.reconciled:
+                return
+
+            failed = 0
+            for serveur in self.bot.guilds:
+                if serveur.id not in self.reconciled_guilds:
+                    try:
+                        await self.reconcile_guild(serveur)
+                    except Exception as error:
+                        failed += 1
+                        logger.error(f"{serveur.name}: reprise des sessions vocales impossible ({error.__class__.__name__} {error})")
+            self.reconciled = not failed
+
+    async def reconcile_guild(self, serveur: discord.Guild) -> None:
+        """Reprend les sessions vocales d'un serveur, voir reconcile"""
+        now = time.time()
+        # Les membres déjà connectés n'ont pas eu d'event de connexion
+        for channel in serveur.voice_channels:
+            for member_id, voice in channel.voice_states.items():
+                if (member := serveur.get_member(member_id)) and not member.bot:
+                    self.track(member, voice)
+
+        async with self.database.read(serveur) as connection:
+            saved = await connection.execute_fetchall("SELECT id, channel_id, state, active, afk, checkpoint FROM VoiceSessions")
+        self.reconciled_guilds.add(serveur.id)
+        if saved:
+            self.checkpointed.add(serveur.id)
+
+        for member_id, channel_id, state, active, afk, checkpoint in saved:
+            session = self.sessions.get(serveur.id, member_id)
+            if session and session.channel_id == channel_id and 0 <= now - checkpoint <= RESUME_GAP:
+                if state == VoiceState.ACTIVE.value:
+                    active += now - checkpoint
+                elif state == VoiceState.AFK.value:
+                    afk += now - checkpoint
+
+            if session:
+                session.active += active
+                session.afk += afk
+            else:
+                # Parti pendant l'interruption : crédité au prochain passage
+                self.sessions.closed.append(VoiceSession(serveur.id, member_id, channel_id, VoiceState(state), 0, active=active, afk=afk))
 
 
 
@@ -388,7 +555,8 @@ class Vocal(commands.Cog):
         member = ctx.author
 
         if member.guild_permissions.administrator:
-            await ctx.send("Tu es sûr de vouloir faire ça ?", view=ResetView(self.connection[self.ctx.guild.name],member_target))
+            await ctx.send(f"Tu es sûr de vouloir remettre à 0 le temps vocal de {member_target.mention} ?",
+                           view=ResetView.components(), allowed_mentions=discord.AllowedMentions.none())
         else:
             await ctx.send("Tu n'as pas la permission pour ça", ephemeral=True)
         
@@ -408,8 +576,6 @@ class Vocal(commands.Cog):
         """
         if member is None:
             member = ctx.author
-
-        await self.update_classement(ctx.guild)
         
         # Valeues attendue : id , name , msg , xp , lvl
         if profile := await self.get_member_stats(member):
@@ -427,7 +593,7 @@ class Vocal(commands.Cog):
             embed.add_field(name="", value=f"{stat.print_tps(stat.current_xp)} / {stat.print_tps(stat.xp_needed)}", inline=True)
             embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar.url)
 
-            progress_bar = stat.create_progress_bar(int(color))
+            progress_bar = await stat.create_progress_bar(self.bot.renderer, int(color))
             embed.set_image(url="attachment://progress_bar.png")
             await ctx.send(embed=embed, file=progress_bar)
 
@@ -448,291 +614,86 @@ class Vocal(commands.Cog):
         Returns:
             discord.Message: Message du leaderboard
         """
-        embed = discord.Embed(
-            title="Leaderboard vocal",
-            color=discord.Color.random()
-        )
-        res = await self.get_leaderboard(ctx.guild)
-        embed.set_author(icon_url=ctx.author.avatar.url,name=ctx.author.display_name)
-        for id , stat in res.items():
-            member = self.bot.get_user(id)
-            embed.add_field(name=f"{stat.rank_emoji()} {member.display_name}", value=f"Total Tps: {stat.print_tps(stat.time_spend)}", inline=False)
-        
-        total_page = await self.pages_count(ctx.guild)
-
-        embed.set_footer(text=f"{1}/{total_page}")
-        
-        return await ctx.send(embed=embed, view=LeaderboardView(self.bot, self.connections[ctx.guild.name], 1, total_page))
+        view = LeaderboardView.components()
+        embed = await view.build_embed(self.bot, ctx.guild, 1, ctx.author)
+        return await ctx.send(embed=embed, view=view)
 
 
-    @commands.Cog.listener(name="on_voice_state_update")
-    async def create_your_channel(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
-        """Créer un salon vocal temporaire à la connexion dans '➕ Créer ton salon'
+    async def create_your_channel(self, event: VoiceEvent) -> None:
+        """Donne un salon vocal temporaire au membre qui se connecte dans '➕ Créer ton salon'
 
         Args:
-            member (discord.Member): Membre du serveur
-            before (discord.VoiceState): État vocal avant la connexion
-            after (discord.VoiceState): État vocal après la connexion
+            event (VoiceEvent): Connexion ou changement de salon
         """
+        member = event.member
         serveur = member.guild
         try:
+            if event.joined.id != self.channels[serveur.name]['main_salon'].id:
+                return
             category = discord.utils.get(serveur.categories, id=self.category[serveur.name]['voice'])
-            if after.channel.id == self.channels[serveur.name]['main_salon'].id:
-                uzox = self.bot.get_user(760027263046909992)
-                ic(uzox)
-                perms = discord.PermissionOverwrite()
-
-                channel = await serveur.create_voice_channel(member.display_name, category=category, overwrites={uzox: perms})
-                self.own_channels[channel.id] = channel
-                await member.move_to(self.own_channels[channel.id])
-            
         except (AttributeError, KeyError):
-            pass
-        
-        
-    @commands.Cog.listener(name="on_voice_state_update")
-    async def end_your_channel(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
-        """Supprime un channel vocal temporaire après deconnexion de tout les participants
-
-        Args:
-            member (discord.Member): Membre du serveur
-            before (discord.VoiceState): État vocal avant la connexion
-            after (discord.VoiceState): État vocal après la connexion
-        """
-        try:
-            if channel := self.own_channels[before.channel.id]:
-                # Si le channel qu'on viens de quitter est un channel créé et devient vide
-                if before.channel.id == channel.id and not channel.members: 
-                    # On le supprime
-                    await self.own_channels[channel.id].delete()
-                    del self.own_channels[channel.id]
-
-        except (AttributeError, KeyError):
-            pass
-   
-   
-    @commands.Cog.listener(name="on_voice_state_update")
-    async def on_vocale_join(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
-        """Marque le début de la connection vocal
-
-        Args:
-            member (discord.Member): Memnre
-            before (discord.VoiceState): État vocal avant la connexion
-            after (discord.VoiceState): État vocal après la connexion
-        """
-        # Ignore les comptes bloqués et les bots
-        if member.id in self.user_blocked.values() or member.bot:
-            return
-        
-        serveur = member.guild
-        afk_channel = serveur.afk_channel
-        # Si le membre est afk
-        if after.channel and self.is_afk(member, before, after):
-            return
-        
-        # Message de connexion
-        if (before.channel is None or self.was_afk(member, before, after)) and after.channel is not None:
-            logger.info(f"{serveur.name} ({after.channel.name}): {member.display_name} viens de se connecter")
-        else:
-            return
-        
-        # Si il n'est pas seul dans le channel
-        if len(after.channel.members) >= 2:
-            self.voice_time_counter[member.name, serveur.name] = time.perf_counter()
-        
-    
-    @commands.Cog.listener(name="on_voice_state_update")
-    async def on_vocale_leave(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
-        """Marque la fin de la connection vocal d'un membre
-
-        Args:
-            member (discord.Member): Membre
-            before (discord.VoiceState): État vocal avant la connexion
-            after (discord.VoiceState): État vocal après la connexion
-        """
-        # Ignore les comptes bloqués et les bots    
-        if member.id in self.user_blocked.values() or member.bot:
             return
 
-        # Message de déconnexion
-        if self.left_channel(member, before, after) and not self.was_afk(member, before, after):
-            serveur = member.guild   
-            afk_channel = serveur.afk_channel
-            logger.info(f"{serveur.name} ({before.channel.name}): {member.display_name} viens de se déconnecter")
+        uzox = self.bot.get_user(760027263046909992)
+        overwrites = {uzox: discord.PermissionOverwrite()} if uzox else {}
+        if channel := await self.temp_channels.claim(member, category, overwrites):
+            await member.move_to(channel)
         else:
-            return
-            
-        # Si le salon est vide (autrement dit le membre était seul ou est le dernier à se déconnecter)
-        if before.channel is None or not before.channel.members:
-            return
-        
-        # Si le membre a changé de salon (donc ne s'est pas déconnecté)
-        if after.channel and (afk_channel and after.channel.id != afk_channel.id):
-            return
+            logger.info(f"{serveur.name}: {member.display_name} demande des salons trop souvent")
         
-        # Si le membre était muet ou afk (donc son temps n'est plus compté)
-        if afk_channel and before.channel.id == afk_channel.id:
-            return
         
-        await self.stop_voice_time_counter(member, before)
-   
-   
-    @commands.Cog.listener(name="on_voice_state_update")
-    async def anti_farm_alone(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
-        """Annule la prise en compte du temps pour quelqu'un qui reste seul dans un channel
+    async def end_your_channel(self, event: VoiceEvent) -> None:
+        """Libère un salon vocal temporaire après deconnexion de tout les participants
 
         Args:
-            member (discord.Member): Membre
-            before (discord.VoiceState): État vocal avant la connexion
-            after (discord.VoiceState): État vocal après la connexion
+            event (VoiceEvent): Déconnexion ou changement de salon
         """
-        serveur = member.guild
-        
-        # Sur une déconection
-        if after.channel is None: 
-    
-            # Si le channel existe toujours et qu'il reste qu'un seul humain
-            if before.channel and self.voice_channel_empty(before.channel):
-                for participant in before.channel.members:
-                    # N'est pas le membre qui vient de se déconnecter et n'est pas un bot
-                    if participant != member and not participant.bot:
-                        last_member = participant
-                        break
-                    
-                await self.stop_voice_time_counter(last_member, before)
-        
-        # Sur une connection
-        if before.channel is None: 
-            
-            # Si un deuxieme humain se connecte
-            if after.channel and self.voice_channel_enought_filled(after.channel) and not member.bot:
-                for participant in after.channel.members:
-                    # N'est pas le membre qui vient de connecter et n'est pas un bot
-                    if participant != member and not participant.bot:
-                        first_member = participant
-                        break
-
-                self.voice_time_counter[first_member.name, serveur.name] = time.perf_counter()
-    
+        channel = event.left
+        if channel and self.temp_channels.is_temp(channel) and not channel.members:
+            await self.temp_channels.release(channel)
+   
    
-    @commands.Cog.listener(name="on_voice_state_update")
-    async def anti_farm_mute(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
-        """Annule la prise en compte du temps pour quelqu'un qui se mute en voc
+    async def track_voice_session(self, event: VoiceEvent) -> None:
+        """Fait avancer la session vocale du membre, son temps est crédité par accrual_loop
 
         Args:
-            member (discord.Member): Membre
-            before (discord.VoiceState): État vocal avant la connexion
-            after (discord.VoiceState): État vocal après la connexion
+            event (VoiceEvent): Event vocal
         """
-        # Vérification que le membre n'a pas changé de vocal
-        if after.channel != before.channel:
+        member, before, after = event.member, event.before, event.after
+        if member.bot:
             return
-            
-        serveur = member.guild
-        channel = member.voice.channel
-        # Si le membre se mute
-        if member.voice.self_mute:
-            logger.info(f"{serveur.name} ({channel.name}): {member.display_name} viens de se mute")
-            await self.stop_voice_time_counter(member, before)
-            self.voice_time_counter[member.name, serveur.name] = "muted"
-                
-        # Si le membre se démute
-        if not member.voice.self_mute and self.voice_time_counter[member.name, serveur.name] == "muted" and len(channel.members) >= 2: 
-            logger.info(f"{serveur.name} ({channel.name}): {member.display_name} viens de se démute")
-            self.voice_time_counter[member.name, serveur.name] = time.perf_counter()
-    
-    
-    
-    async def stop_voice_time_counter(self, member: discord.Member, before: discord.VoiceState) -> None:
-        """Compte le temps passé en vocal et reset le timer du joueur
 
-        Args:
-            member (discord.Member): Membre
-            before (discord.VoiceState): État vocal avant la connexion
-        """
         serveur = member.guild
-        afk_channel = member.guild.afk_channel
-
-        tps = [int(time.perf_counter() - self.voice_time_counter[member.name, serveur.name]) , 0]
-        # Si le mebre était afk
-        if afk_channel and before.channel.id == afk_channel.id:
-            tps.reverse()
-
-        # Met à jour le temps passé en vocal
-        if profile := await self.get_member_stats(member):
-            await self.on_vocal_xp(serveur, profile, *tps)
-            logger.info(f"{serveur.name}: {member.display_name} a passé {tps[0]//60} minutes dans {before.channel.name}")
-            self.voice_time_counter[member.name, serveur.name] = None
-
-        # Créer un profil vocal si il n'existe pas
-        else:
-            await self.create_vocal_profile(member)
-            await self.stop_voice_time_counter(member, before)
-
-    def voice_channel_empty(self, channel: discord.VoiceChannel) -> bool:
-        """Check si le salon ne contient qu'un seul membre non bot
-
-        Args:
-            channel (discord.VoiceChannel): Salon vocal
-
-        Returns:
-            bool: Résultat sous forme de boléen
-        """
-        return sum(int(not participant.bot) for participant in channel.members) == 1
-
-    def voice_channel_enought_filled(self, channel: discord.VoiceChannel) -> bool:
-        """Check si le salon contient plus d'un seul membre non bot
-
-        Args:
-            channel (discord.VoiceChannel): Salon vocal
-
-        Returns:
-            bool: Résultat sous forme de boléen
-        """
-        return sum(int(not participant.bot) for participant in channel.members) > 1
-
-    def left_channel(self, member: discord.Member, before: discord.VoiceProtocol, after: discord.VoiceProtocol) -> bool:
-        """Check si le membre s'est déconnecté du salon vocal
-
-        Args:
-            member (discord.Member): Membre
-            before (discord.VoiceChannel): État vocal avant la connexion
-            after (discord.VoiceChannel): État vocal après la connexion
+        if event.type & VoiceEventType.JOIN:
+            logger.info(f"{serveur.name} ({after.channel.name}): {member.display_name} viens de se connecter")
+        elif event.type & VoiceEventType.LEAVE:
+            logger.info(f"{serveur.name} ({before.channel.name}): {member.display_name} viens de se déconnecter")
+        if event.type & (VoiceEventType.MUTE | VoiceEventType.UNMUTE):
+            logger.info(f"{serveur.name} ({after.channel.name}): {member.display_name} viens de se {'mute' if after.self_mute else 'démute'}")
 
-        Returns:
-            bool: Résultat sous forme de boléen
-        """
-        return (before.channel is not None and after.channel is None) or (before.channel != after.channel and before.channel is not None)
+        self.track(member, after, event.now)
 
-    def is_afk(self, member: discord.Member, before: discord.VoiceProtocol, after: discord.VoiceProtocol) -> bool:
-        """Check si le membre est dans le salon afk si celui-ci existe
+    def track(self, member: discord.Member, voice: discord.VoiceState, now: float | None=None) -> VoiceSession | None:
+        """Applique l'état vocal d'un membre humain à sa session
 
         Args:
             member (discord.Member): Membre
-            before (discord.VoiceChannel): État vocal avant la connexion
-            after (discord.VoiceChannel): État vocal après la connexion
+            voice (discord.VoiceState): État vocal actuel du membre
+            now (float | None, optional): Date (monotonic) de l'event, maintenant par défaut
 
         Returns:
-            bool: Résultat sous forme de boléen
+            VoiceSession | None: Session du membre, None s'il s'est déconnecté
         """
         serveur = member.guild
+        channel = voice.channel
         afk_channel = serveur.afk_channel
-        return afk_channel and after.channel.id == afk_channel.id
-
-    def was_afk(self, member: discord.Member, before: discord.VoiceProtocol, after: discord.VoiceProtocol) -> bool:
-        """Check si le membre était dans le salon afk si celui-ci existe
-
-        Args:
-            member (discord.Member): Membre
-            before (discord.VoiceChannel): État vocal avant la connexion
-            after (discord.VoiceChannel): État vocal après la connexion
-
-        Returns:
-            bool: Résultat sous forme de boléen
-        """
-        serveur = member.guild
-        afk_channel = serveur.afk_channel
-        return afk_channel and before.channel.id == afk_channel.id
+        return self.sessions.update(
+            serveur.id, member.id, channel and channel.id,
+            muted=voice.self_mute,
+            afk=bool(channel and afk_channel and channel.id == afk_channel.id),
+            counted=member.id not in self.user_blocked.values(),
+            now=now
+        )
 
     async def manage_xp(self, action: str, member: discord.Member, amount: int) -> None:
         """Ajoute ou retire la quantité d'xp donné
@@ -742,73 +703,23 @@ class Vocal(commands.Cog):
             member_id (int): Id du membre
             amount (int): Quantité d'xp
         """
-        connection = self.connections[member.guild.name]
         stat = VocalProfile(*await self.get_member_stats(member))
         
         if action == 'add':
             stat.time_spend += amount
-            xp_counter = stat.add_xp_counter + 1
-            res = "UPDATE Vocal SET time=?, afk=?, lvl=?, add_xp_counteer=?, added_xp=? WHERE id==?"
+            xp_counter = (stat.add_xp_counter or 0) + 1
+            res = "UPDATE Vocal SET time=?, afk=?, lvl=?, add_xp_counter=?, added_xp=? WHERE id==?"
         elif action == 'remove':
             stat.time_spend -= amount
-            xp_counter = stat.remove_xp_counter + 1
-            res = "UPDATE Vocal SET time=?, afk=?, lvl=?, remove_xp_counteer=?, removeed_xp=? WHERE id==?"
+            xp_counter = (stat.remove_xp_counter or 0) + 1
+            res = "UPDATE Vocal SET time=?, afk=?, lvl=?, remove_xp_counter=?, removed_xp=? WHERE id==?"
             
         stat.check_lvl()
 
-        await connection.execute(res, (stat.time_spend, stat.afk, stat.lvl, xp_counter, amount, stat.id))
-        await connection.commit()
-
-        await self.update_classement()
-    
-    async def on_vocal_xp(self, serveur: discord.Guild, stat: tuple | VocalProfile, time_spend: int, afk: int) -> None:
-        """Ajoute de l'xp au membre et regard si il a level up
-
-        Args:
-            stat (tuple | XpProfile): Stats du membre
-            time_spend (int): Temps en seconde
-            afk (int): Temps d'afk en seconde
-        """
-        if isinstance(stat, tuple):
-            stat = VocalProfile(*stat)
-        connection = self.connections[serveur.name]
-        
-        stat.time_spend += time_spend // 60
-        stat.afk += afk
-        req = "UPDATE Vocal SET time=?, afk=?, lvl=? WHERE id==?"
-        
-        if stat.check_lvl():
-            channel: discord.TextChannel = self.channels[serveur.name]['rank']
-            await channel.send(f"<@{stat.id}> Tu viens de passer niveau {stat.lvl} en vocal !")
-        
-        await connection.execute(req, (stat.time_spend, afk, stat.lvl, stat.id))
-        await connection.commit()
-
-        await self.update_classement(serveur)
+        async with self.database.write(member.guild) as connection:
+            await connection.execute(res, (stat.time_spend, stat.afk, stat.lvl, xp_counter, amount, stat.id))
+        self.leaderboard.record(member.guild.id, stat.id, stat.time_spend)
     
-    async def update_classement(self, serveur: discord.Guild) -> None:
-        """Range par odre décroissant de temps passé en vocal les membrs dans la bdd
-        """
-        connection = self.connections[serveur.name]
-        req = "UPDATE Vocal SET rang=DENSE_RANK() OVER (ORDER BY Vocal.time DESC) FROM Vocal t2 WHERE t2.id = Vocal.id"
-        await connection.execute(req)
-        await connection.commit()
-    
-    async def create_vocal_profile(self, member: discord.Member) -> None:
-        """Ajoutes une ligne à la base de donnée pour le membre
-
-        Args:
-            member (discord.Member): Membre discord
-        """
-        if member.id == self.bot.user.id:
-            return
-
-        connection = self.connections[member.guild.name]
-
-        req = "INSERT INTO Vocal (id, name, time, afk, lvl) VALUES (?,?,?,?,?)"
-        await connection.execute(req, (member.id, member.name, 0, 0, 0))
-        await connection.commit()
-
     async def get_member_stats(self, member: discord.Member) -> VocalProfile:
         """Renvoie les stats d'un membre
 
@@ -818,42 +729,13 @@ class Vocal(commands.Cog):
         Returns:
             VocalProfile: Stats du membre
         """
-        connection = self.connections[member.guild.name]
-        req = "SELECT * FROM Vocal WHERE id==?"
-        curseur = await connection.execute(req, (member.id,))
+        req = vocal_engine.select(where="id==?")
+        async with self.database.read(member.guild) as connection:
+            curseur = await connection.execute(req, (member.id,))
 
-        # Valeues attendue : id , time , afk , rang , name
-        return await curseur.fetchone()
+            # Valeues attendue : id , time , afk , rang , name
+            return await curseur.fetchone()
     
-    async def get_leaderboard(self, serveur: discord.Guild) -> dict[VocalProfile]:
-        """Renvoie un dictionnaire de tout les profils
-
-        Returns:
-            dict[VocalProfile]: Profils de tout les membres
-        """
-        connection = self.connections[serveur.name]
-        req = "SELECT * FROM Vocal ORDER BY rang LIMIT 5"
-        stats = await connection.execute_fetchall(req)
-
-        return {stat[0]: VocalProfile(*stat) for stat in stats}
-        
-    async def pages_count(self, serveur: discord.Guild) -> int:
-        """Renvoie le nombre de page totale du leaderboard
-
-        Returns:
-            int: Nombre de page totale
-        """
-        connection = self.connections[serveur.name]
-        req = f"SELECT count(*) FROM Vocal"
-        res = await connection.execute(req)
-        tamp = (await res.fetchone())[0]
-
-        if tamp % 5:
-            return  tamp // 5 + 1
-        else:
-            return  tamp // 5
-
-
     def load_channels(self) -> dict[str, dict[str, discord.TextChannel|discord.VoiceChannel]]:
         """Renvoie un dictionnaire contenant les channels du serveur avec comme clé leur nom
 
@@ -884,5 +766,9 @@ class Vocal(commands.Cog):
 
 
 
+# Enregistrées une seule fois par le bot, voir ChillBot.add_persistent_views
+PERSISTENT_VIEWS = [ResetView, LeaderboardView]
+
+
 async def setup(bot: commands.Bot)->None:
-    await bot.add_cog(Vocal(bot, bot.connections))
\ No newline at end of file
+    await bot.add_cog(Vocal(bot, bot.database))
\ No newline at end of file
@@ -11,32 +11,49 @@ import json
 import scrapetube
 
 from icecream import ic
+from utils.persistent_view import PersistentView
 
 
-class RegisterView(discord.ui.View):
-    def __init__(self, ytb: commands.Cog, name: str) -> None:
-        super().__init__()
-        self.ytb = ytb
-        self.name = name
-        
+NAME_FORMAT = "Le nom d'affichage de la chaîne sera **{}**"
+
+
+class RegisterView(PersistentView):
+    """Boutons d'enregistrement d'une chaîne, le nom de la chaîne est relu dans l'embed du message"""
         
-    @discord.ui.button(label="Enregistrer", emoji="💾")
+    @discord.ui.button(label="Enregistrer", emoji="💾", custom_id="youtube:register")
     async def add_button(self, interaction: discord.Interaction, button: discord.ui.Button)->None:
-        await interaction.response.send_modal(RegisterModal(self.ytb,self.name))
+        if not (ytb := interaction.client.get_cog('YouTube')) or not (name := channel_name(interaction.message)):
+            return await interaction.response.send_message("Enregistrement indisponible", ephemeral=True)
+        await interaction.response.send_modal(RegisterModal(ytb, name))
     
     
-    @discord.ui.button(label="Annuler", emoji="❌")
+    @discord.ui.button(label="Annuler", emoji="❌", custom_id="youtube:cancel")
     async def cancel_button(self, interaction: discord.Interaction, button: discord.ui.Button)->None:
         await self.desable_all_buttons(interaction)
-        await interaction.response.defer()
     
     
     async def desable_all_buttons(self, interaction: discord.Interaction)->None:
-        for child in self.children:
-            if isinstance(child, discord.ui.Button):
-                child.disabled = True
-        
-        await interaction.message.edit(view=self)
+        await interaction.response.edit_message(view=self.components(disabled=True))
+
+
+
+def channel_name(message: discord.Message) -> str | None:
+    """Renvoie le nom de la chaîne affiché dans l'embed d'un message /notif_ytb
+
+    Args:
+        message (discord.Message): Message de la commande
+
+    Returns:
+        str | None: Nom de la chaîne, None si illisible
+    """
+    try:
+        description = message.embeds[0].description
+    except IndexError:
+        return None
+    prefix, suffix = NAME_FORMAT.split('{}')
+    if not description or not description.startswith(prefix) or not description.endswith(suffix):
+        return None
+    return description[len(prefix):-len(suffix)]
     
     
 
@@ -85,12 +102,12 @@ class YouTube(commands.Cog):
         """
         embed = discord.Embed(
             title="YouTube notification",
-            description=f"Le nom d'affichage de la chaîne sera **{name}**",
+            description=NAME_FORMAT.format(name),
             color=discord.Color.random()
         )
         embed.add_field(name="Format", value="Dans le formulaire il faut rentrer l'url de la chaîne")
 
-        await ctx.send(embed=embed, view=RegisterView(self,name))
+        await ctx.send(embed=embed, view=RegisterView.components())
     
     
     @tasks.loop(minutes=1)
@@ -144,5 +161,9 @@ class YouTube(commands.Cog):
 
 
 
+# Enregistrées une seule fois par le bot, voir ChillBot.add_persistent_views
+PERSISTENT_VIEWS = [RegisterView]
+
+
 async def setup(bot: commands.Bot)->None:
     await bot.add_cog(YouTube(bot))
\ No newline at end of file
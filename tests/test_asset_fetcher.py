@@ -0,0 +1,68 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils.asset_fetcher import AssetFetcher
+
+
+async def serve(handler):
+    app = web.Application()
+    app.router.add_get('/{name}', handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def test_concurrent_fetches_share_one_download(tmp_path):
+    requests = []
+
+    async def image(request):
+        requests.append(request.match_info['name'])
+        await asyncio.sleep(0.1)
+        return web.Response(body=b'png' * 100)
+
+    async def run():
+        server = await serve(image)
+        async with aiohttp.ClientSession() as session:
+            fetcher = AssetFetcher(tmp_path, session=session)
+            url = str(server.make_url('/avatar.png'))
+            contents = await asyncio.gather(*(fetcher.fetch(url) for _ in range(5)))
+            again = await fetcher.fetch(url)
+        await server.close()
+        return fetcher, contents, again
+
+    fetcher, contents, again = asyncio.run(run())
+    assert requests == ['avatar.png']
+    assert all(content == b'png' * 100 for content in [*contents, again])
+    assert fetcher.downloads == 1 and fetcher.hits == 1
+
+
+def test_disk_cache_is_pruned(tmp_path):
+    async def image(request):
+        return web.Response(body=b'x' * 1000)
+
+    async def run():
+        server = await serve(image)
+        async with aiohttp.ClientSession() as session:
+            fetcher = AssetFetcher(tmp_path, session=session, max_disk_bytes=3000)
+            for i in range(10):
+                await fetcher.fetch(str(server.make_url(f'/{i}.png')))
+        await server.close()
+
+    asyncio.run(run())
+    assert sum(path.stat().st_size for path in tmp_path.iterdir()) <= 3000
+
+
+def test_disk_size_stays_exact_under_concurrent_writes(tmp_path):
+    fetcher = AssetFetcher(tmp_path, max_disk_bytes=10**9)
+
+    async def run():
+        await asyncio.gather(*(
+            asyncio.to_thread(fetcher.write_disk, tmp_path / f'{i}.png', b'x' * (100 + i))
+            for i in range(200)
+        ))
+
+    asyncio.run(run())
+    assert fetcher.disk_size == sum(path.stat().st_size for path in tmp_path.iterdir())
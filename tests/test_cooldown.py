@@ -0,0 +1,57 @@
+from utils import cooldown
+from utils.cooldown import CooldownStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cooldown_expires(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cooldown.time, 'monotonic', clock)
+    store = CooldownStore(60)
+
+    assert store.ready(1, 10)
+    store.start(1, 10)
+    assert not store.ready(1, 10)
+    assert store.ready(1, 11) and store.ready(2, 10)
+
+    clock.now += 59.9
+    assert not store.ready(1, 10)
+    clock.now += 0.1
+    assert store.ready(1, 10)
+    assert len(store) == 0
+    assert store.stats() == {'size': 0, 'allowed': 4, 'suppressed': 2}
+
+
+def test_restart_extends_and_reset_cancels(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cooldown.time, 'monotonic', clock)
+    store = CooldownStore(60)
+
+    store.start(1, 10)
+    clock.now += 30
+    store.start(1, 10)
+    clock.now += 40
+    # L'ancienne échéance restée dans le tas ne libère pas le membre
+    assert not store.ready(1, 10)
+    store.reset(1, 10)
+    assert store.ready(1, 10)
+
+
+def test_size_is_bounded(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cooldown.time, 'monotonic', clock)
+    store = CooldownStore(60, max_size=3)
+
+    for member_id in range(10):
+        clock.now += 1
+        store.start(1, member_id)
+    assert len(store) == 3
+    assert len(store.heap) <= 2 * 3
+    # Ceux qui expiraient le plus tôt ont été oubliés
+    assert store.ready(1, 0) and not store.ready(1, 9)
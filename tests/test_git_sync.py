@@ -0,0 +1,45 @@
+import asyncio
+import subprocess
+
+from utils.git_sync import GitSync
+
+
+def git(cwd, *args):
+    subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@test', *args], cwd=cwd, check=True, capture_output=True)
+
+
+def commit(cwd, path, content):
+    (cwd / path).write_text(content)
+    git(cwd, 'add', path)
+    git(cwd, 'commit', '-m', f"edit {path}")
+    git(cwd, 'push', 'origin', 'main')
+
+
+def test_poll_pulls_changed_files_from_bare_remote(tmp_path):
+    git(tmp_path, 'init', '--bare', '-b', 'main', 'remote.git')
+    for clone in ('work', 'dev'):
+        git(tmp_path, 'clone', 'remote.git', clone)
+    dev, work = tmp_path / 'dev', tmp_path / 'work'
+    git(dev, 'checkout', '-b', 'main')
+    commit(dev, 'a.py', 'x = 1')
+    git(work, 'pull', 'origin', 'main')
+
+    sync = GitSync(work)
+    assert asyncio.run(sync.poll()) == []
+    assert sync.fetches == 0
+
+    commit(dev, 'b.json', '{}')
+    assert asyncio.run(sync.poll()) == [work / 'b.json']
+    assert (work / 'b.json').exists()
+
+
+def test_unknown_branch_backs_off(tmp_path):
+    git(tmp_path, 'init', '--bare', '-b', 'main', 'remote.git')
+    git(tmp_path, 'clone', 'remote.git', 'work')
+    work = tmp_path / 'work'
+    git(work, 'commit', '--allow-empty', '-m', 'init')
+    git(work, 'push', 'origin', 'main')
+
+    sync = GitSync(work, branch='nobranch')
+    assert asyncio.run(sync.poll()) == []
+    assert sync.failures == 1 and sync.retry_at > 0
@@ -0,0 +1,107 @@
+import asyncio
+from types import SimpleNamespace
+
+from utils.database import Database
+from utils.invite_tracker import InviteTracker
+
+
+class FakeGuild:
+    def __init__(self, guild_id=1):
+        self.id = guild_id
+        self.name = "serveur"
+        self.live = {}
+
+    def invite(self, code, uses=0, inviter_id=10, max_uses=0):
+        inviter = SimpleNamespace(id=inviter_id, name=f"membre{inviter_id}")
+        invite = self.live[code] = SimpleNamespace(code=code, uses=uses, inviter=inviter, max_uses=max_uses, guild=self)
+        return invite
+
+    async def invites(self):
+        # Comme l'API : une photo de l'état au moment de l'appel
+        await asyncio.sleep(0)
+        return [SimpleNamespace(**vars(invite)) for invite in self.live.values()]
+
+
+async def saved(database, guild):
+    async with database.read(guild) as connection:
+        return dict(await connection.execute_fetchall("SELECT code, uses FROM Invites"))
+
+
+def test_join_is_attributed_to_the_invite_whose_uses_grew(tmp_path):
+    async def run():
+        database = Database(tmp_path)
+        guild = FakeGuild()
+        guild.invite('aaa', uses=3, inviter_id=10)
+        guild.invite('bbb', uses=1, inviter_id=20)
+        tracker = InviteTracker(database)
+        await tracker.load(guild)
+
+        guild.live['bbb'].uses += 1
+        used = await tracker.member_join(guild)
+        rows = await saved(database, guild)
+        await database.close()
+        return used, rows
+
+    used, rows = asyncio.run(run())
+    assert used.code == 'bbb' and used.inviter_id == 20
+    assert rows == {'aaa': 3, 'bbb': 2}
+
+
+def test_simultaneous_joins_take_one_use_each(tmp_path):
+    async def run():
+        database = Database(tmp_path)
+        guild = FakeGuild()
+        guild.invite('aaa', uses=1)
+        tracker = InviteTracker(database)
+        await tracker.load(guild)
+
+        # Deux arrivées avant que la première ne relise les invites
+        guild.live['aaa'].uses += 2
+        used = await asyncio.gather(tracker.member_join(guild), tracker.member_join(guild))
+        rows = await saved(database, guild)
+        await database.close()
+        return used, rows
+
+    used, rows = asyncio.run(run())
+    assert [invite.code for invite in used] == ['aaa', 'aaa']
+    assert [invite.uses for invite in used] == [2, 3]
+    assert rows == {'aaa': 3}
+
+
+def test_snapshot_is_rebuilt_from_the_database(tmp_path):
+    async def run():
+        database = Database(tmp_path)
+        guild = FakeGuild()
+        guild.invite('aaa', uses=5)
+        await InviteTracker(database).load(guild)
+
+        # Après un redémarrage : aucune photo en mémoire
+        tracker = InviteTracker(database)
+        guild.live['aaa'].uses += 1
+        used = await tracker.member_join(guild)
+        await database.close()
+        return used
+
+    used = asyncio.run(run())
+    assert used.code == 'aaa' and used.uses == 6
+
+
+def test_deleted_limited_invite_explains_a_single_join(tmp_path):
+    async def run():
+        database = Database(tmp_path)
+        guild = FakeGuild()
+        invite = guild.invite('once', uses=0, inviter_id=30, max_uses=1)
+        tracker = InviteTracker(database)
+        await tracker.load(guild)
+
+        # Discord supprime l'invite à sa dernière utilisation, avant l'arrivée
+        del guild.live['once']
+        tracker.deleted(invite)
+        first = await tracker.member_join(guild)
+        second = await tracker.member_join(guild)
+        await database.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.code == 'once' and first.inviter_id == 30
+    assert second is None
@@ -0,0 +1,74 @@
+import asyncio
+
+from utils.database import Database
+from utils.leaderboard import Leaderboard
+from utils.ranking import rank_engine
+
+
+SCORES = {1: 500, 2: 300, 3: 300, 4: 300, 5: 120, 6: 90, 7: 90, 8: 0}
+RANG = rank_engine.columns.index('rang')
+
+
+async def fill(database, scores):
+    async with database.write(1) as connection:
+        await connection.executemany(
+            "INSERT OR REPLACE INTO Rank (id, name, msg, xp, lvl) VALUES (?, ?, 0, ?, 0)",
+            [(member_id, f"membre{member_id}", xp) for member_id, xp in scores.items()]
+        )
+
+
+def dense_ranks(scores):
+    distinct = sorted(set(scores.values()), reverse=True)
+    return {member_id: distinct.index(xp) + 1 for member_id, xp in scores.items()}
+
+
+def expected_order(scores):
+    return [member_id for member_id, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0]))]
+
+
+def test_pages_positions_and_ranks_match_sql(tmp_path):
+    async def run():
+        database = Database(tmp_path)
+        await fill(database, SCORES)
+        leaderboard = Leaderboard(database, rank_engine, per_page=3)
+
+        total = await leaderboard.pages_count(1)
+        # Pages lues dans le désordre : chacune doit être servie par keyset
+        pages = {page: await leaderboard.page(1, page) for page in reversed(range(1, total + 2))}
+        positions = {member_id: await leaderboard.position(1, member_id) for member_id in SCORES}
+        await database.close()
+        return total, pages, positions
+
+    total, pages, positions = asyncio.run(run())
+    rows = [row for page in sorted(pages) for row in pages[page]]
+    order = expected_order(SCORES)
+
+    assert total == 3 and pages[total + 1] == []
+    assert [row[0] for row in rows] == order
+    assert {row[0]: row[RANG] for row in rows} == dense_ranks(SCORES)
+    assert positions == {member_id: order.index(member_id) + 1 for member_id in SCORES}
+
+
+def test_updates_are_merged_before_reading(tmp_path):
+    scores = dict(SCORES)
+
+    async def run():
+        database = Database(tmp_path)
+        await fill(database, scores)
+        leaderboard = Leaderboard(database, rank_engine, per_page=3)
+        await leaderboard.count(1)
+
+        scores.update({8: 1000, 3: 95, 9: 300})
+        await fill(database, scores)
+        for member_id in (8, 3, 9):
+            leaderboard.record(1, member_id, scores[member_id])
+
+        pages = [await leaderboard.page(1, page) for page in range(1, await leaderboard.pages_count(1) + 1)]
+        positions = {member_id: await leaderboard.position(1, member_id) for member_id in scores}
+        await database.close()
+        return pages, positions
+
+    pages, positions = asyncio.run(run())
+    order = expected_order(scores)
+    assert [row[0] for page in pages for row in page] == order
+    assert positions == {member_id: order.index(member_id) + 1 for member_id in scores}
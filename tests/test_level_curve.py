@@ -0,0 +1,37 @@
+import numpy as np
+
+from utils import level_curve
+
+
+def brute_force_level(xp):
+    """Boucle d'origine : passe les niveaux un par un tant que l'xp suffit"""
+    lvl = 0
+    spent = 0
+    while xp - spent >= level_curve.xp_needed(lvl):
+        spent += level_curve.level_cost(lvl)
+        lvl += 1
+    return lvl
+
+
+XP = [0, 1, 154, 155, 156, 300, 1_000, 12_345, 99_999, 1_000_000, 25_000_000]
+
+
+def test_closed_form_matches_brute_force():
+    for lvl in range(0, 200):
+        threshold = level_curve.level_threshold(lvl)
+        for xp in (threshold - 1, threshold, threshold + 1, *XP):
+            if xp >= 0:
+                assert level_curve.level_from_xp(xp) == brute_force_level(xp), xp
+
+
+def test_xp_for_level_is_the_sum_of_costs():
+    for lvl in range(0, 200):
+        assert level_curve.xp_for_level(lvl) == sum(level_curve.level_cost(i) for i in range(lvl))
+
+
+def test_vectorized_matches_scalar():
+    thresholds = [level_curve.level_threshold(lvl) for lvl in range(0, 300)]
+    xp = np.array(sorted({value + delta for value in thresholds + XP for delta in (-1, 0, 1) if value + delta >= 0}))
+    levels = level_curve.levels_from_xp(xp)
+    assert levels.tolist() == [level_curve.level_from_xp(int(value)) for value in xp]
+    assert level_curve.levels_from_xp(np.array([np.nan, -5])).tolist() == [0, 0]
@@ -0,0 +1,37 @@
+import asyncio
+
+from utils.database import Database
+from utils.ranking import rank_engine
+
+
+SCORES = {1: 500, 2: 300, 3: 300, 4: 120, 5: 0, 6: 0}
+
+
+def dense_ranks(scores):
+    distinct = sorted(set(scores.values()), reverse=True)
+    return {member_id: distinct.index(xp) + 1 for member_id, xp in scores.items()}
+
+
+def test_computed_rank_matches_dense_rank(tmp_path):
+    async def run():
+        database = Database(tmp_path)
+        async with database.write(1) as connection:
+            await connection.executemany(
+                "INSERT INTO Rank (id, name, msg, xp, lvl) VALUES (?, ?, 0, ?, 0)",
+                [(member_id, f"membre{member_id}", xp) for member_id, xp in SCORES.items()]
+            )
+            await rank_engine.materialize(connection)
+
+        async with database.read(1) as connection:
+            selected = await connection.execute_fetchall(rank_engine.select(order="xp DESC, id"))
+            materialized = await connection.execute_fetchall("SELECT id, rang FROM Rank")
+            rank_of = {member_id: await rank_engine.rank_of(connection, xp) for member_id, xp in SCORES.items()}
+        await database.close()
+        return selected, materialized, rank_of
+
+    selected, materialized, rank_of = asyncio.run(run())
+    rang = rank_engine.columns.index('rang')
+    expected = dense_ranks(SCORES)
+    assert {row[0]: row[rang] for row in selected} == expected
+    assert dict(materialized) == expected
+    assert rank_of == expected
@@ -0,0 +1,125 @@
+import asyncio
+from types import SimpleNamespace
+
+from utils.database import Database
+from utils.temp_channels import TempChannels
+
+
+class FakeChannel:
+    def __init__(self, guild, channel_id, name):
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.members = []
+        self.edits = 0
+
+    async def edit(self, name=None, overwrites=None):
+        # Laisse les autres arrivées s'exécuter pendant l'appel à l'API
+        await asyncio.sleep(0.01)
+        self.edits += 1
+        self.name = name or self.name
+
+    async def set_permissions(self, target, **permissions):
+        pass
+
+    async def delete(self):
+        del self.guild.channels_by_id[self.id]
+
+
+class FakeGuild:
+    def __init__(self, guild_id=1):
+        self.id = guild_id
+        self.name = "serveur"
+        self.default_role = object()
+        self.channels_by_id = {}
+        self.next_id = 100
+
+    def get_channel(self, channel_id):
+        return self.channels_by_id.get(channel_id)
+
+    async def create_voice_channel(self, name, category=None, overwrites=None):
+        self.next_id += 1
+        channel = self.channels_by_id[self.next_id] = FakeChannel(self, self.next_id, name)
+        return channel
+
+
+def member(guild, member_id):
+    return SimpleNamespace(id=member_id, display_name=f"membre{member_id}", guild=guild)
+
+
+async def saved(database, guild):
+    async with database.read(guild) as connection:
+        return dict(await connection.execute_fetchall("SELECT channel_id, owner_id FROM TempChannels"))
+
+
+def test_claim_release_reuses_pooled_channel(tmp_path):
+    async def run():
+        database = Database(tmp_path)
+        guild = FakeGuild()
+        temp = TempChannels(database, pool_size=1, cooldown=0)
+
+        first = await temp.claim(member(guild, 1), None)
+        assert await temp.claim(member(guild, 1), None) is first
+        await temp.release(first)
+        assert temp.channels[guild.id] == {first.id: None}
+
+        second = await temp.claim(member(guild, 2), None)
+        rows = await saved(database, guild)
+        await database.close()
+        return first, second, temp, rows
+
+    first, second, temp, rows = asyncio.run(run())
+    assert second is first and second.name == "membre2"
+    assert rows == {first.id: 2}
+    assert temp.stats()['created'] == 1 and temp.stats()['reused'] == 1
+
+
+def test_concurrent_claims_never_share_a_pooled_channel(tmp_path):
+    async def run():
+        database = Database(tmp_path)
+        guild = FakeGuild()
+        temp = TempChannels(database, pool_size=1, cooldown=0)
+        pooled = await temp.claim(member(guild, 1), None)
+        await temp.release(pooled)
+
+        channels = await asyncio.gather(*(temp.claim(member(guild, member_id), None) for member_id in (2, 3)))
+        rows = await saved(database, guild)
+        await database.close()
+        return channels, rows
+
+    (first, second), rows = asyncio.run(run())
+    assert first is not second
+    assert rows == {first.id: 2, second.id: 3}
+
+
+def test_cooldown_refuses_a_second_channel(tmp_path):
+    async def run():
+        database = Database(tmp_path)
+        guild = FakeGuild()
+        temp = TempChannels(database, cooldown=60)
+        channel = await temp.claim(member(guild, 1), None)
+        await temp.release(channel)
+        again = await temp.claim(member(guild, 1), None)
+        await database.close()
+        return again
+
+    assert asyncio.run(run()) is None
+
+
+def test_reconcile_forgets_missing_and_releases_empty_channels(tmp_path):
+    async def run():
+        database = Database(tmp_path)
+        guild = FakeGuild()
+        temp = TempChannels(database, pool_size=0, cooldown=0)
+        kept, emptied, vanished = [await temp.claim(member(guild, member_id), None) for member_id in (1, 2, 3)]
+        kept.members.append(object())
+        del guild.channels_by_id[vanished.id]
+
+        deleted = await temp.reconcile(guild)
+        rows = await saved(database, guild)
+        await database.close()
+        return deleted, rows, kept, emptied
+
+    deleted, rows, kept, emptied = asyncio.run(run())
+    assert deleted == 1
+    assert rows == {kept.id: 1}
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from plugins.vocal.main import Vocal
+from utils.voice_sessions import VoiceSessions
+
+
+def vocal(write_sessions):
+    cog = Vocal.__new__(Vocal)
+    cog.sessions = VoiceSessions()
+    cog.reconciled = True
+    cog.checkpointed = set()
+    cog.writing = None
+    cog.write_sessions = write_sessions
+    return cog
+
+
+def two_minutes_together(sessions):
+    # Deux membres ensemble depuis 130 s, le second vient de partir
+    now = time.monotonic()
+    sessions.update(1, 10, 100, now=now - 130)
+    sessions.update(1, 11, 100, now=now - 130)
+    sessions.update(1, 11, None, now=now)
+
+
+def test_failed_write_gives_time_back():
+    calls = []
+
+    async def write_sessions(guild_id, credits, checkpoints):
+        calls.append(credits)
+        return len(calls) > 1
+
+    cog = vocal(write_sessions)
+    two_minutes_together(cog.sessions)
+
+    asyncio.run(cog.accrue())
+    assert 130 <= cog.sessions.get(1, 10).active < 131
+    assert [session.member_id for session in cog.sessions.closed] == [11]
+    assert cog.checkpointed == {1}
+
+    asyncio.run(cog.accrue())
+    assert calls[-1] == {10: [120, 0], 11: [120, 0]}
+    assert 10 <= cog.sessions.get(1, 10).active < 11 and cog.sessions.closed == []
+
+
+def test_cancelled_accrual_still_writes_once():
+    written = []
+
+    async def write_sessions(guild_id, credits, checkpoints):
+        await asyncio.sleep(0.05)
+        written.append(credits)
+        return True
+
+    cog = vocal(write_sessions)
+    two_minutes_together(cog.sessions)
+
+    async def run():
+        task = asyncio.create_task(cog.accrue())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        # Comme cog_unload : un dernier relevé après l'annulation de la boucle
+        await cog.accrue()
+
+    asyncio.run(run())
+    assert written[0] == {10: [120, 0], 11: [120, 0]}
+    assert all(not credits for credits in written[1:])
@@ -0,0 +1,79 @@
+import asyncio
+from contextlib import asynccontextmanager
+import time
+from types import SimpleNamespace
+
+from plugins.vocal.main import Vocal
+from utils.database import Database
+from utils.voice_sessions import VoiceSessions
+
+
+class FlakyDatabase:
+    """Base dont la lecture d'un serveur échoue tant qu'il est dans 'broken'"""
+    def __init__(self, database, broken):
+        self.database = database
+        self.broken = broken
+
+    @asynccontextmanager
+    async def read(self, guild):
+        if guild.id in self.broken:
+            raise OSError("disk I/O error")
+        async with self.database.read(guild) as connection:
+            yield connection
+
+
+def guild(guild_id, member_ids):
+    serveur = SimpleNamespace(id=guild_id, name=f"serveur{guild_id}", afk_channel=None)
+    channel = SimpleNamespace(id=guild_id * 100)
+    members = {member_id: SimpleNamespace(id=member_id, bot=False, guild=serveur) for member_id in member_ids}
+    channel.voice_states = {member_id: SimpleNamespace(channel=channel, self_mute=False) for member_id in member_ids}
+    serveur.voice_channels = [channel]
+    serveur.get_member = members.get
+    return serveur
+
+
+def test_failed_guild_read_is_retried_before_anything_is_written(tmp_path):
+    written = {}
+
+    async def write_sessions(guild_id, credits, checkpoints):
+        written[guild_id] = credits
+        return True
+
+    async def run():
+        database = Database(tmp_path)
+        guilds = [guild(1, [10, 11]), guild(2, [20, 21])]
+        for serveur in guilds:
+            async with database.write(serveur) as connection:
+                await connection.execute(
+                    "INSERT INTO VoiceSessions (id, channel_id, state, active, afk, checkpoint) VALUES (?,?,?,?,?,?)",
+                    (serveur.id * 10, serveur.id * 100, 'active', 90.0, 0.0, time.time())
+                )
+
+        cog = Vocal.__new__(Vocal)
+        cog.bot = SimpleNamespace(guilds=guilds, is_ready=lambda: True)
+        cog.database = FlakyDatabase(database, broken={1})
+        cog.sessions = VoiceSessions()
+        cog.user_blocked = {}
+        cog.checkpointed = set()
+        cog.reconciled_guilds = set()
+        cog.reconciled = False
+        cog.reconcile_lock = asyncio.Lock()
+        cog.writing = None
+        cog.write_sessions = write_sessions
+
+        await cog.reconcile()
+        await cog.accrue()
+        blocked = dict(written), cog.reconciled
+
+        cog.database.broken.clear()
+        await cog.accrue()
+        await database.close()
+        return blocked, cog
+
+    (blocked, reconciled), cog = asyncio.run(run())
+    assert blocked == {} and not reconciled
+    assert cog.reconciled and cog.reconciled_guilds == {1, 2}
+    # Les 90 s sauvegardées (+ l'interruption) ne sont reprises qu'une fois par serveur
+    assert set(written) == {1, 2}
+    assert written[1] == {10: [60, 0]} and written[2] == {20: [60, 0]}
+    assert 30 <= cog.sessions.get(1, 10).active < 32 and 30 <= cog.sessions.get(2, 20).active < 32
@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+from utils.voice_events import VoiceEventDispatcher, VoiceEventType, classify
+
+
+AFK = SimpleNamespace(id=999)
+GENERAL = SimpleNamespace(id=100)
+JEUX = SimpleNamespace(id=200)
+MEMBER = SimpleNamespace(id=10, guild=SimpleNamespace(id=1, name="serveur", afk_channel=AFK))
+
+
+def state(channel=None, self_mute=False, self_deaf=False):
+    return SimpleNamespace(channel=channel, self_mute=self_mute, self_deaf=self_deaf)
+
+
+def test_classify():
+    assert classify(MEMBER, state(), state(GENERAL)) == VoiceEventType.JOIN
+    assert classify(MEMBER, state(GENERAL, self_mute=True), state()) == VoiceEventType.LEAVE
+    assert classify(MEMBER, state(GENERAL), state(JEUX)) == VoiceEventType.MOVE
+    assert classify(MEMBER, state(GENERAL), state(AFK)) == VoiceEventType.MOVE | VoiceEventType.AFK
+    assert classify(MEMBER, state(), state(AFK)) == VoiceEventType.JOIN | VoiceEventType.AFK
+    assert classify(MEMBER, state(GENERAL), state(GENERAL, self_mute=True)) == VoiceEventType.MUTE
+    assert classify(MEMBER, state(GENERAL, self_mute=True), state(GENERAL)) == VoiceEventType.UNMUTE
+    assert classify(MEMBER, state(GENERAL), state(JEUX, self_mute=True)) == VoiceEventType.MOVE | VoiceEventType.MUTE
+    assert classify(MEMBER, state(GENERAL), state(GENERAL, self_deaf=True)) == VoiceEventType.OTHER
+
+
+def test_classify_without_afk_channel():
+    member = SimpleNamespace(id=10, guild=SimpleNamespace(id=1, afk_channel=None))
+    assert classify(member, state(GENERAL), state(AFK)) == VoiceEventType.MOVE
+
+
+def test_dispatch_filters_orders_and_isolates_handlers():
+    calls = []
+
+    def handler(name, fail=False):
+        async def callback(event):
+            calls.append((name, event.type))
+            if fail:
+                raise RuntimeError("boom")
+        return callback
+
+    dispatcher = VoiceEventDispatcher()
+    dispatcher.subscribe('api', handler('api'), VoiceEventType.JOIN, order=0, locked=False)
+    dispatcher.subscribe('late', handler('late'), order=50)
+    dispatcher.subscribe('broken', handler('broken', fail=True), order=10)
+    dispatcher.subscribe('mute', handler('mute'), VoiceEventType.MUTE, order=20)
+    # Un handler du même nom remplace l'ancien
+    dispatcher.subscribe('late', handler('late'), order=5)
+
+    asyncio.run(dispatcher.dispatch(MEMBER, state(), state(GENERAL)))
+
+    join = VoiceEventType.JOIN
+    assert calls == [('late', join), ('broken', join), ('api', join)]
+    stats = dispatcher.stats()
+    assert stats['broken']['errors'] == 1 and stats['mute']['calls'] == 0
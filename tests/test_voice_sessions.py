@@ -0,0 +1,64 @@
+from utils.voice_sessions import VoiceSessions, VoiceState
+
+
+def test_time_is_counted_only_with_another_human():
+    sessions = VoiceSessions()
+    alice = sessions.update(1, 10, 100, now=0)
+    assert alice.state is VoiceState.ALONE
+
+    bob = sessions.update(1, 11, 100, now=30)
+    assert alice.state is VoiceState.ACTIVE and bob.state is VoiceState.ACTIVE
+    assert alice.active == 0
+
+    # Bob part : Alice redevient seule, les 50 s passées à deux sont comptées une fois
+    assert sessions.update(1, 11, None, now=80) is None
+    assert alice.state is VoiceState.ALONE and alice.active == 50
+    assert sessions.humans(100) == 1
+
+    sessions.collect(now=200)
+    assert alice.active == 50
+
+
+def test_muted_and_afk_states():
+    sessions = VoiceSessions()
+    alice = sessions.update(1, 10, 100, now=0)
+    sessions.update(1, 11, 100, now=0)
+
+    sessions.update(1, 10, 100, muted=True, now=40)
+    assert alice.state is VoiceState.MUTED and alice.active == 40
+    sessions.update(1, 10, 100, now=70)
+    assert alice.state is VoiceState.ACTIVE and alice.active == 40
+
+    sessions.update(1, 10, 999, afk=True, now=100)
+    assert alice.state is VoiceState.AFK and alice.active == 70
+    sessions.collect(now=160)
+    assert alice.afk == 60 and sessions.humans(100) == 1
+
+
+def test_take_keeps_the_sub_minute_remainder():
+    sessions = VoiceSessions()
+    alice = sessions.update(1, 10, 100, now=0)
+    sessions.update(1, 11, 100, now=0)
+
+    sessions.collect(now=150.5)
+    assert alice.take() == (120, 0)
+    assert alice.active == 30.5
+
+    # Le reste s'ajoute au relevé suivant
+    sessions.collect(now=180.5)
+    assert alice.take() == (60, 0) and alice.active == 0.5
+
+
+def test_closed_sessions_are_collected_once():
+    sessions = VoiceSessions()
+    sessions.update(1, 10, 100, now=0)
+    sessions.update(1, 11, 100, now=0)
+    sessions.update(1, 12, 200, counted=False, now=0)
+    sessions.update(1, 11, None, now=90)
+    sessions.update(1, 12, None, now=90)
+
+    collected = sessions.collect(now=90)
+    assert [session.member_id for session in collected] == [10, 11]
+    assert collected[1].take() == (60, 0)
+    assert sessions.collect(now=90) == [sessions.get(1, 10)]
+    assert len(sessions) == 1
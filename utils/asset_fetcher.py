@@ -0,0 +1,211 @@
+import asyncio
+from collections import OrderedDict
+import hashlib
+import os
+from pathlib import Path
+import threading
+import time
+
+import aiohttp
+import discord
+
+from logs.logger_config import setup_logger
+
+
+logger = setup_logger()
+
+
+CACHE_FOLDER = Path(__file__).resolve().parent.parent / 'cache' / 'assets'
+MEMORY_LIMIT = 32 * 1024 * 1024     # octets gardés en mémoire
+DISK_LIMIT = 256 * 1024 * 1024      # octets gardés sur le disque
+DISK_MAX_AGE = 30 * 24 * 3600       # secondes sans utilisation avant suppression du disque
+TIMEOUT = 10                        # secondes par téléchargement
+
+
+
+class AssetFetcher:
+    """Télécharge les avatars et bannières sans bloquer la boucle asyncio
+
+    Les images sont gardées en mémoire (LRU borné en octets) et sur le disque,
+    sous le hash de l'asset discord qui change dès que l'image change. Deux
+    demandes simultanées de la même image partagent un seul téléchargement.
+    Le cache disque est nettoyé quand il dépasse sa taille : les fichiers
+    inutilisés depuis DISK_MAX_AGE, puis les moins récemment utilisés.
+    """
+    def __init__(self, folder: Path=CACHE_FOLDER, max_bytes: int=MEMORY_LIMIT, session: aiohttp.ClientSession | None=None,
+                 max_disk_bytes: int=DISK_LIMIT, max_age: float=DISK_MAX_AGE) -> None:
+        """
+        Args:
+            folder (Path, optional): Dossier du cache disque
+            max_bytes (int, optional): Taille maximale du cache mémoire
+            session (aiohttp.ClientSession | None, optional): Session HTTP à utiliser (ex: tests)
+            max_disk_bytes (int, optional): Taille maximale du cache disque
+            max_age (float, optional): Durée sans utilisation avant suppression du disque
+        """
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age = max_age
+        self.disk_size: int | None = None     # calculée au premier nettoyage
+        # Les écritures disque tournent dans plusieurs threads (asyncio.to_thread)
+        self.disk_lock = threading.Lock()
+        self.session = session
+        self.owns_session = session is None
+        self.memory: OrderedDict[str, bytes] = OrderedDict()
+        self.memory_size = 0
+        self.in_flight: dict[str, asyncio.Future[bytes]] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.downloads = 0
+
+
+    def key(self, asset: discord.Asset | str) -> str:
+        """Renvoie la clé de cache d'un asset discord ou d'une url
+
+        Args:
+            asset (discord.Asset | str): Asset ou lien de l'image
+
+        Returns:
+            str: Hash de l'asset, ou sha256 de l'url
+        """
+        if isinstance(asset, discord.Asset):
+            return asset.key
+        return hashlib.sha256(asset.encode()).hexdigest()
+
+    async def fetch(self, asset: discord.Asset | str) -> bytes:
+        """Renvoie le contenu d'une image, depuis le cache si possible
+
+        Args:
+            asset (discord.Asset | str): Asset ou lien de l'image
+
+        Returns:
+            bytes: Contenu de l'image
+        """
+        key = self.key(asset)
+        if (content := self.memory.get(key)) is not None:
+            self.hits += 1
+            self.memory.move_to_end(key)
+            return content
+
+        if future := self.in_flight.get(key):
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            content = await self.load(key, asset)
+            future.set_result(content)
+            self.remember(key, content)
+            return content
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # Évite le warning "exception never retrieved" s'il n'y a pas d'autre demandeur
+            future.exception()
+            raise
+        finally:
+            del self.in_flight[key]
+
+    async def load(self, key: str, asset: discord.Asset | str) -> bytes:
+        path = self.folder / key
+        if path.exists():
+            self.disk_hits += 1
+            return await asyncio.to_thread(self.read_disk, path)
+
+        self.downloads += 1
+        if isinstance(asset, discord.Asset):
+            # Passe par la session HTTP du bot
+            content = await asyncio.wait_for(asset.read(), TIMEOUT)
+        else:
+            content = await self.download(asset)
+
+        await asyncio.to_thread(self.write_disk, path, content)
+        return content
+
+    async def download(self, url: str) -> bytes:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=TIMEOUT))
+            self.owns_session = True
+        async with self.session.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    def read_disk(self, path: Path) -> bytes:
+        # La date de modification sert de date de dernière utilisation pour le nettoyage
+        os.utime(path)
+        return path.read_bytes()
+
+    def write_disk(self, path: Path, content: bytes) -> None:
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix('.tmp')
+            tmp.write_bytes(content)
+            tmp.replace(path)
+        except OSError as error:
+            logger.error(f"Cache disque impossible pour {path.name}: {error}")
+            return
+
+        with self.disk_lock:
+            if self.disk_size is not None:
+                self.disk_size += len(content)
+            if self.disk_size is None or self.disk_size > self.max_disk_bytes:
+                self.prune()
+
+    def prune(self) -> None:
+        """Supprime du disque les images trop anciennes, puis les moins récemment utilisées
+        jusqu'à repasser sous 90% de la taille maximale, appelé sous disk_lock
+        """
+        files = []
+        for entry in os.scandir(self.folder):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.is_file():
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+
+        expired = time.time() - self.max_age
+        size = sum(file_size for _, file_size, _ in files)
+        removed = 0
+        for mtime, file_size, path in files:
+            if mtime >= expired and size <= self.max_disk_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= file_size
+            removed += 1
+
+        self.disk_size = size
+        if removed:
+            logger.info(f"Cache disque : {removed} images supprimées, {size // 1024} Ko restants")
+
+    def remember(self, key: str, content: bytes) -> None:
+        if len(content) > self.max_bytes:
+            return
+        if (old := self.memory.pop(key, None)) is not None:
+            self.memory_size -= len(old)
+        self.memory[key] = content
+        self.memory_size += len(content)
+        while self.memory_size > self.max_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_size -= len(evicted)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'size': len(self.memory),
+            'bytes': self.memory_size,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'downloads': self.downloads,
+            'disk_bytes': self.disk_size or 0,
+            'in_flight': len(self.in_flight),
+        }
+
+    async def close(self) -> None:
+        if self.owns_session and self.session and not self.session.closed:
+            await self.session.close()
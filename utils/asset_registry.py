@@ -0,0 +1,104 @@
+import os
+import time
+from typing import Any, Callable
+
+from PIL import Image, ImageFont
+
+
+CARD_SIZE = (1100, 500)
+CHECK_INTERVAL = 5      # secondes entre deux vérifications d'un même fichier
+
+
+
+class AssetRegistry:
+    """Polices et fonds d'images chargés une seule fois puis gardés en mémoire
+
+    Chaque entrée garde la date de modification du fichier : si le fichier
+    change sur le disque, il est rechargé au prochain accès. La date n'est
+    relue qu'une fois toutes les CHECK_INTERVAL secondes par fichier.
+
+    Le registre vit dans le processus qui fait le rendu : chaque worker du
+    Renderer a le sien, rempli au premier rendu.
+    """
+    def __init__(self, check_interval: float=CHECK_INTERVAL) -> None:
+        """
+        Args:
+            check_interval (float, optional): Délai entre deux vérifications d'un fichier
+        """
+        self.check_interval = check_interval
+        # clé -> (date de modification, date de la dernière vérification, objet chargé)
+        self.entries: dict[tuple, tuple[float, float, Any]] = {}
+        self.loads = 0
+
+
+    def get(self, key: tuple, path: str, loader: Callable[[], Any]) -> Any:
+        """Renvoie l'objet chargé depuis path, en le rechargeant si le fichier a changé
+
+        Args:
+            key (tuple): Clé de l'entrée
+            path (str): Fichier surveillé
+            loader (Callable[[], Any]): Charge l'objet depuis le fichier
+
+        Returns:
+            Any: Objet chargé
+        """
+        now = time.monotonic()
+        if entry := self.entries.get(key):
+            mtime, checked, value = entry
+            if now - checked < self.check_interval:
+                return value
+            if os.stat(path).st_mtime == mtime:
+                self.entries[key] = mtime, now, value
+                return value
+
+        mtime = os.stat(path).st_mtime
+        value = loader()
+        self.loads += 1
+        self.entries[key] = mtime, now, value
+        return value
+
+    def font(self, path: str, size: int) -> ImageFont.FreeTypeFont:
+        """Renvoie la police à la taille demandée
+
+        Args:
+            path (str): Chemin du fichier de police
+            size (int): Taille de la police
+
+        Returns:
+            ImageFont.FreeTypeFont: Police partagée, à ne pas modifier
+        """
+        return self.get(('font', path, size), path, lambda: ImageFont.truetype(path, size))
+
+    def background(self, path: str, size: tuple[int, int]=CARD_SIZE) -> Image.Image:
+        """Renvoie une copie du fond, déjà redimensionné et converti en RGBA
+
+        Args:
+            path (str): Chemin de l'image de fond
+            size (tuple[int, int], optional): Taille de la carte
+
+        Returns:
+            Image.Image: Copie modifiable du fond
+        """
+        image = self.get(('background', path, size), path, lambda: fit(Image.open(path), size))
+        return image.copy()
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+
+def fit(image: Image.Image, size: tuple[int, int]=CARD_SIZE) -> Image.Image:
+    """Redimensionne une image à la taille de la carte en RGBA
+
+    Args:
+        image (Image.Image): Image d'origine
+        size (tuple[int, int], optional): Taille de la carte
+
+    Returns:
+        Image.Image: Image prête pour la composition
+    """
+    return image.convert('RGBA').resize(size)
+
+
+
+registry = AssetRegistry()
@@ -0,0 +1,108 @@
+import asyncio
+from collections import deque
+import time
+
+import discord
+
+from logs.logger_config import setup_logger
+
+
+logger = setup_logger()
+
+
+RENAMES_PER_WINDOW = 2
+WINDOW = 600            # secondes : discord limite à ~2 renommages par 10 minutes
+DEBOUNCE = 5            # secondes d'attente pour regrouper une rafale de demandes
+
+
+
+class ChannelRenamer:
+    """Renomme les salons en tâche de fond en respectant la limite de discord
+
+    Seul le dernier nom demandé par salon est gardé : pendant un raid, les
+    centaines de demandes de renommage du compteur de membres se résument à un
+    seul appel par fenêtre, et les listeners n'attendent jamais l'API.
+    """
+    def __init__(self, per_window: int=RENAMES_PER_WINDOW, window: float=WINDOW, debounce: float=DEBOUNCE) -> None:
+        """
+        Args:
+            per_window (int, optional): Nombre de renommages autorisés par fenêtre
+            window (float, optional): Durée de la fenêtre en secondes
+            debounce (float, optional): Délai de regroupement des demandes
+        """
+        self.per_window = per_window
+        self.window = window
+        self.debounce = debounce
+        self.desired: dict[int, str] = {}
+        self.history: dict[int, deque[float]] = {}
+        self.tasks: dict[int, asyncio.Task] = {}
+        self.coalesced = 0
+
+
+    def rename(self, channel: discord.abc.GuildChannel | None, name: str) -> None:
+        """Demande le renommage d'un salon, sans attendre
+
+        Args:
+            channel (discord.abc.GuildChannel | None): Salon à renommer
+            name (str): Nouveau nom
+        """
+        if channel is None:
+            return
+
+        if channel.id in self.desired:
+            self.coalesced += 1
+        self.desired[channel.id] = name
+
+        task = self.tasks.get(channel.id)
+        if task is None or task.done():
+            self.tasks[channel.id] = asyncio.get_running_loop().create_task(self.worker(channel))
+
+    def delay(self, channel_id: int) -> float:
+        """Renvoie le temps à attendre avant de pouvoir renommer le salon
+
+        Args:
+            channel_id (int): Id du salon
+
+        Returns:
+            float: Secondes avant la fin de la fenêtre, 0 si un renommage est possible
+        """
+        history = self.history.setdefault(channel_id, deque(maxlen=self.per_window))
+        if len(history) < self.per_window:
+            return 0
+        return max(history[0] + self.window - time.monotonic(), 0)
+
+    async def worker(self, channel: discord.abc.GuildChannel) -> None:
+        """Applique le dernier nom demandé tant qu'il diffère du nom actuel"""
+        try:
+            await asyncio.sleep(self.debounce)
+            while (name := self.desired.get(channel.id)) is not None:
+                if name == channel.name:
+                    break
+
+                if wait := self.delay(channel.id):
+                    await asyncio.sleep(wait)
+                    continue
+
+                self.history[channel.id].append(time.monotonic())
+                try:
+                    await channel.edit(name=name)
+                except discord.HTTPException as error:
+                    logger.error(f"Renommage du salon {channel.id} impossible: {error}")
+                    break
+
+                # Le cache du salon n'est mis à jour qu'à la réception de l'event
+                if self.desired.get(channel.id) == name:
+                    break
+        finally:
+            self.desired.pop(channel.id, None)
+            self.tasks.pop(channel.id, None)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'pending': len(self.desired),
+            'coalesced': self.coalesced,
+        }
+
+    def close(self) -> None:
+        for task in list(self.tasks.values()):
+            task.cancel()
@@ -0,0 +1,42 @@
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.welcome_card import encode_png
+
+
+# Fonctions pures exécutées dans les workers du Renderer (utils/render.py)
+
+BAR_HEIGHT = 28
+BAR_GAP = 8
+LABEL_WIDTH = 180
+CHART_WIDTH = 700
+BAR_COLOR = (88, 101, 242)      # blurple discord
+TEXT_COLOR = (255, 255, 255)
+BACKGROUND = (47, 49, 54)
+
+
+
+def bar_chart(labels: list[str], values: list[int]) -> bytes:
+    """Dessine un histogramme horizontal, une barre par valeur
+
+    Args:
+        labels (list[str]): Nom de chaque barre
+        values (list[int]): Valeur de chaque barre
+
+    Returns:
+        bytes: Image PNG
+    """
+    height = BAR_GAP + len(values) * (BAR_HEIGHT + BAR_GAP)
+    image = Image.new('RGB', (CHART_WIDTH, max(height, BAR_HEIGHT)), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    biggest = max(values, default=0) or 1
+    bar_space = CHART_WIDTH - LABEL_WIDTH - 60
+    for i, (label, value) in enumerate(zip(labels, values)):
+        y = BAR_GAP + i * (BAR_HEIGHT + BAR_GAP)
+        width = int(bar_space * value / biggest)
+        draw.text((8, y + BAR_HEIGHT // 3), label[:28], font=font, fill=TEXT_COLOR)
+        draw.rectangle((LABEL_WIDTH, y, LABEL_WIDTH + width, y + BAR_HEIGHT), fill=BAR_COLOR)
+        draw.text((LABEL_WIDTH + width + 8, y + BAR_HEIGHT // 3), str(value), font=font, fill=TEXT_COLOR)
+
+    return encode_png(image)
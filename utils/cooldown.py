@@ -0,0 +1,102 @@
+import heapq
+import time
+
+
+
+class CooldownStore:
+    """Cooldowns par (serveur, membre) qui expirent d'eux-mêmes
+
+    Les échéances sont gardées dans un dict et dans un tas trié par date
+    d'expiration : les cooldowns terminés sont retirés par le haut du tas à
+    chaque accès, et au-delà de max_size c'est celui qui expire le plus tôt qui
+    est oublié. La mémoire reste bornée même avec beaucoup de membres.
+    """
+    def __init__(self, duration: float, max_size: int=10_000) -> None:
+        """
+        Args:
+            duration (float): Durée du cooldown en secondes
+            max_size (int, optional): Nombre maximal de cooldowns gardés en mémoire
+        """
+        self.duration = duration
+        self.max_size = max_size
+        self.expiries: dict[tuple[int, int], float] = {}
+        self.heap: list[tuple[float, tuple[int, int]]] = []
+        self.suppressed = 0
+        self.allowed = 0
+
+
+    def __len__(self) -> int:
+        return len(self.expiries)
+
+    def ready(self, guild_id: int, member_id: int) -> bool:
+        """Indique si le membre est hors cooldown, compte les refus
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+
+        Returns:
+            bool: True si l'action est autorisée
+        """
+        now = time.monotonic()
+        self.prune(now)
+        if self.expiries.get((guild_id, member_id), 0) > now:
+            self.suppressed += 1
+            return False
+
+        self.allowed += 1
+        return True
+
+    def start(self, guild_id: int, member_id: int) -> None:
+        """Démarre (ou relance) le cooldown d'un membre
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+        """
+        now = time.monotonic()
+        self.prune(now)
+        key = guild_id, member_id
+        expiry = now + self.duration
+        self.expiries[key] = expiry
+        heapq.heappush(self.heap, (expiry, key))
+
+        while len(self.expiries) > self.max_size:
+            self.pop_earliest()
+
+        # Les entrées relancées laissent une ancienne échéance dans le tas
+        if len(self.heap) > 2 * self.max_size:
+            self.heap = [(expiry, key) for key, expiry in self.expiries.items()]
+            heapq.heapify(self.heap)
+
+    def reset(self, guild_id: int, member_id: int) -> None:
+        """Annule le cooldown d'un membre
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+        """
+        self.expiries.pop((guild_id, member_id), None)
+
+    def prune(self, now: float) -> None:
+        """Retire les cooldowns expirés"""
+        while self.heap and self.heap[0][0] <= now:
+            self.pop_earliest()
+
+    def pop_earliest(self) -> None:
+        expiry, key = heapq.heappop(self.heap)
+        # Ignore les échéances remplacées par un start() plus récent
+        if self.expiries.get(key) == expiry:
+            del self.expiries[key]
+
+    def stats(self) -> dict[str, int]:
+        """Renvoie les compteurs du cooldown
+
+        Returns:
+            dict[str, int]: Taille, actions autorisées et actions bloquées
+        """
+        return {
+            'size': len(self),
+            'allowed': self.allowed,
+            'suppressed': self.suppressed,
+        }
@@ -0,0 +1,233 @@
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+import discord
+import aiosqlite
+
+from logs.logger_config import setup_logger
+
+
+logger = setup_logger()
+
+
+DATABASE_FOLDER = Path(__file__).resolve().parent.parent / 'databases'
+READERS = 2
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=134217728",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Chaque entrée est une version du schéma, appliquée une seule fois dans l'ordre.
+# PRAGMA user_version garde le numéro de la dernière version appliquée.
+MIGRATIONS: list[tuple[str, ...]] = [
+    # 1 : schéma historique des plugins + index des colonnes chaudes
+    (
+        "CREATE TABLE IF NOT EXISTS Rank (id INTEGER PRIMARY KEY, name str, msg int, xp int, lvl int, rang int, add_xp_counter int, remove_xp_counter int, added_xp int, removed_xp int)",
+        "CREATE TABLE IF NOT EXISTS Vocal (id INTEGER PRIMARY KEY, name str, time int, afk int, lvl int, rang int, add_xp_counter int, remove_xp_counter int, added_xp int, removed_xp int)",
+        "CREATE TABLE IF NOT EXISTS Members (id INTEGER PRIMARY KEY, name str, invited_by int, join_method str, join_date str, invite_count int DEFAULT 0)",
+        "CREATE TABLE IF NOT EXISTS Invites (code TEXT PRIMARY KEY, inviter_id int, inviter_name str, uses int)",
+        "CREATE INDEX IF NOT EXISTS idx_rank_xp ON Rank (xp DESC, id)",
+        "CREATE INDEX IF NOT EXISTS idx_vocal_time ON Vocal (time DESC, id)",
+        "CREATE INDEX IF NOT EXISTS idx_members_invited_by ON Members (invited_by)",
+        "CREATE INDEX IF NOT EXISTS idx_invites_inviter_id ON Invites (inviter_id)",
+    ),
+    # 2 : nombre de membres invités par inviteur, tenu à jour à chaque arrivée et départ
+    (
+        "CREATE TABLE IF NOT EXISTS InviteStats (inviter_id INTEGER PRIMARY KEY, invites int NOT NULL DEFAULT 0)",
+        "CREATE INDEX IF NOT EXISTS idx_invite_stats_invites ON InviteStats (invites DESC, inviter_id)",
+        "INSERT OR REPLACE INTO InviteStats (inviter_id, invites) "
+        "SELECT invited_by, COUNT(*) FROM Members WHERE invited_by IS NOT NULL GROUP BY invited_by",
+    ),
+    # 3 : sessions vocales en cours, sauvegardées périodiquement pour survivre aux redémarrages
+    (
+        "CREATE TABLE IF NOT EXISTS VoiceSessions (id INTEGER PRIMARY KEY, channel_id int NOT NULL, state str NOT NULL, "
+        "active real NOT NULL DEFAULT 0, afk real NOT NULL DEFAULT 0, checkpoint real NOT NULL)",
+    ),
+    # 4 : salons vocaux temporaires et leur propriétaire (NULL : salon vide gardé en réserve)
+    (
+        "CREATE TABLE IF NOT EXISTS TempChannels (channel_id INTEGER PRIMARY KEY, owner_id int)",
+    ),
+]
+
+
+
+def guild_id_of(guild: discord.abc.Snowflake | int) -> int:
+    """Renvoie l'id d'un serveur passé en objet ou en id"""
+    return guild if isinstance(guild, int) else guild.id
+
+
+
+class GuildDatabase:
+    """Base de données d'un serveur : un écrivain sérialisé et un pool de lecteurs"""
+    def __init__(self, path: Path, readers: int=READERS) -> None:
+        self.path = path
+        self.readers_count = readers
+        self.writer: aiosqlite.Connection = None
+        self.write_lock = asyncio.Lock()
+        self.readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self.connections: list[aiosqlite.Connection] = []
+
+
+    async def open(self) -> None:
+        """Ouvre les connexions, règle les pragmas et applique les migrations"""
+        self.writer = await self.connect()
+        await self.migrate()
+
+        for _ in range(self.readers_count):
+            reader = await self.connect()
+            await reader.execute("PRAGMA query_only=ON")
+            self.readers.put_nowait(reader)
+
+    async def connect(self) -> aiosqlite.Connection:
+        connection = await aiosqlite.connect(self.path)
+        for pragma in PRAGMAS:
+            await connection.execute(pragma)
+        self.connections.append(connection)
+        return connection
+
+    async def migrate(self) -> int:
+        """Applique les migrations qui n'ont pas encore été jouées sur cette base
+
+        Returns:
+            int: Version du schéma après migration
+        """
+        version = (await self.writer.execute_fetchall("PRAGMA user_version"))[0][0]
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for statement in statements:
+                await self.writer.execute(statement)
+            await self.writer.execute(f"PRAGMA user_version={number}")
+            await self.writer.commit()
+            logger.info(f"{self.path.stem}: migration {number} appliquée")
+
+        return len(MIGRATIONS)
+
+    @asynccontextmanager
+    async def write(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Donne l'accès exclusif à la connexion d'écriture.
+        La transaction est validée à la sortie, annulée en cas d'erreur.
+        """
+        async with self.write_lock:
+            try:
+                yield self.writer
+            except BaseException:
+                await self.writer.rollback()
+                raise
+            else:
+                await self.writer.commit()
+
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Emprunte une connexion de lecture au pool"""
+        reader = await self.readers.get()
+        try:
+            yield reader
+        finally:
+            self.readers.put_nowait(reader)
+
+    async def close(self) -> None:
+        for connection in self.connections:
+            await connection.close()
+        self.connections.clear()
+
+
+
+class Database:
+    """Bases de données de tous les serveurs, indexées par id de serveur"""
+    def __init__(self, folder: Path=DATABASE_FOLDER) -> None:
+        self.folder = folder
+        self.guilds: dict[int, GuildDatabase] = {}
+        self.locks: dict[int, asyncio.Lock] = {}
+
+
+    def path(self, guild: discord.abc.Snowflake | int) -> Path:
+        return self.folder / f"{guild_id_of(guild)}.sqlite"
+
+    def adopt_legacy_file(self, guild: discord.Guild) -> None:
+        """Renomme l'ancienne base nommée d'après le nom du serveur en base nommée d'après son id
+
+        Args:
+            guild (discord.Guild): Serveur
+        """
+        path = self.path(guild)
+        legacy = self.folder / f"{guild.name}.sqlite"
+        if path.exists() or not legacy.exists():
+            return
+
+        logger.info(f"Renommage de la BDD {legacy.name} en {path.name}")
+        for suffix in ('', '-wal', '-shm'):
+            if (old := Path(f"{legacy}{suffix}")).exists():
+                old.rename(f"{path}{suffix}")
+
+    async def open(self, guild: discord.abc.Snowflake | int) -> GuildDatabase:
+        """Ouvre la base d'un serveur si elle ne l'est pas déjà
+
+        Args:
+            guild (discord.abc.Snowflake | int): Serveur ou id du serveur
+
+        Returns:
+            GuildDatabase: Base du serveur
+        """
+        guild_id = guild_id_of(guild)
+        if database := self.guilds.get(guild_id):
+            return database
+
+        async with self.locks.setdefault(guild_id, asyncio.Lock()):
+            if database := self.guilds.get(guild_id):
+                return database
+
+            self.folder.mkdir(exist_ok=True)
+            if isinstance(guild, discord.Guild):
+                self.adopt_legacy_file(guild)
+            logger.info(f"Connection à la BDD {guild_id}")
+            database = GuildDatabase(self.path(guild_id))
+            await database.open()
+            self.guilds[guild_id] = database
+            return database
+
+    @asynccontextmanager
+    async def write(self, guild: discord.abc.Snowflake | int) -> AsyncIterator[aiosqlite.Connection]:
+        """Connexion d'écriture du serveur, validée à la sortie du bloc
+
+        Args:
+            guild (discord.abc.Snowflake | int): Serveur ou id du serveur
+        """
+        database = await self.open(guild)
+        async with database.write() as connection:
+            yield connection
+
+    @asynccontextmanager
+    async def read(self, guild: discord.abc.Snowflake | int) -> AsyncIterator[aiosqlite.Connection]:
+        """Connexion de lecture du serveur
+
+        Args:
+            guild (discord.abc.Snowflake | int): Serveur ou id du serveur
+        """
+        database = await self.open(guild)
+        async with database.read() as connection:
+            yield connection
+
+    async def reload(self, guild: discord.abc.Snowflake | int) -> GuildDatabase:
+        """Ferme puis rouvre la base d'un serveur
+
+        Args:
+            guild (discord.abc.Snowflake | int): Serveur ou id du serveur
+
+        Returns:
+            GuildDatabase: Base du serveur
+        """
+        if database := self.guilds.pop(guild_id_of(guild), None):
+            async with database.write_lock:
+                await database.close()
+        return await self.open(guild)
+
+    async def close(self) -> None:
+        for database in self.guilds.values():
+            await database.close()
+        self.guilds.clear()
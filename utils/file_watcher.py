@@ -0,0 +1,204 @@
+import asyncio
+import ctypes
+import ctypes.util
+import os
+from pathlib import Path
+import select
+import struct
+import threading
+from typing import Awaitable, Callable
+
+from logs.logger_config import setup_logger
+
+
+logger = setup_logger()
+
+
+DEBOUNCE = 0.5          # secondes sans modification avant de signaler une rafale
+POLL_INTERVAL = 3       # secondes entre deux parcours en mode polling
+SUFFIXES = ('.py', '.json')
+IGNORED_DIRS = ('__pycache__', '.git', 'databases', 'cache', 'logs')
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = struct.Struct('iIII')   # wd, mask, cookie, len
+
+
+
+class FileWatcher:
+    """Surveille les fichiers .py et .json d'un dossier, dans un thread
+
+    inotify est utilisé quand il est disponible (Linux, via ctypes) : le thread
+    dort jusqu'à la prochaine écriture. Sinon les dates de modification sont
+    comparées toutes les POLL_INTERVAL secondes. Les modifications sont
+    regroupées : le callback reçoit l'ensemble des fichiers touchés une fois
+    qu'aucun n'a changé pendant DEBOUNCE secondes.
+    """
+    def __init__(self, root: Path, callback: Callable[[set[Path]], Awaitable[None]],
+                 debounce: float=DEBOUNCE, poll_interval: float=POLL_INTERVAL) -> None:
+        """
+        Args:
+            root (Path): Dossier surveillé, sous-dossiers compris
+            callback (Callable[[set[Path]], Awaitable[None]]): Coroutine appelée avec les fichiers modifiés
+            debounce (float, optional): Délai de regroupement des modifications
+            poll_interval (float, optional): Période du mode polling
+        """
+        self.root = root
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.loop: asyncio.AbstractEventLoop = None
+        self.thread: threading.Thread = None
+        self.stopping = threading.Event()
+        self.pending: set[Path] = set()
+        self.timer: asyncio.TimerHandle = None
+        # Références aux callbacks en cours, sinon ramassés par le garbage collector
+        self.tasks: set[asyncio.Task] = set()
+        self.backend = None
+        self.batches = 0
+
+
+    def start(self) -> None:
+        """Démarre la surveillance dans un thread, avec inotify si possible"""
+        self.loop = asyncio.get_running_loop()
+        self.stopping.clear()
+        try:
+            inotify = self.inotify_init()
+            target, args = self.watch_inotify, (inotify,)
+            self.backend = 'inotify'
+        except (OSError, AttributeError) as error:
+            logger.warning(f"inotify indisponible ({error}), surveillance des fichiers par polling")
+            target, args = self.watch_polling, ()
+            self.backend = 'polling'
+
+        self.thread = threading.Thread(target=self.run, args=(target, *args), name="file-watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopping.set()
+        if self.timer:
+            self.timer.cancel()
+
+    def run(self, target: Callable, *args) -> None:
+        try:
+            target(*args)
+        except Exception as error:
+            logger.error(f"Surveillance des fichiers arrêtée ({error.__class__.__name__} {error})")
+
+    def watched(self, path: Path) -> bool:
+        try:
+            parts = path.relative_to(self.root).parts
+        except ValueError:
+            return False
+        return path.suffix in SUFFIXES and not any(part in IGNORED_DIRS for part in parts)
+
+    def directories(self):
+        for directory, subdirs, _ in os.walk(self.root):
+            subdirs[:] = [subdir for subdir in subdirs if subdir not in IGNORED_DIRS]
+            yield Path(directory)
+
+    def notify(self, path: Path) -> None:
+        """Signale un fichier modifié depuis le thread"""
+        if self.watched(path):
+            self.loop.call_soon_threadsafe(self.collect, path)
+
+    def collect(self, path: Path) -> None:
+        """Ajoute le fichier à la rafale en cours et repousse sa fin"""
+        self.pending.add(path)
+        if self.timer:
+            self.timer.cancel()
+        self.timer = self.loop.call_later(self.debounce, self.flush)
+
+    def flush(self) -> None:
+        self.timer = None
+        paths, self.pending = self.pending, set()
+        if paths and not self.stopping.is_set():
+            self.batches += 1
+            task = self.loop.create_task(self.callback(paths))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    # --- inotify ---
+
+    def inotify_init(self) -> tuple[ctypes.CDLL, int]:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        return libc, fd
+
+    def watch_inotify(self, inotify: tuple[ctypes.CDLL, int]):
+        """Exécuté par le thread : lit les events inotify jusqu'à l'arrêt"""
+        libc, fd = inotify
+        directories: dict[int, Path] = {}
+
+        def add_watch(directory: Path) -> None:
+            wd = libc.inotify_add_watch(fd, str(directory).encode(), WATCH_MASK)
+            if wd >= 0:
+                directories[wd] = directory
+
+        for directory in self.directories():
+            add_watch(directory)
+
+        try:
+            while not self.stopping.is_set():
+                # Réveil régulier pour voir la demande d'arrêt
+                if not select.select([fd], [], [], 1.0)[0]:
+                    continue
+
+                data = os.read(fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    wd, mask, _, length = EVENT.unpack_from(data, offset)
+                    name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b'\0').decode(errors='replace')
+                    offset += EVENT.size + length
+
+                    if mask & IN_Q_OVERFLOW:
+                        logger.warning("File inotify pleine, des modifications ont pu être perdues")
+                    elif mask & IN_IGNORED:
+                        directories.pop(wd, None)
+                    elif (directory := directories.get(wd)) is not None:
+                        path = directory / name
+                        if mask & IN_ISDIR:
+                            if mask & (IN_CREATE | IN_MOVED_TO) and name not in IGNORED_DIRS:
+                                add_watch(path)
+                        else:
+                            self.notify(path)
+        finally:
+            os.close(fd)
+
+    # --- polling ---
+
+    def snapshot(self) -> dict[Path, float]:
+        mtimes = {}
+        for directory in self.directories():
+            for entry in os.scandir(directory):
+                path = Path(entry.path)
+                if entry.is_file() and self.watched(path):
+                    try:
+                        mtimes[path] = entry.stat().st_mtime
+                    except FileNotFoundError:
+                        pass
+        return mtimes
+
+    def watch_polling(self):
+        """Exécuté par le thread : compare les dates de modification périodiquement"""
+        previous = self.snapshot()
+        while not self.stopping.wait(self.poll_interval):
+            current = self.snapshot()
+            for path in current.keys() | previous.keys():
+                if current.get(path) != previous.get(path):
+                    self.notify(path)
+            previous = current
+
+    def stats(self) -> dict[str, int | str]:
+        return {'backend': self.backend, 'batches': self.batches, 'pending': len(self.pending)}
@@ -0,0 +1,114 @@
+import asyncio
+from pathlib import Path
+import time
+
+import git
+from git import Repo
+
+from logs.logger_config import setup_logger
+
+
+logger = setup_logger()
+
+
+REMOTE = 'origin'
+BRANCH = 'main'
+BACKOFF_BASE = 60       # secondes d'attente après le premier échec, doublées à chaque échec suivant
+BACKOFF_MAX = 3600      # attente maximale entre deux tentatives après des échecs
+
+
+
+class GitSync:
+    """Synchronise un dépôt local avec une branche de son remote
+
+    Les commandes git (sous-processus et aller-retour réseau) sont exécutées
+    dans l'executor par défaut : la boucle d'events n'est jamais bloquée.
+    Le fetch est conditionnel : un ls-remote compare d'abord le commit du
+    remote à celui déjà connu, rien n'est téléchargé s'ils sont identiques.
+    Après un échec les tentatives sont espacées (backoff exponentiel).
+    """
+    def __init__(self, path: Path, remote: str=REMOTE, branch: str=BRANCH,
+                 backoff_base: float=BACKOFF_BASE, backoff_max: float=BACKOFF_MAX) -> None:
+        """
+        Args:
+            path (Path): Chemin du dépôt local
+            remote (str, optional): Nom du remote
+            branch (str, optional): Branche suivie
+            backoff_base (float, optional): Attente après le premier échec
+            backoff_max (float, optional): Attente maximale après des échecs
+        """
+        self.path = path
+        self.remote = remote
+        self.branch = branch
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.repo: Repo = None
+        self.failures = 0
+        self.retry_at = 0.0     # date (monotonic) de la prochaine tentative autorisée
+        self.checks = 0
+        self.fetches = 0
+        self.pulls = 0
+
+
+    async def poll(self) -> list[Path]:
+        """Met à jour le dépôt si la branche du remote a avancé, sans bloquer la boucle
+
+        Returns:
+            list[Path]: Fichiers modifiés par les commits récupérés, vide s'il n'y en a pas
+            ou si la tentative est repoussée après un échec
+        """
+        if time.monotonic() < self.retry_at:
+            return []
+
+        loop = asyncio.get_running_loop()
+        try:
+            changed = await loop.run_in_executor(None, self.sync)
+        except (git.GitError, IndexError, ValueError) as error:
+            # IndexError / ValueError : remote ou branche inconnus de GitPython
+            self.failures += 1
+            delay = min(self.backoff_base * 2 ** (self.failures - 1), self.backoff_max)
+            self.retry_at = time.monotonic() + delay
+            logger.warning(f"Erreur lors du pull, nouvel essai dans {delay:.0f}s : {error}")
+            return []
+
+        self.failures = 0
+        self.retry_at = 0.0
+        return [self.path / name for name in changed]
+
+    def sync(self) -> list[str]:
+        """Exécuté dans l'executor : fetch si besoin, puis fast-forward de la branche
+
+        Returns:
+            list[str]: Fichiers modifiés (relatifs au dépôt) entre l'ancien et le nouveau HEAD
+        """
+        if self.repo is None:
+            self.repo = Repo(self.path)
+        repo = self.repo
+        remote = repo.remotes[self.remote]
+        self.checks += 1
+
+        # ls-remote ne télécharge que la liste des refs
+        remote_sha = repo.git.ls_remote(self.remote, f"refs/heads/{self.branch}").partition('\t')[0]
+        tracking = f"{self.remote}/{self.branch}"
+        known_sha = repo.git.rev_parse('--verify', '--quiet', tracking, with_exceptions=False)
+        if remote_sha and remote_sha != known_sha:
+            remote.fetch(self.branch)
+            self.fetches += 1
+
+        old = repo.head.commit
+        new = remote.refs[self.branch].commit
+        if old == new or repo.is_ancestor(new, old):
+            # À jour, ou commits locaux pas encore poussés
+            return []
+        if not repo.is_ancestor(old, new):
+            # Historique divergent : rien n'est écrasé
+            logger.warning(f"Pull ignoré : {repo.active_branch.name} n'est pas en retard sur {tracking}")
+            return []
+
+        repo.git.merge('--ff-only', tracking)
+        self.pulls += 1
+        logger.info(f"Pull: {new.summary} ({old.hexsha[:7]}..{new.hexsha[:7]})")
+        return repo.git.diff('--name-only', old.hexsha, new.hexsha).splitlines()
+
+    def stats(self) -> dict[str, int]:
+        return {'checks': self.checks, 'fetches': self.fetches, 'pulls': self.pulls, 'failures': self.failures}
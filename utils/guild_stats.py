@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+
+import discord
+
+from logs.logger_config import setup_logger
+
+
+logger = setup_logger()
+
+
+SNAPSHOT_DELAY = 30     # secondes entre une modification et l'écriture du fichier
+
+
+
+class GuildStats:
+    """Nombre de membres humains et de bots par serveur, gardé en mémoire
+
+    Les compteurs sont calculés depuis le cache des membres une fois prêt, puis
+    mis à jour à chaque arrivée et départ. Le fichier n'est qu'une sauvegarde :
+    il est réécrit en tâche de fond, au plus une fois toutes les SNAPSHOT_DELAY
+    secondes, et sert uniquement tant que le cache des membres n'est pas prêt.
+    """
+    def __init__(self, path: Path, delay: float=SNAPSHOT_DELAY) -> None:
+        """
+        Args:
+            path (Path): Fichier json de sauvegarde, indexé par nom de serveur
+            delay (float, optional): Délai avant l'écriture d'une sauvegarde
+        """
+        self.path = path
+        self.delay = delay
+        self.humans: dict[int, int] = {}
+        self.bots: dict[int, int] = {}
+        self.snapshot = self.load()
+        self.snapshot_task: asyncio.Task | None = None
+
+
+    def load(self) -> dict[str, dict[str, int]]:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) as error:
+            logger.error(f"Sauvegarde {self.path.name} illisible: {error}")
+            return {}
+
+    def seed(self, guild: discord.Guild) -> bool:
+        """Compte les humains et les bots depuis le cache des membres
+
+        Args:
+            guild (discord.Guild): Serveur
+
+        Returns:
+            bool: Si le cache des membres était prêt
+        """
+        if not guild.chunked:
+            return False
+
+        bots = sum(member.bot for member in guild.members)
+        self.bots[guild.id] = bots
+        self.humans[guild.id] = len(guild.members) - bots
+        self.save(guild)
+        return True
+
+    def member_count(self, guild: discord.Guild) -> int:
+        """Renvoie le nombre de membre d'un serveur sans compter les bots
+
+        Args:
+            guild (discord.Guild): Serveur discord
+
+        Returns:
+            int: Nombre de membre
+        """
+        if guild.id in self.humans or self.seed(guild):
+            return self.humans[guild.id]
+
+        # Cache pas encore prêt : on se fie au dernier nombre de bots sauvegardé
+        bot_count = self.snapshot.get(guild.name, {}).get('bot_count', 0)
+        return guild.member_count - bot_count
+
+    def member_join(self, member: discord.Member) -> None:
+        """Compte un nouveau membre
+
+        Args:
+            member (discord.Member): Membre arrivé
+        """
+        self.update(member, +1)
+
+    def member_remove(self, member: discord.Member) -> None:
+        """Décompte un membre parti
+
+        Args:
+            member (discord.Member): Membre parti
+        """
+        self.update(member, -1)
+
+    def update(self, member: discord.Member, delta: int) -> None:
+        guild = member.guild
+        if guild.id not in self.humans:
+            # Le cache des membres inclut déjà ce changement
+            self.seed(guild)
+            return
+        counts = self.bots if member.bot else self.humans
+        counts[guild.id] += delta
+        self.save(guild)
+
+    def save(self, guild: discord.Guild) -> None:
+        """Met à jour la sauvegarde du serveur et planifie son écriture
+
+        Args:
+            guild (discord.Guild): Serveur
+        """
+        self.snapshot[guild.name] = {
+            'bot_count': self.bots[guild.id],
+            'member_count': self.humans[guild.id],
+        }
+        if self.snapshot_task is None or self.snapshot_task.done():
+            self.snapshot_task = asyncio.get_running_loop().create_task(self.write_later())
+
+    async def write_later(self) -> None:
+        await asyncio.sleep(self.delay)
+        await asyncio.to_thread(self.write, dict(self.snapshot))
+
+    def write(self, snapshot: dict[str, dict[str, int]]) -> None:
+        """Écrit la sauvegarde de façon atomique : fichier temporaire puis renommage"""
+        tmp = self.path.with_suffix('.tmp')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as error:
+            logger.error(f"Écriture de {self.path.name} impossible: {error}")
+
+    async def close(self) -> None:
+        """Annule l'écriture planifiée et écrit la sauvegarde immédiatement"""
+        if self.snapshot_task and not self.snapshot_task.done():
+            self.snapshot_task.cancel()
+            await asyncio.to_thread(self.write, dict(self.snapshot))
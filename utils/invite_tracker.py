@@ -0,0 +1,180 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import time
+
+import discord
+
+from logs.logger_config import setup_logger
+from utils.database import Database
+
+
+logger = setup_logger()
+
+
+DELETED_MEMORY = 30     # secondes pendant lesquelles une invite supprimée peut encore expliquer une arrivée
+
+
+
+@dataclass
+class TrackedInvite:
+    code: str
+    uses: int
+    inviter_id: int | None
+    inviter_name: str | None
+    max_uses: int = 0
+
+    @classmethod
+    def from_invite(cls, invite: discord.Invite) -> 'TrackedInvite':
+        inviter = invite.inviter
+        return cls(
+            invite.code,
+            invite.uses or 0,
+            inviter.id if inviter else None,
+            inviter.name if inviter else None,
+            invite.max_uses or 0,
+        )
+
+    def row(self) -> tuple:
+        return self.code, self.inviter_id, self.inviter_name, self.uses
+
+
+
+class InviteTracker:
+    """Garde en mémoire le nombre d'utilisations de chaque invite, par serveur
+
+    La photo {code: invite} est tenue à jour par on_invite_create / on_invite_delete.
+    À chaque arrivée, les invites du serveur sont comparées à la photo en une seule
+    passe ; l'invite dont le compteur a augmenté est celle utilisée. Les arrivées
+    d'un même serveur sont traitées une par une, et chacune ne consomme qu'une
+    utilisation : deux arrivées simultanées ne s'attribuent pas la même invite.
+    """
+    def __init__(self, database: Database) -> None:
+        self.database = database
+        self.snapshots: dict[int, dict[str, TrackedInvite]] = {}
+        self.recently_deleted: dict[int, deque[tuple[float, TrackedInvite]]] = {}
+        self.locks: dict[int, asyncio.Lock] = {}
+
+
+    def lock(self, guild: discord.Guild) -> asyncio.Lock:
+        return self.locks.setdefault(guild.id, asyncio.Lock())
+
+    async def load(self, guild: discord.Guild) -> None:
+        """Prend la photo des invites d'un serveur et l'enregistre en bdd
+
+        Args:
+            guild (discord.Guild): Serveur
+        """
+        async with self.lock(guild):
+            try:
+                invites = await guild.invites()
+            except discord.HTTPException as error:
+                logger.error(f"{guild.name}: invites inaccessibles ({error})")
+                return
+
+            self.snapshots[guild.id] = {invite.code: TrackedInvite.from_invite(invite) for invite in invites}
+            await self.save(guild, list(self.snapshots[guild.id].values()))
+
+    async def snapshot(self, guild: discord.Guild) -> dict[str, TrackedInvite]:
+        """Renvoie la photo du serveur, reconstruite depuis la bdd si elle n'a pas encore été prise"""
+        if (snapshot := self.snapshots.get(guild.id)) is None:
+            req = "SELECT code, uses, inviter_id, inviter_name FROM Invites"
+            async with self.database.read(guild) as connection:
+                rows = await connection.execute_fetchall(req)
+            snapshot = self.snapshots[guild.id] = {row[0]: TrackedInvite(*row) for row in rows}
+        return snapshot
+
+    def created(self, invite: discord.Invite) -> None:
+        """Ajoute une nouvelle invite à la photo
+
+        Args:
+            invite (discord.Invite): Invite créée
+        """
+        if (snapshot := self.snapshots.get(invite.guild.id)) is not None:
+            snapshot[invite.code] = TrackedInvite.from_invite(invite)
+
+    def deleted(self, invite: discord.Invite) -> None:
+        """Retire une invite de la photo, en la gardant un moment pour les
+        invites à usage limité supprimées par l'arrivée qu'elles expliquent
+
+        Args:
+            invite (discord.Invite): Invite supprimée
+        """
+        if (snapshot := self.snapshots.get(invite.guild.id)) is None:
+            return
+        if tracked := snapshot.pop(invite.code, None):
+            self.recently_deleted.setdefault(invite.guild.id, deque(maxlen=20)).append((time.monotonic(), tracked))
+
+    async def member_join(self, guild: discord.Guild) -> TrackedInvite | None:
+        """Trouve l'invite utilisée par un nouveau membre et met à jour la photo
+
+        Args:
+            guild (discord.Guild): Serveur rejoint
+
+        Returns:
+            TrackedInvite | None: Invite utilisée, None si elle n'a pas pu être déterminée
+        """
+        async with self.lock(guild):
+            previous = await self.snapshot(guild)
+            try:
+                invites = await guild.invites()
+            except discord.HTTPException as error:
+                # L'arrivée est enregistrée sans inviteur, la photo reste la même
+                logger.error(f"{guild.name}: invites inaccessibles ({error})")
+                return None
+
+            current: dict[str, TrackedInvite] = {}
+            changed: list[TrackedInvite] = []
+            used = None
+            for invite in invites:
+                tracked = current[invite.code] = TrackedInvite.from_invite(invite)
+                old = previous.get(invite.code)
+                old_uses = old.uses if old else 0
+                if tracked.uses > old_uses:
+                    # Une seule utilisation est attribuée à ce membre : les autres
+                    # (arrivées simultanées) le seront aux arrivées suivantes
+                    tracked.uses = old_uses if used else old_uses + 1
+                    used = used or tracked
+                if old is None or old.uses != tracked.uses:
+                    changed.append(tracked)
+
+            if used is None:
+                used = self.used_deleted_invite(guild, previous, current)
+
+            self.snapshots[guild.id] = current
+            await self.save(guild, changed)
+            return used
+
+    def used_deleted_invite(self, guild: discord.Guild, previous: dict[str, TrackedInvite], current: dict[str, TrackedInvite]) -> TrackedInvite | None:
+        """Cherche une invite disparue depuis la dernière photo : une invite à
+        usage limité est supprimée par discord dès sa dernière utilisation
+        """
+        now = time.monotonic()
+        candidates = [invite for code, invite in previous.items() if code not in current]
+        candidates += [
+            invite for deleted_at, invite in self.recently_deleted.get(guild.id, ())
+            if now - deleted_at < DELETED_MEMORY
+        ]
+        for invite in candidates:
+            if invite.max_uses and invite.uses + 1 >= invite.max_uses:
+                invite.uses += 1
+                # Une invite supprimée n'explique qu'une seule arrivée
+                if deleted := self.recently_deleted.get(guild.id):
+                    self.recently_deleted[guild.id] = deque((entry for entry in deleted if entry[1] is not invite), maxlen=deleted.maxlen)
+                return invite
+        return None
+
+    async def save(self, guild: discord.Guild, invites: list[TrackedInvite]) -> None:
+        """Enregistre les invites modifiées en une seule transaction
+
+        Args:
+            guild (discord.Guild): Serveur
+            invites (list[TrackedInvite]): Invites à enregistrer
+        """
+        if not invites:
+            return
+
+        req = ("INSERT INTO Invites (code, inviter_id, inviter_name, uses) VALUES (?,?,?,?) "
+               "ON CONFLICT(code) DO UPDATE SET uses=excluded.uses, inviter_name=excluded.inviter_name")
+        async with self.database.write(guild) as connection:
+            await connection.executemany(req, [invite.row() for invite in invites])
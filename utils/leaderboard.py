@@ -0,0 +1,178 @@
+import asyncio
+from bisect import bisect_left
+import heapq
+import time
+
+from utils.database import Database
+from utils.ranking import RankEngine
+
+
+PER_PAGE = 5
+PAGE_TTL = 30       # secondes
+
+
+
+class Leaderboard:
+    """Pages du classement d'une table (Rank ou Vocal), pour tous les serveurs
+
+    - Les scores sont gardés triés en mémoire : le nombre de membres et la
+      position d'un membre sont obtenus sans requête, par recherche dichotomique.
+      Les scores modifiés sont notés et fusionnés dans la liste triée en un seul
+      passage, à la prochaine lecture du classement (ranked).
+    - Chaque page est lue par keyset sur (score, id) : la liste triée donne la
+      dernière ligne de la page précédente, quelle que soit la page demandée
+      (suivante, précédente, saut direct), et l'index (score DESC, id) sert la
+      requête sans OFFSET.
+    - Les pages lues sont gardées PAGE_TTL secondes, et oubliées dès qu'un score
+      est écrit en bdd (invalidate).
+    """
+    def __init__(self, database: Database, engine: RankEngine, per_page: int=PER_PAGE, ttl: float=PAGE_TTL) -> None:
+        """
+        Args:
+            database (Database): Bases de données des serveurs
+            engine (RankEngine): Table et colonne du score
+            per_page (int, optional): Profils par page
+            ttl (float, optional): Durée de vie d'une page en cache
+        """
+        self.database = database
+        self.engine = engine
+        self.per_page = per_page
+        self.ttl = ttl
+        # serveur -> page -> (date d'expiration, lignes)
+        self.pages: dict[int, dict[int, tuple[float, list[tuple]]]] = {}
+        # serveur -> [(-score, id)] trié, et id -> score
+        self.sorted_scores: dict[int, list[tuple[float, int]]] = {}
+        self.scores: dict[int, dict[int, float]] = {}
+        # serveur -> id -> score à la dernière fusion (None : absent de la liste triée)
+        self.dirty: dict[int, dict[int, float | None]] = {}
+        self.locks: dict[int, asyncio.Lock] = {}
+
+
+    async def load(self, guild_id: int) -> None:
+        """Charge les scores triés d'un serveur, une seule fois"""
+        if guild_id in self.scores:
+            return
+
+        async with self.locks.setdefault(guild_id, asyncio.Lock()):
+            if guild_id in self.scores:
+                return
+            req = f"SELECT id, {self.engine.score} FROM {self.engine.table}"
+            async with self.database.read(guild_id) as connection:
+                rows = await connection.execute_fetchall(req)
+            self.scores[guild_id] = {member_id: score or 0 for member_id, score in rows}
+            self.sorted_scores[guild_id] = sorted((-(score or 0), member_id) for member_id, score in rows)
+
+    def update(self, guild_id: int, member_id: int, score: float) -> None:
+        """Met à jour le score d'un membre dans le classement en mémoire
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+            score (float): Nouveau score
+        """
+        if (scores := self.scores.get(guild_id)) is None:
+            # Pas encore chargé : sera lu depuis la bdd au premier affichage
+            return
+
+        if (old := scores.get(member_id)) == score:
+            return
+        self.dirty.setdefault(guild_id, {}).setdefault(member_id, old)
+        scores[member_id] = score
+
+    def ranked(self, guild_id: int) -> list[tuple[float, int]]:
+        """Renvoie les (-score, id) triés d'un serveur chargé, après fusion des scores modifiés"""
+        sorted_scores = self.sorted_scores[guild_id]
+        if dirty := self.dirty.pop(guild_id, None):
+            scores = self.scores[guild_id]
+            stale = {(-old, member_id) for member_id, old in dirty.items() if old is not None}
+            kept = [entry for entry in sorted_scores if entry not in stale]
+            changed = sorted((-scores[member_id], member_id) for member_id in dirty)
+            sorted_scores = self.sorted_scores[guild_id] = list(heapq.merge(kept, changed))
+        return sorted_scores
+
+    def record(self, guild_id: int, member_id: int, score: float) -> None:
+        """Score écrit en bdd : met à jour le classement en mémoire et oublie les pages du serveur
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+            score (float): Nouveau score
+        """
+        self.update(guild_id, member_id, score)
+        self.invalidate(guild_id)
+
+    def invalidate(self, guild_id: int | None=None) -> None:
+        """Oublie les pages en cache d'un serveur (ou de tous) après une écriture des scores
+
+        Args:
+            guild_id (int | None, optional): Id du serveur. Defaults to tous.
+        """
+        if guild_id is None:
+            self.pages.clear()
+        else:
+            self.pages.pop(guild_id, None)
+
+    async def count(self, guild_id: int) -> int:
+        """Renvoie le nombre de membres classés"""
+        await self.load(guild_id)
+        return len(self.scores[guild_id])
+
+    async def pages_count(self, guild_id: int) -> int:
+        """Renvoie le nombre de page totale du classement, au moins 1"""
+        return max(-(-await self.count(guild_id) // self.per_page), 1)
+
+    async def position(self, guild_id: int, member_id: int) -> int | None:
+        """Renvoie la position du membre dans le classement (1 = premier)
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+
+        Returns:
+            int | None: Position, None si le membre n'est pas classé
+        """
+        await self.load(guild_id)
+        if (score := self.scores[guild_id].get(member_id)) is None:
+            return None
+        return bisect_left(self.ranked(guild_id), (-score, member_id)) + 1
+
+    async def page_of(self, guild_id: int, member_id: int) -> int | None:
+        """Renvoie la page où se trouve le membre"""
+        if (position := await self.position(guild_id, member_id)) is None:
+            return None
+        return (position - 1) // self.per_page + 1
+
+    async def page(self, guild_id: int, page: int) -> list[tuple]:
+        """Renvoie les lignes d'une page du classement, rang calculé
+
+        Args:
+            guild_id (int): Id du serveur
+            page (int): Numéro de la page, à partir de 1
+
+        Returns:
+            list[tuple]: Lignes de la table dans l'ordre de RankEngine.columns
+        """
+        now = time.monotonic()
+        pages = self.pages.setdefault(guild_id, {})
+        if (cached := pages.get(page)) and cached[0] > now:
+            return cached[1]
+
+        await self.load(guild_id)
+        ranked = self.ranked(guild_id)
+        score = self.engine.score
+        order = f"{score} DESC, id"
+        start = min((page - 1) * self.per_page, len(ranked))
+        if start:
+            # Keyset : la page commence juste après la dernière ligne de la précédente
+            last_score, last_id = ranked[start - 1]
+            req = self.engine.select(where=f"{score} < ? OR ({score} = ? AND id > ?)", order=order, limit="?")
+            params = (-last_score, -last_score, last_id, self.per_page)
+        else:
+            req = self.engine.select(order=order, limit="?")
+            params = (self.per_page,)
+
+        async with self.database.read(guild_id) as connection:
+            rows = await connection.execute_fetchall(req, params)
+
+        pages[page] = now + self.ttl, rows
+        return rows
@@ -0,0 +1,120 @@
+import math
+
+import numpy as np
+
+
+# Coût du niveau i : 5*i² + 50*i + 100
+# Somme des coûts des niveaux 0 à n-1 : (10n³ + 135n² + 455n) / 6
+#
+# Le passage au niveau n (n >= 1) se fait depuis le niveau n-1 quand
+# xp - xp_for_level(n-1) >= xp_needed(n-1), soit xp >= xp_for_level(n) + 10n + 45.
+# En multipliant par 6 : 10n³ + 135n² + 515n + 270 <= 6*xp
+
+
+
+def level_cost(lvl: int) -> int:
+    """Renvoie le coût en xp du niveau donné dans la somme cumulée
+
+    Args:
+        lvl (int): Niveau
+
+    Returns:
+        int: 5*lvl² + 50*lvl + 100
+    """
+    return 5 * (lvl ** 2) + (50 * lvl) + 100
+
+def xp_for_level(lvl: int) -> int:
+    """Calcule l'xp totale cumulée des niveaux inférieurs à lvl (forme close)
+
+    Args:
+        lvl (int): Niveau souhaité
+
+    Returns:
+        int: Xp totale, soit la somme des coûts des niveaux 0 à lvl-1
+    """
+    return (10 * lvl**3 + 135 * lvl**2 + 455 * lvl) // 6
+
+def xp_needed(lvl: int) -> int:
+    """Renvoie l'xp à gagner depuis le niveau lvl pour passer au suivant
+
+    Args:
+        lvl (int): Niveau actuel
+
+    Returns:
+        int: Xp nécessaire pour le prochain niveau
+    """
+    return level_cost(lvl + 1)
+
+def level_threshold(lvl: int) -> int:
+    """Renvoie l'xp totale à partir de laquelle on atteint le niveau lvl
+
+    Args:
+        lvl (int): Niveau
+
+    Returns:
+        int: Xp totale requise
+    """
+    if lvl <= 0:
+        return 0
+    return xp_for_level(lvl) + 10 * lvl + 45
+
+def _real_root(xp: float | np.ndarray) -> float | np.ndarray:
+    """Racine réelle de 10n³ + 135n² + 515n + 270 - 6*xp (méthode de Cardan).
+    Pour xp >= 0 le discriminant est positif, il n'y a qu'une racine réelle.
+    """
+    lib = np if isinstance(xp, np.ndarray) else math
+    # n = t - 4.5 donne t³ + p*t + q = 0
+    p = -9.25
+    q = -22.5 - 0.6 * xp
+    delta = (q / 2)**2 + (p / 3)**3
+    root = lib.sqrt(delta)
+    cbrt = np.cbrt if lib is np else lambda x: math.copysign(abs(x) ** (1/3), x)
+    return cbrt(-q / 2 + root) + cbrt(-q / 2 - root) - 4.5
+
+def level_from_xp(xp: float) -> int:
+    """Calcule le niveau atteint avec une xp totale donnée, en O(1)
+
+    Args:
+        xp (float): Xp totale
+
+    Returns:
+        int: Niveau correspondant
+    """
+    if xp < level_threshold(1):
+        return 0
+
+    lvl = max(int(_real_root(float(xp))), 0)
+    # Corrige les erreurs d'arrondi flottant
+    while level_threshold(lvl + 1) <= xp:
+        lvl += 1
+    while lvl > 0 and level_threshold(lvl) > xp:
+        lvl -= 1
+    return lvl
+
+def thresholds(lvl: np.ndarray) -> np.ndarray:
+    """Version vectorisée de level_threshold
+
+    Args:
+        lvl (np.ndarray): Niveaux
+
+    Returns:
+        np.ndarray: Xp totale requise pour chaque niveau
+    """
+    lvl = lvl.astype(np.int64)
+    return np.where(lvl <= 0, 0, (10 * lvl**3 + 135 * lvl**2 + 455 * lvl) // 6 + 10 * lvl + 45)
+
+def levels_from_xp(xp: np.ndarray) -> np.ndarray:
+    """Version vectorisée de level_from_xp pour convertir une colonne entière
+
+    Args:
+        xp (np.ndarray): Xp totales
+
+    Returns:
+        np.ndarray: Niveaux correspondants
+    """
+    xp = np.nan_to_num(np.asarray(xp, dtype=np.float64))
+    lvl = np.floor(_real_root(np.maximum(xp, 0))).astype(np.int64)
+    lvl = np.maximum(lvl, 0)
+    lvl = np.where(thresholds(lvl + 1) <= xp, lvl + 1, lvl)
+    lvl = np.where((lvl > 0) & (thresholds(lvl) > xp), lvl - 1, lvl)
+    return lvl
@@ -0,0 +1,114 @@
+import time
+
+import discord
+
+from logs.logger_config import setup_logger
+from utils.database import Database
+
+
+logger = setup_logger()
+
+
+RESOLVE_TTL = 600       # secondes pendant lesquelles un membre récupéré par l'API est gardé
+QUERY_LIMIT = 100       # ids maximum par appel à query_members
+
+
+
+class MemberResolver:
+    """Retrouve les membres d'une liste d'ids, en une seule fois
+
+    Le cache des membres du serveur est consulté en premier. Les ids absents
+    sont demandés à discord par paquets de QUERY_LIMIT avec query_members, et
+    le résultat (y compris « membre introuvable ») est gardé RESOLVE_TTL secondes.
+    """
+    def __init__(self, database: Database, ttl: float=RESOLVE_TTL) -> None:
+        """
+        Args:
+            database (Database): Bases de données des serveurs, pour remettre à jour les noms
+            ttl (float, optional): Durée de vie d'un membre récupéré par l'API
+        """
+        self.database = database
+        self.ttl = ttl
+        # (serveur, membre) -> (date d'expiration, membre ou None s'il a quitté le serveur)
+        self.cache: dict[tuple[int, int], tuple[float, discord.Member | None]] = {}
+        self.queries = 0
+        self.next_prune = 0.0
+
+
+    async def resolve(self, guild: discord.Guild, ids: list[int]) -> dict[int, discord.Member | None]:
+        """Renvoie les membres correspondant aux ids
+
+        Args:
+            guild (discord.Guild): Serveur
+            ids (list[int]): Ids des membres
+
+        Returns:
+            dict[int, discord.Member | None]: Membre par id, None s'il est introuvable
+        """
+        now = time.monotonic()
+        resolved: dict[int, discord.Member | None] = {}
+        misses = []
+        for member_id in ids:
+            if member := guild.get_member(member_id):
+                resolved[member_id] = member
+            elif (cached := self.cache.get((guild.id, member_id))) and cached[0] > now:
+                resolved[member_id] = cached[1]
+            else:
+                misses.append(member_id)
+
+        for start in range(0, len(misses), QUERY_LIMIT):
+            chunk = misses[start:start + QUERY_LIMIT]
+            try:
+                self.queries += 1
+                members = await guild.query_members(user_ids=chunk, limit=QUERY_LIMIT, cache=False)
+            except (discord.HTTPException, discord.ClientException, TimeoutError) as error:
+                logger.error(f"{guild.name}: query_members impossible ({error.__class__.__name__} {error})")
+                members = []
+
+            found = {member.id: member for member in members}
+            for member_id in chunk:
+                member = resolved[member_id] = found.get(member_id)
+                self.cache[guild.id, member_id] = now + self.ttl, member
+
+        self.prune(now)
+        return resolved
+
+    async def names(self, guild: discord.Guild, stored: dict[int, str], table: str | None=None) -> dict[int, str]:
+        """Renvoie le nom à afficher de chaque membre, et remet à jour les noms enregistrés
+
+        Args:
+            guild (discord.Guild): Serveur
+            stored (dict[int, str]): Nom enregistré en bdd par id
+            table (str | None, optional): Table dont la colonne 'name' est à remettre à jour
+
+        Returns:
+            dict[int, str]: Nom à afficher par id
+        """
+        members = await self.resolve(guild, list(stored))
+
+        display_names = {}
+        stale = []
+        for member_id, member in members.items():
+            if member is None:
+                display_names[member_id] = stored[member_id] or str(member_id)
+                continue
+            display_names[member_id] = member.display_name
+            if table and member.name != stored[member_id]:
+                stale.append((member.name, member_id))
+
+        if stale:
+            try:
+                async with self.database.write(guild) as connection:
+                    await connection.executemany(f"UPDATE {table} SET name=? WHERE id==?", stale)
+            except Exception as error:
+                logger.error(f"{guild.name}: mise à jour des noms de {table} impossible ({error})")
+
+        return display_names
+
+    def prune(self, now: float) -> None:
+        """Oublie les membres expirés, au plus une fois par ttl"""
+        if now < self.next_prune:
+            return
+        self.next_prune = now + self.ttl
+        for key in [key for key, (expires, _) in self.cache.items() if expires <= now]:
+            del self.cache[key]
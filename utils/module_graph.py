@@ -0,0 +1,143 @@
+import ast
+from pathlib import Path
+import sys
+
+
+PACKAGES = ('plugins', 'utils')     # seuls les modules du projet font partie du graphe
+ENTRY_POINT = 'bot'                 # module qui crée les services partagés du bot
+
+
+
+class ModuleGraph:
+    """Graphe des imports entre les modules du projet
+
+    Les imports de chaque fichier sont lus avec ast (sans l'exécuter) et gardés
+    tant que le fichier n'est pas modifié. Permet de savoir quelles extensions
+    dépendent, directement ou non, d'un fichier modifié.
+
+    Les modules importés par le point d'entrée (utils.database, utils.render...)
+    ont des instances partagées créées au démarrage : les réimporter mélangerait
+    anciennes et nouvelles classes, ils ne sont pris en compte qu'au redémarrage.
+    """
+    def __init__(self, root: Path, packages: tuple[str, ...]=PACKAGES, entry_point: str=ENTRY_POINT) -> None:
+        """
+        Args:
+            root (Path): Racine du projet
+            packages (tuple[str, ...], optional): Paquets du projet suivis
+            entry_point (str, optional): Module du point d'entrée, à la racine
+        """
+        self.root = root
+        self.packages = packages
+        self.entry_point = entry_point
+        # module -> (date de modification, modules importés)
+        self.imports_cache: dict[str, tuple[float, set[str]]] = {}
+
+
+    def module_name(self, path: Path) -> str | None:
+        """Renvoie le nom du module d'un fichier .py du projet, ex: 'utils.database'"""
+        try:
+            parts = path.with_suffix('').relative_to(self.root).parts
+        except ValueError:
+            return None
+        if path.suffix != '.py' or not parts or parts[0] not in self.packages:
+            return None
+        if parts[-1] == '__init__':
+            parts = parts[:-1]
+        return '.'.join(parts)
+
+    def path(self, module: str) -> Path | None:
+        """Renvoie le fichier d'un module du projet, None s'il n'existe pas"""
+        base = self.root.joinpath(*module.split('.'))
+        for path in (base.with_suffix('.py'), base / '__init__.py'):
+            if path.is_file():
+                return path
+        return None
+
+    def imports(self, module: str) -> set[str]:
+        """Renvoie les modules du projet importés par un module
+
+        Args:
+            module (str): Nom du module
+
+        Returns:
+            set[str]: Modules importés, limités au projet
+        """
+        if (path := self.path(module)) is None:
+            return set()
+
+        mtime = path.stat().st_mtime
+        if (cached := self.imports_cache.get(module)) and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            tree = ast.parse(path.read_bytes(), filename=str(path))
+        except SyntaxError:
+            # Le rechargement de l'extension remontera l'erreur
+            tree = ast.Module(body=[], type_ignores=[])
+
+        package = module if path.name == '__init__.py' else module.rpartition('.')[0]
+        found = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                found.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                base = node.module or ''
+                if node.level:
+                    parent = package.split('.')[:len(package.split('.')) - node.level + 1]
+                    base = '.'.join(filter(None, [*parent, base]))
+                found.add(base)
+                # from utils import charts : charts peut être un module
+                found.update(f"{base}.{alias.name}" for alias in node.names)
+
+        modules = {name for name in found if name.split('.')[0] in self.packages and self.path(name)}
+        self.imports_cache[module] = mtime, modules
+        return modules
+
+    def dependencies(self, module: str) -> set[str]:
+        """Renvoie le module et tous les modules du projet dont il dépend, directement ou non"""
+        seen = {module}
+        stack = [module]
+        while stack:
+            for imported in self.imports(stack.pop()):
+                if imported not in seen:
+                    seen.add(imported)
+                    stack.append(imported)
+        return seen
+
+    def core(self) -> set[str]:
+        """Renvoie les modules du projet chargés par le point d'entrée"""
+        return self.dependencies(self.entry_point) - {self.entry_point}
+
+    def affected(self, changed: set[Path], extensions: list[str]) -> tuple[set[str], set[str], set[str]]:
+        """Renvoie les extensions à recharger après la modification de fichiers
+
+        Args:
+            changed (set[Path]): Fichiers modifiés
+            extensions (list[str]): Extensions chargées
+
+        Returns:
+            tuple[set[str], set[str], set[str]]: Extensions qui dépendent d'un fichier
+            modifié, modules à réimporter (modifiés ou qui en dépendent, hors extensions),
+            et modules modifiés du point d'entrée (ignorés jusqu'au redémarrage)
+        """
+        modules = {module for path in changed if (module := self.module_name(path))}
+        if not modules:
+            return set(), set(), set()
+
+        core = self.core()
+        changed_core = modules & core
+        modules -= changed_core
+        affected = {extension for extension in extensions if self.dependencies(extension) & modules}
+        # Un module qui importe un module modifié garde l'ancienne version tant qu'il est en cache
+        loaded = {
+            module for module in sys.modules
+            if module.split('.')[0] in self.packages and module not in core
+        }
+        stale = modules | {module for module in loaded if self.dependencies(module) & modules}
+        return affected, stale - set(extensions), changed_core
+
+    @staticmethod
+    def forget(modules: set[str]) -> None:
+        """Retire des modules de sys.modules : ils seront réexécutés au prochain import"""
+        for module in modules:
+            sys.modules.pop(module, None)
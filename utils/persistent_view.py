@@ -0,0 +1,51 @@
+import discord
+
+
+class PersistentView(discord.ui.View):
+    """Vue persistante : pas de timeout, custom_id fixes et aucun état propre
+
+    Une seule instance de chaque vue est enregistrée par le bot (bot.add_view)
+    et répond aux boutons de tous les messages, y compris ceux envoyés avant un
+    redémarrage ou un rechargement de l'extension. L'état (page, membre visé...)
+    est relu dans le message cliqué à chaque interaction.
+    """
+    def __init__(self) -> None:
+        super().__init__(timeout=None)
+
+
+    @classmethod
+    def components(cls, disabled: bool=False) -> 'PersistentView':
+        """Renvoie une copie arrêtée de la vue, pour envoyer ses boutons sans
+        enregistrer un objet par message : les clics sont reçus par l'instance
+        enregistrée, grâce aux custom_id
+
+        Args:
+            disabled (bool, optional): Désactive tous les boutons. Defaults to False.
+
+        Returns:
+            PersistentView: Vue à passer à send ou edit
+        """
+        view = cls()
+        for child in view.children:
+            if isinstance(child, discord.ui.Button):
+                child.disabled = disabled
+        view.stop()
+        return view
+
+
+
+def footer_page(message: discord.Message) -> tuple[int, int]:
+    """Renvoie la page affichée par un message de classement, lue dans le pied
+    de son embed ("page/total")
+
+    Args:
+        message (discord.Message): Message du classement
+
+    Returns:
+        tuple[int, int]: Page actuelle et nombre de pages, (1, 1) si illisible
+    """
+    try:
+        page, total_page = message.embeds[0].footer.text.split('/')
+        return max(int(page), 1), max(int(total_page), 1)
+    except (IndexError, AttributeError, ValueError):
+        return 1, 1
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from typing import Any
+
+
+
+class ProfileCache:
+    """Cache LRU des profils, un par serveur, rempli au fil des lectures
+
+    Les profils sont des objets mutables partagés avec les cogs : une
+    modification du profil en cache est visible par tout le monde, l'écriture
+    en bdd reste à la charge du cog.
+    """
+    def __init__(self, max_size: int=2000) -> None:
+        """
+        Args:
+            max_size (int, optional): Nombre maximal de profils gardés par serveur
+        """
+        self.max_size = max_size
+        self.guilds: dict[int, OrderedDict[int, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self) -> int:
+        return sum(len(profiles) for profiles in self.guilds.values())
+
+    def get(self, guild_id: int, member_id: int) -> Any | None:
+        """Renvoie le profil en cache et le marque comme récemment utilisé
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+
+        Returns:
+            Any | None: Profil ou None si absent du cache
+        """
+        profiles = self.guilds.get(guild_id)
+        if profiles is None or member_id not in profiles:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        profiles.move_to_end(member_id)
+        return profiles[member_id]
+
+    def put(self, guild_id: int, member_id: int, profile: Any) -> None:
+        """Ajoute ou remplace un profil, en évinçant le moins récemment utilisé si besoin
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+            profile (Any): Profil à garder en cache
+        """
+        profiles = self.guilds.setdefault(guild_id, OrderedDict())
+        profiles[member_id] = profile
+        profiles.move_to_end(member_id)
+        if len(profiles) > self.max_size:
+            profiles.popitem(last=False)
+
+    def discard(self, guild_id: int, member_id: int) -> None:
+        """Retire un profil du cache
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+        """
+        if profiles := self.guilds.get(guild_id):
+            profiles.pop(member_id, None)
+
+    def clear(self, guild_id: int | None=None) -> None:
+        """Vide le cache d'un serveur ou de tous les serveurs
+
+        Args:
+            guild_id (int | None, optional): Id du serveur. Defaults to tous.
+        """
+        if guild_id is None:
+            self.guilds.clear()
+        else:
+            self.guilds.pop(guild_id, None)
+
+    def stats(self) -> dict[str, int | float]:
+        """Renvoie les compteurs du cache
+
+        Returns:
+            dict[str, int | float]: Taille, hits, misses et taux de hit
+        """
+        total = self.hits + self.misses
+        return {
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
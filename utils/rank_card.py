@@ -0,0 +1,192 @@
+from collections import OrderedDict
+from io import BytesIO
+import time
+
+import discord
+from PIL import Image, ImageDraw
+
+
+WIDTH = 295
+HEIGHT = 20
+BACKGROUND = (255, 255, 255)
+CACHE_SIZE = 512
+
+
+
+def color_hexa_to_rgb(couleur: int) -> tuple[int, int, int]:
+    """Transforme une couleur hexadécimal coder sur 3 octets
+    en tuple de int rgb correspondant à un octet chacun
+
+    Args:
+        couleur (int): Couleurs hexa (ex: 0xFF001E)
+
+    Returns:
+        tuple[int, int, int]: Couleurs en int (ex: (255 , 0 , 30))
+    """
+    return couleur >> 16 & 0xFF, couleur >> 8 & 0xFF, couleur & 0xFF
+
+def progress_width(progress: float, width: int=WIDTH) -> int:
+    """Renvoie la largeur en pixels de la partie remplie de la barre
+
+    Args:
+        progress (float): Avancement entre 0 et 1
+        width (int, optional): Largeur totale de la barre
+
+    Returns:
+        int: Largeur remplie, entre 0 et width
+    """
+    return min(max(int(width * progress), 0), width)
+
+def render_progress_bar(filled: int, color: tuple[int, int, int], width: int=WIDTH, height: int=HEIGHT) -> bytes:
+    """Dessine la barre de progression en mode palette et l'encode en PNG.
+    L'image n'a que deux couleurs : un indice par pixel au lieu de trois octets RGB.
+
+    Args:
+        filled (int): Largeur remplie en pixels
+        color (tuple[int, int, int]): Couleur de la partie remplie
+        width (int, optional): Largeur de la barre
+        height (int, optional): Hauteur de la barre
+
+    Returns:
+        bytes: Image PNG
+    """
+    image = Image.new('P', (width, height), 0)
+    image.putpalette((*BACKGROUND, *color))
+    # Même rendu que rounded_rectangle([0, 0, filled, height]) : bornes incluses
+    image.paste(1, (0, 0, min(filled + 1, width), height))
+
+    image_byte = BytesIO()
+    image.save(image_byte, format='PNG', compress_level=1)
+    return image_byte.getvalue()
+
+def render_progress_bar_rgb(filled: int, color: tuple[int, int, int], width: int=WIDTH, height: int=HEIGHT) -> bytes:
+    """Ancien rendu RGB, gardé comme référence pour le benchmark"""
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rounded_rectangle([0, 0, width, height], fill='white', radius=0)
+    draw.rounded_rectangle([0, 0, filled, height], fill=color, radius=0)
+
+    image_byte = BytesIO()
+    image.save(image_byte, format='PNG')
+    return image_byte.getvalue()
+
+
+
+class ProgressBarCache:
+    """Cache LRU des barres de progression déjà encodées en PNG
+
+    Seules WIDTH + 1 largeurs sont possibles : la clé est (largeur arrondie au
+    bucket, couleur), la valeur les octets PNG prêts à être envoyés.
+    """
+    def __init__(self, max_size: int=CACHE_SIZE, bucket: int=1) -> None:
+        """
+        Args:
+            max_size (int, optional): Nombre maximal d'images gardées
+            bucket (int, optional): Pas d'arrondi de la largeur en pixels
+        """
+        self.max_size = max_size
+        self.bucket = bucket
+        self.images: OrderedDict[tuple[int, tuple[int, int, int]], bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+    def key(self, progress: float, color: int | tuple[int, int, int]) -> tuple[int, tuple[int, int, int]]:
+        """Renvoie la clé du cache : (largeur arrondie au bucket, couleur rgb)
+
+        Args:
+            progress (float): Avancement entre 0 et 1
+            color (int | tuple[int, int, int]): Couleur hexa ou rgb
+
+        Returns:
+            tuple[int, tuple[int, int, int]]: Clé de l'image
+        """
+        if isinstance(color, int):
+            color = color_hexa_to_rgb(color)
+        return progress_width(progress) // self.bucket * self.bucket, tuple(color)
+
+    def cached(self, key: tuple[int, tuple[int, int, int]]) -> bytes | None:
+        """Renvoie l'image en cache et la marque comme récemment utilisée"""
+        if (image := self.images.get(key)) is not None:
+            self.hits += 1
+            self.images.move_to_end(key)
+            return image
+
+        self.misses += 1
+        return None
+
+    def store(self, key: tuple[int, tuple[int, int, int]], image: bytes) -> None:
+        """Ajoute une image rendue, en évinçant la moins récemment utilisée si besoin"""
+        self.images[key] = image
+        self.images.move_to_end(key)
+        if len(self.images) > self.max_size:
+            self.images.popitem(last=False)
+
+    def get(self, progress: float, color: int | tuple[int, int, int]) -> bytes:
+        """Renvoie la barre de progression en PNG, rendue seulement si absente du cache
+
+        Args:
+            progress (float): Avancement entre 0 et 1
+            color (int | tuple[int, int, int]): Couleur hexa ou rgb
+
+        Returns:
+            bytes: Image PNG
+        """
+        key = self.key(progress, color)
+        if (image := self.cached(key)) is None:
+            image = render_progress_bar(*key)
+            self.store(key, image)
+        return image
+
+    def file(self, progress: float, color: int | tuple[int, int, int], name: str="progress_bar") -> discord.File:
+        """Renvoie la barre de progression au format discord.File
+
+        Args:
+            progress (float): Avancement entre 0 et 1
+            color (int | tuple[int, int, int]): Couleur hexa ou rgb
+            name (str, optional): Nom du fichier sans extension
+
+        Returns:
+            discord.File: Image envoyable sur discord
+        """
+        return discord.File(BytesIO(self.get(progress, color)), filename=f'{name}.png')
+
+    def stats(self) -> dict[str, int | float]:
+        total = self.hits + self.misses
+        return {
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+
+progress_bars = ProgressBarCache()
+
+
+
+if __name__ == '__main__':
+    # python -m utils.rank_card : temps moyen par appel avant / après
+    from numpy import random as rd
+
+    CALLS = 2000
+    colors = [color_hexa_to_rgb(int(c)) for c in rd.randint(0, 0xFFFFFF, 16)]
+    samples = [(rd.random(), colors[rd.randint(len(colors))]) for _ in range(CALLS)]
+
+    def bench(name: str, render) -> None:
+        start = time.perf_counter()
+        for progress, color in samples:
+            render(progress, color)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<20} {elapsed / CALLS * 1e6:8.1f} µs/appel")
+
+    bench("RGB (avant)", lambda p, c: render_progress_bar_rgb(progress_width(p), c))
+    bench("Palette", lambda p, c: render_progress_bar(progress_width(p), c))
+    cache = ProgressBarCache(max_size=WIDTH * len(colors))
+    bench("Palette + cache", cache.get)
+    bench("Cache chaud", cache.get)
+    print(cache.stats())
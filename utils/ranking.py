@@ -0,0 +1,91 @@
+import aiosqlite
+
+
+
+class RankEngine:
+    """Calcule le rang des membres à la lecture à partir d'un index sur le score
+
+    Le rang est un DENSE_RANK() sur le score décroissant : 1 + le nombre de
+    scores distincts strictement supérieurs. Grâce à l'index sur la colonne du
+    score (créé par les migrations de utils/database.py), SQLite répond en
+    parcourant uniquement l'index, sans jamais réécrire la table à chaque message.
+    """
+    def __init__(self, table: str, score: str, columns: tuple[str, ...]) -> None:
+        """
+        Args:
+            table (str): Nom de la table (ex: 'Rank')
+            score (str): Colonne servant au classement (ex: 'xp')
+            columns (tuple[str, ...]): Colonnes de la table dans l'ordre du dataclass
+        """
+        self.table = table
+        self.score = score
+        self.columns = columns
+
+
+    def rank_expression(self) -> str:
+        """Renvoie la sous-requête SQL qui calcule le rang de la ligne courante
+
+        Returns:
+            str: Expression SQL du rang
+        """
+        return (f"(SELECT COUNT(DISTINCT r.{self.score}) FROM {self.table} r "
+                f"WHERE r.{self.score} > {self.table}.{self.score}) + 1")
+
+    def select(self, where: str="", order: str="", limit: str="") -> str:
+        """Construit un SELECT qui renvoie les colonnes de la table avec le rang calculé
+        à la place de la colonne 'rang'
+
+        Args:
+            where (str, optional): Clause WHERE sans le mot clé
+            order (str, optional): Clause ORDER BY sans le mot clé
+            limit (str, optional): Clause LIMIT sans le mot clé
+
+        Returns:
+            str: Requête SQL
+        """
+        columns = ", ".join(
+            self.rank_expression() if column == 'rang' else column
+            for column in self.columns
+        )
+        req = f"SELECT {columns} FROM {self.table}"
+        if where:
+            req += f" WHERE {where}"
+        if order:
+            req += f" ORDER BY {order}"
+        if limit:
+            req += f" LIMIT {limit}"
+        return req
+
+    async def rank_of(self, connection: aiosqlite.Connection, score: float) -> int:
+        """Renvoie le rang correspondant à un score
+
+        Args:
+            connection (aiosqlite.Connection): Connexion à la base du serveur
+            score (float): Score du membre
+
+        Returns:
+            int: Rang dense du score
+        """
+        req = f"SELECT COUNT(DISTINCT {self.score}) FROM {self.table} WHERE {self.score} > ?"
+        res = await connection.execute_fetchall(req, (score,))
+        return res[0][0] + 1
+
+    async def materialize(self, connection: aiosqlite.Connection) -> None:
+        """Recopie le rang calculé dans la colonne 'rang' pour les lecteurs externes
+        (dashboard, export csv). Ce n'est jamais fait sur le chemin d'un message.
+
+        Args:
+            connection (aiosqlite.Connection): Connexion à la base du serveur
+        """
+        req = (f"UPDATE {self.table} SET rang=t2.rang FROM "
+               f"(SELECT id, DENSE_RANK() OVER (ORDER BY {self.score} DESC) AS rang FROM {self.table}) t2 "
+               f"WHERE t2.id = {self.table}.id")
+        await connection.execute(req)
+
+
+
+RANK_COLUMNS = ('id', 'name', 'msg', 'xp', 'lvl', 'rang', 'add_xp_counter', 'remove_xp_counter', 'added_xp', 'removed_xp')
+VOCAL_COLUMNS = ('id', 'name', 'time', 'afk', 'lvl', 'rang', 'add_xp_counter', 'remove_xp_counter', 'added_xp', 'removed_xp')
+
+rank_engine = RankEngine('Rank', 'xp', RANK_COLUMNS)
+vocal_engine = RankEngine('Vocal', 'time', VOCAL_COLUMNS)
@@ -0,0 +1,169 @@
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from io import BytesIO
+import multiprocessing
+import os
+import time
+from typing import Any, Callable
+
+import discord
+
+from logs.logger_config import setup_logger
+from utils.rank_card import ProgressBarCache, progress_bars, render_progress_bar
+from utils import welcome_card
+
+
+logger = setup_logger()
+
+
+LATENCY_SAMPLES = 256
+
+
+
+class Renderer:
+    """Exécute le travail PIL (composition et encodage PNG) hors de la boucle asyncio
+
+    Les rendus partent dans un pool de processus dimensionné sur le nombre de
+    CPU, ou dans un pool de threads si les processus ne sont pas disponibles.
+    Un sémaphore borne le nombre de rendus en cours : au-delà, les appelants
+    attendent leur tour au lieu d'empiler du travail dans l'executor.
+    Les barres de progression, rendues en une centaine de µs, passent par un
+    thread : l'aller-retour pickle vers un processus coûterait plus que le rendu.
+    """
+    def __init__(self, workers: int | None=None, max_pending: int | None=None, processes: bool=True) -> None:
+        """
+        Args:
+            workers (int | None, optional): Taille du pool. Defaults to le nombre de CPU.
+            max_pending (int | None, optional): Rendus en cours maximum. Defaults to 4 par worker.
+            processes (bool, optional): Utiliser un pool de processus plutôt que de threads
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 4 * self.workers
+        self.processes = processes
+        self.executor: Executor | None = None
+        self.semaphore = asyncio.Semaphore(self.max_pending)
+        self.progress_bars: ProgressBarCache = progress_bars
+        # Métriques
+        self.waiting = 0
+        self.running = 0
+        self.rendered = 0
+        self.failed = 0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+
+    def start_executor(self) -> Executor:
+        """Crée le pool au premier rendu, pas à l'import ni au démarrage du bot"""
+        if self.processes:
+            try:
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+                logger.info(f"Renderer: pool de {self.workers} processus")
+                return self.executor
+            except (OSError, NotImplementedError, ImportError) as error:
+                logger.error(f"Renderer: pool de processus indisponible ({error}), repli sur des threads")
+                self.processes = False
+
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='render')
+        logger.info(f"Renderer: pool de {self.workers} threads")
+        return self.executor
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """Exécute une fonction de rendu dans le pool
+
+        Args:
+            func (Callable): Fonction importable (envoyée aux processus par pickle)
+            *args (Any): Arguments de la fonction
+
+        Returns:
+            Any: Résultat de la fonction
+        """
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        start = time.perf_counter()
+        try:
+            executor = self.executor or self.start_executor()
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(executor, partial(func, *args))
+            except BrokenProcessPool:
+                logger.error("Renderer: pool de processus cassé, repli sur des threads")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.processes = False
+                executor = self.start_executor()
+                result = await loop.run_in_executor(executor, partial(func, *args))
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self.semaphore.release()
+
+        self.rendered += 1
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+    async def welcome_card(self, avatar: bytes, background: bytes | str, text: str, font_path: str) -> bytes:
+        """Génère l'image de bienvenue dans le pool, voir utils.welcome_card.welcome_card
+
+        Returns:
+            bytes: Image PNG
+        """
+        return await self.run(welcome_card.welcome_card, avatar, background, text, font_path)
+
+    async def progress_bar(self, progress: float, color: int | tuple[int, int, int]) -> bytes:
+        """Renvoie la barre de progression depuis le cache, rendue dans un thread si absente
+
+        Args:
+            progress (float): Avancement entre 0 et 1
+            color (int | tuple[int, int, int]): Couleur hexa ou rgb
+
+        Returns:
+            bytes: Image PNG
+        """
+        key = self.progress_bars.key(progress, color)
+        if (image := self.progress_bars.cached(key)) is None:
+            image = await asyncio.to_thread(render_progress_bar, *key)
+            self.progress_bars.store(key, image)
+        return image
+
+    def file(self, image: bytes, name: str) -> discord.File:
+        """Convertie une image PNG en fichier envoyable sur discord
+
+        Args:
+            image (bytes): Image PNG
+            name (str): Nom à donner à l'image, sans extension
+
+        Returns:
+            discord.File: Image au format discord.File
+        """
+        return discord.File(BytesIO(image), filename=f'{name}.png')
+
+    def stats(self) -> dict[str, int | float]:
+        """Renvoie les métriques du pool
+
+        Returns:
+            dict[str, int | float]: Profondeur de file, rendus en cours et latences en ms
+        """
+        latencies = sorted(self.latencies)
+        return {
+            'workers': self.workers,
+            'processes': self.processes,
+            'waiting': self.waiting,
+            'running': self.running,
+            'rendered': self.rendered,
+            'failed': self.failed,
+            'latency_avg_ms': 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            'latency_p95_ms': 1000 * latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+        }
+
+    def close(self) -> None:
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
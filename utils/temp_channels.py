@@ -0,0 +1,197 @@
+from collections import deque
+import time
+
+import discord
+
+from logs.logger_config import setup_logger
+from utils.cooldown import CooldownStore
+from utils.database import Database
+
+
+logger = setup_logger()
+
+
+POOL_SIZE = 2           # salons vides gardés cachés par serveur, prêts à être réutilisés
+CREATE_COOLDOWN = 30    # secondes entre deux salons obtenus par un même membre
+RENAME_LIMIT = 2        # renommages d'un salon autorisés par discord...
+RENAME_PERIOD = 600     # ...toutes les RENAME_PERIOD secondes
+
+
+
+class TempChannels:
+    """Salons vocaux temporaires des membres, enregistrés dans la table TempChannels
+
+    - Un salon qui se vide est caché et gardé dans une petite réserve (POOL_SIZE
+      par serveur) au lieu d'être supprimé : le prochain membre le récupère sans
+      appel à create_voice_channel. Il est renommé dans le même appel que ses
+      permissions, sauf s'il a épuisé ses renommages (RENAME_LIMIT par
+      RENAME_PERIOD) : un nouveau salon est alors créé.
+    - Un membre n'obtient pas plus d'un salon toutes les CREATE_COOLDOWN secondes,
+      un membre qui a déjà son salon y est renvoyé.
+    - Les salons étant enregistrés en bdd, ceux restés vides pendant un arrêt du
+      bot sont retrouvés et nettoyés au démarrage (reconcile).
+    """
+    def __init__(self, database: Database, pool_size: int=POOL_SIZE, cooldown: float=CREATE_COOLDOWN) -> None:
+        """
+        Args:
+            database (Database): Bases de données des serveurs
+            pool_size (int, optional): Salons vides gardés par serveur
+            cooldown (float, optional): Délai entre deux salons pour un membre
+        """
+        self.database = database
+        self.pool_size = pool_size
+        self.cooldowns = CooldownStore(cooldown)
+        # serveur -> salon -> propriétaire (None : salon vide dans la réserve)
+        self.channels: dict[int, dict[int, int | None]] = {}
+        # salon -> dates (monotonic) de ses derniers renommages
+        self.renames: dict[int, deque[float]] = {}
+        self.created = 0
+        self.reused = 0
+
+
+    async def load(self, guild: discord.Guild) -> dict[int, int | None]:
+        """Charge les salons enregistrés d'un serveur, une seule fois"""
+        if (channels := self.channels.get(guild.id)) is not None:
+            return channels
+
+        async with self.database.read(guild) as connection:
+            rows = await connection.execute_fetchall("SELECT channel_id, owner_id FROM TempChannels")
+        return self.channels.setdefault(guild.id, dict(rows))
+
+    def is_temp(self, channel: discord.abc.GuildChannel) -> bool:
+        return channel.id in self.channels.get(channel.guild.id, {})
+
+    def owned_by(self, guild: discord.Guild, member_id: int) -> discord.VoiceChannel | None:
+        for channel_id, owner_id in self.channels.get(guild.id, {}).items():
+            if owner_id == member_id and (channel := guild.get_channel(channel_id)):
+                return channel
+        return None
+
+    async def claim(self, member: discord.Member, category: discord.CategoryChannel | None,
+                    overwrites: dict | None=None) -> discord.VoiceChannel | None:
+        """Donne un salon vocal au membre : le sien s'il en a déjà un, sinon un salon
+        de la réserve, sinon un nouveau salon
+
+        Args:
+            member (discord.Member): Membre
+            category (discord.CategoryChannel | None): Catégorie des salons temporaires
+            overwrites (dict | None, optional): Permissions du salon
+
+        Returns:
+            discord.VoiceChannel | None: Salon où déplacer le membre, None s'il en demande trop souvent
+        """
+        guild = member.guild
+        channels = await self.load(guild)
+        if channel := self.owned_by(guild, member.id):
+            return channel
+
+        if not self.cooldowns.ready(guild.id, member.id):
+            return None
+        self.cooldowns.start(guild.id, member.id)
+
+        channel = None
+        for channel_id in [channel_id for channel_id, owner_id in channels.items() if owner_id is None]:
+            pooled = guild.get_channel(channel_id)
+            # Un salon disparu est oublié par reconcile
+            if pooled is not None and not pooled.members and self.can_rename(pooled, member.display_name):
+                channel = pooled
+                break
+
+        if channel is not None:
+            # Réservé avant le premier await : une autre arrivée ne peut plus le prendre
+            channels[channel.id] = member.id
+            if channel.name != member.display_name:
+                self.renames.setdefault(channel.id, deque(maxlen=RENAME_LIMIT)).append(time.monotonic())
+            try:
+                await channel.edit(name=member.display_name, overwrites=overwrites or {})
+            except BaseException:
+                channels[channel.id] = None
+                raise
+            self.reused += 1
+        else:
+            channel = await guild.create_voice_channel(member.display_name, category=category, overwrites=overwrites or {})
+            self.created += 1
+
+        channels[channel.id] = member.id
+        async with self.database.write(guild) as connection:
+            await connection.execute(
+                "INSERT OR REPLACE INTO TempChannels (channel_id, owner_id) VALUES (?,?)", (channel.id, member.id)
+            )
+        return channel
+
+    def can_rename(self, channel: discord.VoiceChannel, name: str) -> bool:
+        """Le salon peut prendre ce nom sans attendre le rate limit de discord"""
+        if channel.name == name:
+            return True
+        renames = self.renames.get(channel.id, ())
+        return len(renames) < RENAME_LIMIT or time.monotonic() - renames[0] >= RENAME_PERIOD
+
+    async def release(self, channel: discord.VoiceChannel) -> None:
+        """Salon temporaire devenu vide : caché dans la réserve si elle n'est pas pleine, supprimé sinon
+
+        Args:
+            channel (discord.VoiceChannel): Salon vide
+        """
+        guild = channel.guild
+        channels = await self.load(guild)
+        pooled = sum(owner_id is None for owner_id in channels.values())
+
+        if pooled < self.pool_size:
+            await channel.set_permissions(guild.default_role, view_channel=False, connect=False)
+            channels[channel.id] = None
+            req, params = "UPDATE TempChannels SET owner_id=NULL WHERE channel_id==?", (channel.id,)
+        else:
+            await channel.delete()
+            channels.pop(channel.id, None)
+            self.renames.pop(channel.id, None)
+            req, params = "DELETE FROM TempChannels WHERE channel_id==?", (channel.id,)
+
+        async with self.database.write(guild) as connection:
+            await connection.execute(req, params)
+
+    async def reconcile(self, guild: discord.Guild) -> int:
+        """Nettoie en un passage les salons enregistrés d'un serveur : oublie ceux qui
+        n'existent plus, remet en réserve ou supprime ceux qui sont vides
+
+        Args:
+            guild (discord.Guild): Serveur
+
+        Returns:
+            int: Nombre de salons supprimés
+        """
+        channels = await self.load(guild)
+        forgotten = []
+        released = []
+        for channel_id, owner_id in list(channels.items()):
+            channel = guild.get_channel(channel_id)
+            if channel is None:
+                forgotten.append((channel_id,))
+                channels.pop(channel_id)
+            elif owner_id is not None and not channel.members:
+                released.append(channel)
+
+        if forgotten:
+            async with self.database.write(guild) as connection:
+                await connection.executemany("DELETE FROM TempChannels WHERE channel_id==?", forgotten)
+
+        deleted = 0
+        for channel in released:
+            try:
+                await self.release(channel)
+            except discord.HTTPException as error:
+                logger.error(f"{guild.name}: nettoyage du salon {channel.name} impossible ({error})")
+                continue
+            deleted += channel.id not in channels
+
+        if forgotten or released:
+            logger.info(f"{guild.name}: {deleted} salons temporaires supprimés, {len(forgotten)} disparus oubliés")
+        return deleted
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'owned': sum(owner_id is not None for channels in self.channels.values() for owner_id in channels.values()),
+            'pooled': sum(owner_id is None for channels in self.channels.values() for owner_id in channels.values()),
+            'created': self.created,
+            'reused': self.reused,
+            'refused': self.cooldowns.suppressed,
+        }
@@ -0,0 +1,193 @@
+import asyncio
+from dataclasses import dataclass
+from enum import Flag, auto
+import time
+from typing import Awaitable, Callable
+
+import discord
+
+from logs.logger_config import setup_logger
+
+
+logger = setup_logger()
+
+
+
+class VoiceEventType(Flag):
+    """Type d'une transition vocale, un même event peut en cumuler plusieurs (ex: MOVE | AFK)"""
+    JOIN = auto()       # connexion
+    LEAVE = auto()      # déconnexion
+    MOVE = auto()       # changement de salon
+    MUTE = auto()       # micro coupé
+    UNMUTE = auto()     # micro rallumé
+    AFK = auto()        # arrivée dans le salon afk
+    OTHER = auto()      # sourdine, caméra, stream...
+    ALL = JOIN | LEAVE | MOVE | MUTE | UNMUTE | AFK | OTHER
+
+
+
+@dataclass
+class VoiceEvent:
+    type: VoiceEventType
+    member: discord.Member
+    before: discord.VoiceState
+    after: discord.VoiceState
+    now: float = 0.0    # date (monotonic) de réception de l'event
+
+    @property
+    def guild(self) -> discord.Guild:
+        return self.member.guild
+
+    @property
+    def left(self) -> discord.VoiceChannel | None:
+        """Salon quitté (déconnexion ou changement de salon)"""
+        return self.before.channel if self.type & (VoiceEventType.LEAVE | VoiceEventType.MOVE) else None
+
+    @property
+    def joined(self) -> discord.VoiceChannel | None:
+        """Salon rejoint (connexion ou changement de salon)"""
+        return self.after.channel if self.type & (VoiceEventType.JOIN | VoiceEventType.MOVE) else None
+
+    @property
+    def was_afk(self) -> bool:
+        afk_channel = self.guild.afk_channel
+        return bool(afk_channel and self.before.channel and self.before.channel.id == afk_channel.id)
+
+    @property
+    def is_afk(self) -> bool:
+        afk_channel = self.guild.afk_channel
+        return bool(afk_channel and self.after.channel and self.after.channel.id == afk_channel.id)
+
+
+def classify(member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> VoiceEventType:
+    """Classe une mise à jour d'état vocal en type(s) d'event
+
+    Args:
+        member (discord.Member): Membre
+        before (discord.VoiceState): État vocal avant
+        after (discord.VoiceState): État vocal après
+
+    Returns:
+        VoiceEventType: Type de la transition
+    """
+    if before.channel is None and after.channel is None:
+        return VoiceEventType.OTHER
+
+    if before.channel is None:
+        event = VoiceEventType.JOIN
+    elif after.channel is None:
+        return VoiceEventType.LEAVE
+    elif before.channel.id != after.channel.id:
+        event = VoiceEventType.MOVE
+    else:
+        event = VoiceEventType(0)
+
+    afk_channel = member.guild.afk_channel
+    if event and afk_channel and after.channel.id == afk_channel.id:
+        event |= VoiceEventType.AFK
+    if before.self_mute != after.self_mute:
+        event |= VoiceEventType.MUTE if after.self_mute else VoiceEventType.UNMUTE
+    return event or VoiceEventType.OTHER
+
+
+
+@dataclass
+class VoiceHandler:
+    name: str
+    callback: Callable[[VoiceEvent], Awaitable[None]]
+    types: VoiceEventType
+    order: int
+    locked: bool = True     # exécuté sous le verrou du serveur
+    calls: int = 0
+    errors: int = 0
+    total: float = 0.0      # secondes
+    slowest: float = 0.0    # secondes
+
+
+
+class VoiceEventDispatcher:
+    """Unique listener on_voice_state_update du bot
+
+    Chaque mise à jour est classée une seule fois (classify), puis passée aux
+    handlers abonnés à son type, les uns après les autres dans l'ordre croissant
+    de leur 'order'. Les events d'un même serveur sont traités un par un (verrou
+    par serveur) : les handlers ne se marchent plus dessus. Les handlers qui
+    appellent l'API Discord (locked=False) passent après, verrou relâché : un
+    appel limité par le rate limit ne retarde pas les events suivants. La durée
+    de chaque handler est mesurée.
+    """
+    def __init__(self) -> None:
+        self.handlers: dict[str, VoiceHandler] = {}
+        self.ordered: list[VoiceHandler] = []
+        self.locks: dict[int, asyncio.Lock] = {}
+        self.dispatched = 0
+
+
+    def subscribe(self, name: str, callback: Callable[[VoiceEvent], Awaitable[None]],
+                  types: VoiceEventType=VoiceEventType.ALL, order: int=100, locked: bool=True) -> None:
+        """Abonne un handler, remplace celui du même nom (rechargement d'une extension)
+
+        Args:
+            name (str): Nom unique du handler, ex: 'vocal.sessions'
+            callback (Callable[[VoiceEvent], Awaitable[None]]): Coroutine appelée avec l'event
+            types (VoiceEventType, optional): Types d'event reçus. Defaults to tous.
+            order (int, optional): Rang d'exécution, le plus petit passe en premier
+            locked (bool, optional): Exécuté sous le verrou du serveur. False pour les
+                handlers qui appellent l'API Discord, exécutés une fois le verrou relâché
+        """
+        self.handlers[name] = VoiceHandler(name, callback, types, order, locked)
+        self.sort()
+
+    def unsubscribe(self, name: str) -> None:
+        """Désabonne un handler, sans effet s'il ne l'est pas"""
+        if self.handlers.pop(name, None):
+            self.sort()
+
+    def sort(self) -> None:
+        self.ordered = sorted(self.handlers.values(), key=lambda handler: (handler.order, handler.name))
+
+    async def dispatch(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
+        """Classe l'event et le passe aux handlers abonnés, dans l'ordre
+
+        Args:
+            member (discord.Member): Membre
+            before (discord.VoiceState): État vocal avant
+            after (discord.VoiceState): État vocal après
+        """
+        event = VoiceEvent(classify(member, before, after), member, before, after, time.monotonic())
+        self.dispatched += 1
+        handlers = [handler for handler in self.ordered if handler.types & event.type]
+
+        async with self.locks.setdefault(member.guild.id, asyncio.Lock()):
+            for handler in handlers:
+                if handler.locked:
+                    await self.run(handler, event)
+
+        for handler in handlers:
+            if not handler.locked:
+                await self.run(handler, event)
+
+    async def run(self, handler: VoiceHandler, event: VoiceEvent) -> None:
+        start = time.perf_counter()
+        try:
+            await handler.callback(event)
+        except Exception as error:
+            handler.errors += 1
+            logger.error(f"{event.guild.name}: handler vocal {handler.name} ({error.__class__.__name__} {error})")
+        finally:
+            elapsed = time.perf_counter() - start
+            handler.calls += 1
+            handler.total += elapsed
+            handler.slowest = max(handler.slowest, elapsed)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Renvoie les métriques de chaque handler (durées en millisecondes)"""
+        return {
+            handler.name: {
+                'calls': handler.calls,
+                'errors': handler.errors,
+                'avg_ms': handler.total / handler.calls * 1000 if handler.calls else 0.0,
+                'max_ms': handler.slowest * 1000,
+            }
+            for handler in self.ordered
+        }
@@ -0,0 +1,189 @@
+from dataclasses import dataclass
+from enum import Enum
+import time
+
+
+
+class VoiceState(Enum):
+    """État d'une session vocale, qui décide où va le temps passé"""
+    ALONE = "alone"     # seul humain du salon : rien n'est compté
+    ACTIVE = "active"   # avec au moins un autre humain : compté en temps vocal
+    MUTED = "muted"     # micro coupé : rien n'est compté
+    AFK = "afk"         # dans le salon afk : compté en temps afk
+
+
+
+@dataclass
+class VoiceSession:
+    guild_id: int
+    member_id: int
+    channel_id: int
+    state: VoiceState
+    since: float                # date (monotonic) du dernier changement d'état
+    counted: bool = True        # False pour les comptes bloqués : présents mais jamais crédités
+    muted: bool = False
+    active: float = 0.0         # secondes de temps vocal pas encore créditées
+    afk: float = 0.0            # secondes de temps afk pas encore créditées
+
+    def settle(self, now: float) -> None:
+        """Ajoute le temps écoulé depuis le dernier changement d'état au bon compteur"""
+        elapsed = max(now - self.since, 0.0)
+        self.since = now
+        if not self.counted:
+            return
+        if self.state is VoiceState.ACTIVE:
+            self.active += elapsed
+        elif self.state is VoiceState.AFK:
+            self.afk += elapsed
+
+    def row(self, checkpoint: float) -> tuple:
+        """Ligne de la table VoiceSessions (id, channel_id, state, active, afk, checkpoint)
+
+        Args:
+            checkpoint (float): Date de la sauvegarde (time.time)
+        """
+        return self.member_id, self.channel_id, self.state.value, self.active, self.afk, checkpoint
+
+    def take(self) -> tuple[int, int]:
+        """Retire le temps à créditer : les minutes entières de temps vocal
+        (le reste attend la prochaine fois) et les secondes d'afk
+
+        Returns:
+            tuple[int, int]: Temps vocal et temps afk, en secondes
+        """
+        active = int(self.active // 60) * 60
+        afk = int(self.afk)
+        self.active -= active
+        self.afk -= afk
+        return active, afk
+
+
+
+class VoiceSessions:
+    """Sessions vocales des membres de tous les serveurs, par (serveur, membre)
+
+    Chaque session suit une machine à états (VoiceState). Le temps est ajouté au
+    compteur de l'état quitté à chaque transition (VoiceSession.settle), il est
+    donc compté une et une seule fois. Le nombre d'humains de chaque salon est
+    tenu à jour à chaque arrivée et départ : savoir si un membre est seul ne
+    demande pas de parcourir channel.members, et seul le passage de 1 à 2 humains
+    (ou de 2 à 1) change l'état de l'autre membre du salon.
+
+    Rien n'est écrit ici : le temps accumulé est relevé périodiquement (collect).
+    """
+    def __init__(self) -> None:
+        self.sessions: dict[tuple[int, int], VoiceSession] = {}
+        # salon -> ids des humains présents
+        self.occupancy: dict[int, set[int]] = {}
+        # Sessions terminées dont le temps n'a pas encore été relevé
+        self.closed: list[VoiceSession] = []
+
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def get(self, guild_id: int, member_id: int) -> VoiceSession | None:
+        return self.sessions.get((guild_id, member_id))
+
+    def humans(self, channel_id: int) -> int:
+        """Renvoie le nombre d'humains présents dans un salon"""
+        return len(self.occupancy.get(channel_id, ()))
+
+    def update(self, guild_id: int, member_id: int, channel_id: int | None, *, muted: bool=False,
+               afk: bool=False, counted: bool=True, now: float | None=None) -> VoiceSession | None:
+        """Applique le nouvel état vocal d'un membre humain : connexion, déconnexion,
+        changement de salon, mute ou démute
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+            channel_id (int | None): Salon où se trouve le membre, None s'il s'est déconnecté
+            muted (bool, optional): Le membre a coupé son micro
+            afk (bool, optional): Le salon est le salon afk du serveur
+            counted (bool, optional): Le temps du membre est compté
+            now (float | None, optional): Date de la transition (time.monotonic par défaut)
+
+        Returns:
+            VoiceSession | None: Session du membre, None s'il s'est déconnecté
+        """
+        now = time.monotonic() if now is None else now
+        key = guild_id, member_id
+        session = self.sessions.get(key)
+
+        if session is None:
+            if channel_id is None:
+                return None
+            session = self.sessions[key] = VoiceSession(guild_id, member_id, channel_id, VoiceState.ALONE, now, counted)
+            self.enter(session, channel_id, now)
+
+        elif channel_id != session.channel_id:
+            session.settle(now)
+            self.leave(session, now)
+            if channel_id is None:
+                del self.sessions[key]
+                if session.counted:
+                    self.closed.append(session)
+                return None
+            self.enter(session, channel_id, now)
+
+        else:
+            session.settle(now)
+
+        session.muted = muted
+        session.state = self.state_of(session, afk)
+        return session
+
+    def enter(self, session: VoiceSession, channel_id: int, now: float) -> None:
+        """Ajoute le membre aux humains du salon, l'autre membre n'est plus seul s'ils sont 2"""
+        session.channel_id = channel_id
+        present = self.occupancy.setdefault(channel_id, set())
+        present.add(session.member_id)
+        if len(present) == 2:
+            self.refresh(session.guild_id, channel_id, now, exclude=session.member_id)
+
+    def leave(self, session: VoiceSession, now: float) -> None:
+        """Retire le membre des humains de son salon, le dernier restant devient seul"""
+        present = self.occupancy.get(session.channel_id, set())
+        present.discard(session.member_id)
+        if not present:
+            self.occupancy.pop(session.channel_id, None)
+        elif len(present) == 1:
+            self.refresh(session.guild_id, session.channel_id, now)
+
+    def refresh(self, guild_id: int, channel_id: int, now: float, exclude: int | None=None) -> None:
+        """Recalcule l'état des autres membres d'un salon qui vient de passer à 1 ou 2 humains"""
+        for member_id in self.occupancy.get(channel_id, ()):
+            if member_id == exclude:
+                continue
+            other = self.sessions.get((guild_id, member_id))
+            if other is None or other.state in (VoiceState.MUTED, VoiceState.AFK):
+                continue
+            other.settle(now)
+            other.state = self.state_of(other, afk=False)
+
+    def state_of(self, session: VoiceSession, afk: bool) -> VoiceState:
+        if afk:
+            return VoiceState.AFK
+        if session.muted:
+            return VoiceState.MUTED
+        return VoiceState.ACTIVE if self.humans(session.channel_id) >= 2 else VoiceState.ALONE
+
+    def collect(self, now: float | None=None) -> list[VoiceSession]:
+        """Arrête les compteurs de toutes les sessions à la date donnée et oublie les
+        sessions terminées : leur temps est à créditer par l'appelant (VoiceSession.take)
+
+        Returns:
+            list[VoiceSession]: Sessions en cours puis sessions terminées depuis le dernier relevé
+        """
+        now = time.monotonic() if now is None else now
+        for session in self.sessions.values():
+            session.settle(now)
+        collected = [*self.sessions.values(), *self.closed]
+        self.closed = []
+        return collected
+
+    def stats(self) -> dict[str, int]:
+        states = {state.value: 0 for state in VoiceState}
+        for session in self.sessions.values():
+            states[session.state.value] += 1
+        return {'sessions': len(self.sessions), 'channels': len(self.occupancy), 'closed': len(self.closed), **states}
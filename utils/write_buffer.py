@@ -0,0 +1,115 @@
+import asyncio
+from typing import Any, Callable
+
+from logs.logger_config import setup_logger
+from utils.database import Database
+
+
+logger = setup_logger()
+
+
+
+class WriteBuffer:
+    """Tampon d'écriture différée des profils
+
+    Les profils modifiés sont gardés en mémoire par (serveur, membre) et écrits
+    par lots : un seul executemany et un seul commit par base de données, au lieu
+    d'un UPDATE + commit à chaque message.
+    """
+    def __init__(self, req: str, params: Callable[[Any], tuple], max_size: int=100) -> None:
+        """
+        Args:
+            req (str): Requête UPDATE exécutée pour chaque profil
+            params (Callable[[Any], tuple]): Extrait les paramètres de la requête d'un profil
+            max_size (int, optional): Nombre de profils en attente qui déclenche un flush
+        """
+        self.req = req
+        self.params = params
+        self.max_size = max_size
+        self.pending: dict[tuple[int, int], Any] = {}
+        self.flushing: dict[tuple[int, int], Any] = {}
+        self.lock = asyncio.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def get(self, guild_id: int, member_id: int) -> Any | None:
+        """Renvoie le profil en attente d'écriture s'il existe
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+
+        Returns:
+            Any | None: Profil en mémoire, plus récent que celui de la bdd
+        """
+        key = guild_id, member_id
+        return self.pending.get(key) or self.flushing.get(key)
+
+    def guilds(self) -> set[int]:
+        """Renvoie les serveurs qui ont des profils en attente d'écriture"""
+        return {guild_id for guild_id, _ in self.pending}
+
+    def put(self, guild_id: int, member_id: int, profile: Any) -> bool:
+        """Marque un profil comme modifié
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+            profile (Any): Profil modifié
+
+        Returns:
+            bool: Si le seuil de flush est atteint
+        """
+        self.pending[guild_id, member_id] = profile
+        return len(self.pending) >= self.max_size
+
+    def discard(self, guild_id: int, member_id: int) -> None:
+        """Oublie un profil en attente (ex: après une remise à 0 écrite directement).
+        L'appelant garde self.lock pendant son écriture : un flush en cours aurait déjà
+        préparé l'ancien profil
+
+        Args:
+            guild_id (int): Id du serveur
+            member_id (int): Id du membre
+        """
+        self.pending.pop((guild_id, member_id), None)
+        self.flushing.pop((guild_id, member_id), None)
+
+    async def flush(self, database: Database) -> int:
+        """Écrit tous les profils en attente, une transaction par serveur
+
+        Args:
+            database (Database): Bases de données des serveurs
+
+        Returns:
+            int: Nombre de profils écrits
+        """
+        async with self.lock:
+            if not self.pending:
+                return 0
+
+            # Les gains reçus pendant l'écriture repartent dans un nouveau tampon
+            self.flushing, self.pending = self.pending, {}
+            batches: dict[int, list[tuple]] = {}
+            for (guild_id, _), profile in self.flushing.items():
+                batches.setdefault(guild_id, []).append(self.params(profile))
+
+            written = 0
+            try:
+                for guild_id, rows in batches.items():
+                    try:
+                        async with database.write(guild_id) as connection:
+                            await connection.executemany(self.req, rows)
+                        written += len(rows)
+                    except Exception as error:
+                        logger.error(f"Flush impossible pour le serveur {guild_id}: {error.__class__.__name__} {error}")
+                        # On remet les profils en attente pour le prochain flush
+                        for key, profile in self.flushing.items():
+                            if key[0] == guild_id:
+                                self.pending.setdefault(key, profile)
+            finally:
+                self.flushing = {}
+
+            return written